@@ -0,0 +1,206 @@
+"""
+Micro-benchmark of the HTML extractor backends against the original BeautifulSoup extractor.
+
+Pages are read from ``benchmarks/pages/*.html`` when present. Otherwise they are
+rebuilt from the content saved in the repo: the Wikipedia and Holidify text
+printed in ``test.ipynb`` and the organic results in ``test.json`` /
+``results.json``, wrapped in typical page boilerplate.
+
+Usage:
+    python -m benchmarks.extractor_bench [--repeat 20] [--backends stdlib lxml bs4]
+"""
+import argparse
+import html
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from tools.htmlExtractor import EXTRACTORS
+from tools.scraperTool import Scraper
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PAGES_DIR = Path(__file__).resolve().parent / "pages"
+
+# Same limits and fields ResponseFormatter asks for
+MAX_PARAGRAPHS = 5
+MAX_HEADINGS = 3
+FIELDS = ("paragraphs", "headings", "domain_info")
+
+BOILERPLATE_HEAD = (
+    "<head><meta charset='utf-8'><title>{title}</title>"
+    "<meta name='description' content='{description}'>"
+    "<style>body{{font-family:sans-serif}} .nav a{{margin:0 4px}}</style>"
+    "<script>window.dataLayer=[];function gtag(){{dataLayer.push(arguments)}}</script>"
+    "</head>"
+)
+NAV = "<div class='nav'>" + "".join(f"<a href='/section/{i}'>Section {i}</a>" for i in range(60)) + "</div>"
+
+
+def _page(title: str, description: str, sections: List[Tuple[str, List[str]]]) -> bytes:
+    body = [NAV]
+    for heading, paragraphs in sections:
+        body.append(f"<h2>{html.escape(heading)}</h2>")
+        body.extend(f"<p>{html.escape(p)}</p>" for p in paragraphs)
+    body.append("<footer>" + "".join(f"<p><a href='#'>Link {i}</a></p>" for i in range(40)) + "</footer>")
+    head = BOILERPLATE_HEAD.format(title=html.escape(title), description=html.escape(description, quote=True))
+    return f"<!DOCTYPE html><html>{head}<body>{''.join(body)}</body></html>".encode("utf-8")
+
+
+def _notebook_outputs(path: Path) -> Dict[str, str]:
+    """Map cell source to printed output for a notebook"""
+    outputs = {}
+    if not path.exists():
+        return outputs
+    for cell in json.loads(path.read_text(encoding="utf-8")).get("cells", []):
+        text = "".join(
+            "".join(o.get("text", [])) + "".join(o.get("data", {}).get("text/plain", []))
+            for o in cell.get("outputs", [])
+        )
+        if text:
+            outputs["".join(cell.get("source", []))] = text
+    return outputs
+
+
+def _split_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """Split printed article text into (heading, paragraphs) pairs"""
+    sections, heading, paragraphs = [], "Overview", []
+    for line in (l.strip() for l in text.splitlines()):
+        if not line:
+            continue
+        if len(line) < 60 and not line.endswith("."):
+            if paragraphs:
+                sections.append((heading, paragraphs))
+            heading, paragraphs = line, []
+        else:
+            paragraphs.append(line)
+    if paragraphs:
+        sections.append((heading, paragraphs))
+    return sections
+
+
+def read_saved_json(path: Path) -> Dict:
+    """Load a saved Serper dump, skipping files that are not valid JSON (test.json is a partial dump)"""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Skipping {path.name}: {e}")
+        return {}
+
+
+def load_pages() -> Dict[str, bytes]:
+    """Saved HTML pages, or pages rebuilt from the repo's saved content"""
+    if PAGES_DIR.is_dir():
+        pages = {p.name: p.read_bytes() for p in sorted(PAGES_DIR.glob("*.html"))}
+        if pages:
+            return pages
+
+    pages = {}
+    for source, text in _notebook_outputs(PROJECT_ROOT / "test.ipynb").items():
+        if "wiki_wiki.page" in source:
+            pages["wikipedia_varanasi"] = _page("Varanasi - Wikipedia", text[:160], _split_sections(text))
+        elif "find_all('p')" in source:
+            pages["holidify_sightseeing"] = _page(
+                "Places To Visit In Varanasi", "Sightseeing in Varanasi", _split_sections(text)
+            )
+
+    for name in ("test.json", "results.json"):
+        for category in read_saved_json(PROJECT_ROOT / name).values():
+            for response in category:
+                query, result = next(iter(response.items()))
+                sections = [
+                    (hit.get("title", ""), [hit.get("snippet", "")] * 3)
+                    for hit in result.get("organic", [])
+                ]
+                if sections:
+                    slug = re.sub(r"\W+", "_", query.lower()).strip("_")
+                    pages[f"serp_{slug}"] = _page(query, query, sections)
+    return pages
+
+
+def legacy_content_extractor(scraper: Scraper, response: bytes,
+                               max_paragraphs: int = 20, max_headings: int = 10) -> Dict:
+    """The original BeautifulSoup-based Scraper.content_extractor, kept as the baseline"""
+    soup = BeautifulSoup(response, 'html.parser')
+    paragraphs = [scraper._process_text(p.text) for p in soup.find_all('p')[:max_paragraphs]]
+    headings = [
+        scraper._process_text(h.text)
+        for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])[:max_headings]
+    ]
+    meta = soup.find("meta", {"name": "description"})
+    return {
+        "paragraphs": paragraphs,
+        "headings": headings,
+        "cleaned_text": scraper._process_text(soup.get_text()),
+        "domain_info": {
+            "title": scraper._process_text(soup.title.string) if soup.title else "",
+            "meta_description": scraper._process_text(meta["content"]) if meta else ""
+        }
+    }
+
+
+def _time(fn, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(repeat: int, backends: List[str]) -> None:
+    pages = load_pages()
+    if not pages:
+        print("No pages found")
+        return
+
+    scrapers = {}
+    for name in backends:
+        try:
+            scrapers[name] = Scraper(use_cache=False, extractor=name)
+        except ValueError as e:
+            print(f"Skipping {name}: {e}")
+    baseline_scraper = Scraper(use_cache=False)
+
+    print(f"{'page':<40}{'KB':>7}{'legacy ms':>11}" + "".join(f"{name + ' ms':>11}{'x':>6}" for name in scrapers))
+    totals = {name: 0.0 for name in ["legacy", *scrapers]}
+    mismatches = []
+    for page_name, page in pages.items():
+        legacy = legacy_content_extractor(baseline_scraper, page, MAX_PARAGRAPHS, MAX_HEADINGS)
+        legacy_ms = statistics.median(_time(
+            lambda: legacy_content_extractor(baseline_scraper, page, MAX_PARAGRAPHS, MAX_HEADINGS), repeat
+        ))
+        totals["legacy"] += legacy_ms
+        row = f"{page_name[:39]:<40}{len(page) / 1024:>7.0f}{legacy_ms:>11.2f}"
+        for name, scraper in scrapers.items():
+            extract = lambda: scraper.content_extractor(page, MAX_PARAGRAPHS, MAX_HEADINGS, fields=FIELDS)
+            result = extract()
+            if any(result[field] != legacy[field] for field in FIELDS):
+                mismatches.append((page_name, name))
+            ms = statistics.median(_time(extract, repeat))
+            totals[name] += ms
+            row += f"{ms:>11.2f}{legacy_ms / ms if ms else 0:>6.1f}"
+        print(row)
+
+    print(f"{'total':<47}{totals['legacy']:>11.2f}" + "".join(
+        f"{totals[name]:>11.2f}{totals['legacy'] / totals[name] if totals[name] else 0:>6.1f}"
+        for name in scrapers
+    ))
+    for page_name, name in mismatches:
+        print(f"Output differs from legacy extractor: {name} on {page_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per page and backend")
+    parser.add_argument("--backends", nargs="+", default=list(EXTRACTORS), choices=list(EXTRACTORS))
+    args = parser.parse_args()
+    run(args.repeat, args.backends)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Offline replay benchmark of every pipeline stage.
+
+Recorded Serper payloads (``results.json``, ``main/results.json``,
+``test.json`` and any trace JSONL passed with ``--traces``) and the pages from
+``benchmarks.extractor_bench.load_pages`` are served by a local replay
+server; LLM stages use stub models with configurable latency. No API keys or
+network access are needed.
+
+For Translator, Segregator, QueryRouter, Scraper, ResponseFormatter and
+generate_final_prompt it reports latency percentiles, throughput and peak
+traced memory, followed by end-to-end throughput at the requested concurrency.
+
+Usage:
+    python -m benchmarks.pipeline_bench [--iterations 5] [--model-latency 0.05]
+        [--network-latency 0.01] [--concurrency 4] [--json bench.json]
+"""
+import argparse
+import json
+import logging
+import math
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.extractor_bench import PROJECT_ROOT, load_pages
+from benchmarks.stubs import STUB_TRANSLATIONS, ReplayServer, load_recorded_payloads, stub_engine
+from main.final_response import generate_final_prompt
+from utils.responseFormater import ResponseFormatter
+
+STAGES = ("translate", "segregate", "route", "scrape", "format", "final")
+
+QUERIES = (
+    "best places to visit in Varanasi",
+    "history of Varanasi",
+    *STUB_TRANSLATIONS,
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class PipelineBench:
+    def __init__(self, server: ReplayServer, model_latency: float, final_latency: float):
+        self.engine = stub_engine(server.url, model_latency, final_latency)
+        self.translator = self.engine.translator
+        self.segregator = self.engine.segregator
+        self.router = self.engine.router
+        self.scraper = self.engine.scraper
+        self.final_model = self.engine.model
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def _timed(self, stage: str, fn: Callable, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.timings[stage].append(time.perf_counter() - started)
+        return result
+
+    def _formatter(self, raw_results: Dict) -> ResponseFormatter:
+        # Every replayed page is served from one host; lift the per-domain cap so
+        # scraping concurrency matches a real result set spread over many sites
+        return ResponseFormatter(raw_results, scraper=self.scraper, per_domain_limit=8)
+
+    def run_query(self, query: str, timed: bool = True) -> str:
+        """One pass through every stage; the standalone scrape stage re-fetches the organic links"""
+        call = self._timed if timed else (lambda stage, fn, *a, **kw: fn(*a, **kw))
+        restructured = call("translate", self.translator.translate_query, query)
+        keywords = call("segregate", self.segregator.keywords_seggregator, restructured)
+        raw_results = call("route", self.router.route_keywords, keywords)
+        if timed:
+            for response in raw_results.get("search_api", [])[:1]:
+                for hit in next(iter(response.values())).get("organic", [])[:5]:
+                    call("scrape", self.scraper.get_website_content, hit["link"],
+                         max_paragraphs=5, max_headings=3, fields=ResponseFormatter.SCRAPE_FIELDS)
+        formatted = call("format", self._formatter(raw_results).format)
+        return call("final", generate_final_prompt, formatted, query, model=self.final_model)
+
+    def peak_memory(self, query: str) -> Dict[str, float]:
+        """Peak traced KiB per stage for one query"""
+        peaks = {}
+
+        def measure(stage, fn, *args, **kwargs):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = fn(*args, **kwargs)
+            peaks[stage] = (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+            return result
+
+        tracemalloc.start()
+        try:
+            restructured = measure("translate", self.translator.translate_query, query)
+            keywords = measure("segregate", self.segregator.keywords_seggregator, restructured)
+            raw_results = measure("route", self.router.route_keywords, keywords)
+            hits = next(iter(raw_results["search_api"][0].values())).get("organic", []) if raw_results["search_api"] else []
+            measure("scrape", lambda: [
+                self.scraper.get_website_content(hit["link"], max_paragraphs=5, max_headings=3,
+                                                 fields=ResponseFormatter.SCRAPE_FIELDS)
+                for hit in hits[:5]
+            ])
+            formatted = measure("format", self._formatter(raw_results).format)
+            measure("final", generate_final_prompt, formatted, query, model=self.final_model)
+        finally:
+            tracemalloc.stop()
+        return peaks
+
+
+def run(args) -> Dict:
+    recorded = load_recorded_payloads([
+        PROJECT_ROOT / "results.json",
+        PROJECT_ROOT / "main" / "results.json",
+        PROJECT_ROOT / "test.json",
+        *[Path(p) for p in args.traces],
+    ])
+    if not recorded["search"]:
+        raise SystemExit("No recorded Serper search payloads found")
+    pages = load_pages()
+
+    with ReplayServer(recorded["search"], pages, recorded["images"], latency=args.network_latency) as server:
+        bench = PipelineBench(server, args.model_latency, args.final_latency)
+        queries = list(QUERIES)
+
+        # Warm-up pass: opens pooled connections and loads prompt templates
+        for query in queries:
+            bench.run_query(query, timed=False)
+
+        for _ in range(args.iterations):
+            for query in queries:
+                bench.run_query(query)
+
+        memory = bench.peak_memory(queries[-1])
+
+        workload = queries * args.iterations
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda q: bench.run_query(q, timed=False), workload))
+        wall = time.perf_counter() - started
+
+    report = {"stages": {}, "end_to_end": {
+        "queries": len(workload),
+        "concurrency": args.concurrency,
+        "seconds": wall,
+        "queries_per_second": len(workload) / wall if wall else 0.0
+    }, "replay_requests": server.requests}
+
+    print(f"{'stage':<12}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>10}{'peak KiB':>11}")
+    for stage in STAGES:
+        samples = bench.timings[stage]
+        if not samples:
+            continue
+        stats = {
+            "n": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p90_ms": percentile(samples, 90) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "max_ms": max(samples) * 1000,
+            "ops_per_second": len(samples) / sum(samples) if sum(samples) else 0.0,
+            "peak_kib": memory.get(stage, float("nan"))
+        }
+        report["stages"][stage] = stats
+        print(f"{stage:<12}{stats['n']:>6}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['max_ms']:>10.2f}{stats['ops_per_second']:>10.1f}{stats['peak_kib']:>11.1f}")
+
+    total = [sum(bench.timings[stage][i] for stage in ("translate", "segregate", "route", "format", "final"))
+             for i in range(len(bench.timings["final"]))]
+    print(f"\nSequential pipeline: p50 {percentile(total, 50) * 1000:.2f} ms, "
+          f"p90 {percentile(total, 90) * 1000:.2f} ms, median {statistics.median(total) * 1000:.2f} ms")
+    e2e = report["end_to_end"]
+    print(f"End-to-end: {e2e['queries']} queries in {e2e['seconds']:.2f}s at concurrency "
+          f"{e2e['concurrency']} = {e2e['queries_per_second']:.1f} queries/s")
+    print(f"Replay server requests: {server.requests}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--model-latency", type=float, default=0.05,
+                        help="Seconds per stub call for the translator and segregator models")
+    parser.add_argument("--final-latency", type=float, default=0.2, help="Seconds per final-response stub call")
+    parser.add_argument("--network-latency", type=float, default=0.01,
+                        help="Seconds added to every replay-server response")
+    parser.add_argument("--concurrency", type=int, default=4, help="Workers for the end-to-end throughput run")
+    parser.add_argument("--traces", nargs="*", default=[], help="Extra trace JSONL files to replay")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Per-request INFO logs would dominate the output and the timings
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = run(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Offline stand-ins for the pipeline's external services.
+
+``StubModel`` replaces the LLM backends and ``ReplayServer`` serves recorded
+Serper payloads and saved HTML pages over a local HTTP server, so every stage
+can be exercised without API keys or quota.
+"""
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import quote, urlparse
+
+from models.base import BaseModel
+
+STUB_ANSWER = (
+    "Varanasi's highlights include the Dashashwamedh Ghat evening aarti, a sunrise boat ride "
+    "along the Ganges, the Kashi Vishwanath Temple and nearby Sarnath. " * 4
+)
+
+# Romanized-Hindi sample queries and the translation the stub translator returns
+STUB_TRANSLATIONS = {
+    "varanasi mein ghumne ki best jagah kaun si hai": "What are the best places to visit in Varanasi?",
+    "banaras ke famous ghat kaun se hai aur unki photos dikhao": "Which are the famous ghats of Varanasi? Show me images.",
+}
+
+
+class StubModel(BaseModel):
+    """BaseModel with a fixed or computed reply and simulated latency"""
+
+    def __init__(self, response: str = "", latency: float = 0.0,
+                 responder: Optional[Callable[[str], str]] = None,
+                 first_token_latency: Optional[float] = None, chunk_chars: int = 40):
+        """
+        Args:
+            response: Text returned for every prompt (ignored when responder is set)
+            latency: Seconds per generate_content call, and total seconds per stream
+            responder: Function of the prompt returning the reply
+            first_token_latency: Seconds before the first streamed chunk (defaults to half of latency)
+            chunk_chars: Characters per streamed chunk
+        """
+        self.response = response
+        self.latency = latency
+        self.responder = responder
+        self.first_token_latency = latency / 2 if first_token_latency is None else first_token_latency
+        self.chunk_chars = max(1, chunk_chars)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _reply(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        return self.responder(prompt) if self.responder else self.response
+
+    def generate_content(self, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(prompt)
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        text = self._reply(prompt)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        if self.first_token_latency:
+            time.sleep(self.first_token_latency)
+        gap = max(self.latency - self.first_token_latency, 0.0) / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if index and gap:
+                time.sleep(gap)
+            yield chunk
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning a slow request (scrape deadlines, timeouts) are expected
+        pass
+
+
+def prompt_argument(prompt: str, template: str, placeholder: str) -> str:
+    """Recover the value substituted for ``{placeholder}`` in a formatted template"""
+    head, _, tail = template.partition("{" + placeholder + "}")
+    head = head.replace("{{", "{").replace("}}", "}")
+    tail = tail.replace("{{", "{").replace("}}", "}")
+    if prompt.startswith(head) and prompt.endswith(tail):
+        return prompt[len(head):len(prompt) - len(tail)].strip()
+    return prompt.strip()
+
+
+def stub_keywords(query: str) -> Dict:
+    """Keywords a segregator might produce for a query: the query itself, plus images when asked for"""
+    query = query or "Varanasi"
+    keywords = {"api_needed": 1, "search_api": [query]}
+    if any(word in query.lower() for word in ("image", "photo", "picture")):
+        keywords["image_api"] = [query.replace("Show me images.", "").strip()]
+    return keywords
+
+
+def stub_engine(replay_url: str, model_latency: float = 0.05, final_latency: float = 0.2,
+                use_cache: bool = False):
+    """
+    PipelineEngine whose LLM stages are stub models and whose Serper client
+    and scraper talk to a ReplayServer.
+
+    Args:
+        replay_url: Base URL of a running ReplayServer
+        model_latency: Seconds per translator/segregator/planner call
+        final_latency: Seconds per final-response call
+        use_cache: Keep the Serper and page caches (off, so every request hits the server)
+    """
+    from main.pipeline import PipelineEngine
+    from queryRouter.router import QueryRouter
+    from tools.httpTransport import HttpTransport
+    from tools.scraperTool import Scraper
+    from tools.serper import SerperClient
+    from utils.traceRecorder import NullRecorder
+
+    transport = HttpTransport(max_retries=0)
+    router = QueryRouter(
+        serper_api_key="replay",
+        recorder=NullRecorder(),
+        serper_client=SerperClient(api_key="replay", use_cache=use_cache, transport=transport, base_url=replay_url)
+    )
+    engine = PipelineEngine(api_key="stub", model=StubModel(STUB_ANSWER, latency=final_latency), router=router)
+    engine.scraper = Scraper(use_cache=use_cache, transport=transport)
+
+    translator_template = engine.translator.load_prompt_template()
+    segregator_template = engine.segregator.load_prompt_template()
+    planner_template = engine.planner.load_prompt_template()
+
+    def translate(prompt: str) -> str:
+        query = prompt_argument(prompt, translator_template, "user_query")
+        return STUB_TRANSLATIONS.get(query, query)
+
+    def plan(prompt: str) -> str:
+        query = translate(prompt_argument(prompt, planner_template, "user_query"))
+        return repr({"translated_query": query, **stub_keywords(query)})
+
+    engine.translator.model = StubModel(latency=model_latency, responder=translate)
+    engine.segregator.model = StubModel(latency=model_latency, responder=lambda prompt: repr(
+        stub_keywords(prompt_argument(prompt, segregator_template, "re_structured_query"))
+    ))
+    engine.planner.model = StubModel(latency=model_latency, responder=plan)
+    return engine
+
+
+def _normalize(query: str) -> str:
+    return " ".join(str(query).lower().split())
+
+
+class ReplayServer:
+    """
+    Local HTTP server standing in for Serper and the sites it links to.
+
+    ``POST /search`` and ``POST /images`` answer with the recorded payload for
+    the query, or with the first recorded payload re-labelled for unknown
+    queries. Organic links are rewritten to ``/page/<name>`` so the scraper
+    fetches saved HTML from this server instead of the real site.
+    """
+
+    def __init__(self, search_payloads: Dict[str, Dict], pages: Dict[str, bytes],
+                 image_payloads: Optional[Dict[str, Dict]] = None,
+                 latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            search_payloads: Recorded /search responses keyed by query
+            pages: HTML documents served to the scraper, keyed by name
+            image_payloads: Recorded /images responses keyed by query; synthesized when missing
+            latency: Seconds added to every response
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+        """
+        self.latency = latency
+        self.pages = pages
+        self.page_names = sorted(pages)
+        self.requests = {"search": 0, "images": 0, "page": 0}
+        self._lock = threading.Lock()
+        self._server = _QuietServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+        self.search_payloads = {_normalize(q): self._localize(p) for q, p in search_payloads.items()}
+        self.image_payloads = {_normalize(q): p for q, p in (image_payloads or {}).items()}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _localize(self, payload: Dict) -> Dict:
+        """Point organic links at saved pages on this server"""
+        payload = copy.deepcopy(payload)
+        for index, hit in enumerate(payload.get("organic", [])):
+            if self.page_names:
+                name = self.page_names[index % len(self.page_names)]
+                hit["link"] = f"{self.url}/page/{name}?src={quote(hit.get('link', ''), safe='')}"
+        return payload
+
+    def search_payload(self, query: str) -> Dict:
+        payload = self.search_payloads.get(_normalize(query))
+        if payload is None:
+            payload = copy.deepcopy(next(iter(self.search_payloads.values()), {"organic": []}))
+            payload.setdefault("searchParameters", {})["q"] = query
+        return payload
+
+    def image_payload(self, query: str) -> Dict:
+        payload = self.image_payloads.get(_normalize(query))
+        if payload is not None:
+            return payload
+        # Derive image results from the organic hits when no image dump was recorded
+        return {
+            "searchParameters": {"q": query, "type": "images"},
+            "images": [
+                {
+                    "title": hit.get("title", ""),
+                    "imageUrl": f"{self.url}/image/{index}.jpg",
+                    "link": hit.get("link", ""),
+                    "snippet": hit.get("snippet", "")
+                }
+                for index, hit in enumerate(self.search_payload(query).get("organic", [])[:10])
+            ]
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.requests[key] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                query = json.loads(self.rfile.read(length) or b"{}").get("q", "")
+                route = urlparse(self.path).path
+                if route == "/search":
+                    server._count("search")
+                    payload = server.search_payload(query)
+                elif route == "/images":
+                    server._count("images")
+                    payload = server.image_payload(query)
+                else:
+                    self._send(404, b"{}", "application/json")
+                    return
+                self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                route = urlparse(self.path).path
+                if route.startswith("/page/"):
+                    page = server.pages.get(route[len("/page/"):])
+                    if page is not None:
+                        server._count("page")
+                        self._send(200, page, "text/html; charset=utf-8")
+                        return
+                self._send(404, b"Not found", "text/plain")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def load_recorded_payloads(paths: List[Path]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Collect recorded Serper responses by category and query.
+
+    Accepts router dumps (``{"search_api": [{query: response}], ...}``) and
+    the JSONL files written by utils.traceRecorder.
+    """
+    from benchmarks.extractor_bench import read_saved_json
+
+    recorded = {"search": {}, "images": {}}
+
+    def add(routed: Dict) -> None:
+        for category, responses in routed.items():
+            kind = "images" if category == "image_api" else "search"
+            for response in responses or []:
+                for query, result in response.items():
+                    if isinstance(result, str):
+                        try:
+                            result = json.loads(result)
+                        except json.JSONDecodeError:
+                            continue
+                    if isinstance(result, dict):
+                        recorded[kind].setdefault(query, result)
+
+    for path in paths:
+        if not path.exists():
+            continue
+        if path.suffix == ".jsonl":
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    add(json.loads(line).get("results", {}))
+                except json.JSONDecodeError:
+                    continue
+        else:
+            add(read_saved_json(path))
+    return recorded
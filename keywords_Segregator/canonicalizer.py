@@ -0,0 +1,96 @@
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+# Router categories grouped by the Serper endpoint they hit; keywords are only
+# merged with others that would be sent to the same endpoint
+ENDPOINT_CATEGORIES = {
+    "search": ("search_api", "text_api"),
+    "image": ("image_api",),
+    "local": ("local_api",),
+}
+# Words that say "I want pictures" but add nothing to the search itself
+MEDIA_WORDS = frozenset(
+    "image images photo photos picture pictures pic pics pix wallpaper wallpapers".split()
+)
+STOPWORDS = frozenset(
+    "a an the of in on at for to and or with about from me show give please some "
+    "tell what which is are".split()
+)
+_PUNCTUATION = re.compile(r"[^\w\s'-]+")
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase, punctuation-free, single-spaced form of a keyword"""
+    return " ".join(_PUNCTUATION.sub(" ", str(keyword).lower()).split())
+
+
+def content_terms(keyword: str) -> FrozenSet[str]:
+    """Terms that decide what a keyword searches for: no stopwords or media words, plurals folded"""
+    terms = set()
+    for word in normalize_keyword(keyword).split():
+        if word in STOPWORDS or word in MEDIA_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+def covers(broader: str, narrower: str) -> bool:
+    """Whether a search for ``broader`` also answers ``narrower`` (its terms are a superset)"""
+    narrower_terms = content_terms(narrower)
+    return bool(narrower_terms) and narrower_terms <= content_terms(broader)
+
+
+def canonicalize(keywords) -> Tuple[Dict, Dict[str, int]]:
+    """
+    Normalize keywords and drop the ones another keyword already covers.
+
+    Within each endpoint (search_api and text_api share one), keywords with no
+    content left (e.g. "images"), duplicates up to case, word order and
+    plurals, and phrases whose terms are all contained in a more specific
+    phrase (e.g. "Varanasi ghats" next to "famous Varanasi ghats") are removed.
+    Non-keyword entries such as "api_needed" or "message" are passed through.
+
+    :param keywords: segregator or planner output; anything but a dict is returned unchanged.
+    :return: (canonical keywords, report with keywords_in, keywords_out and calls_saved).
+    """
+    if not isinstance(keywords, dict):
+        return keywords, {"keywords_in": 0, "keywords_out": 0, "calls_saved": 0}
+
+    category_endpoint = {category: endpoint
+                         for endpoint, categories in ENDPOINT_CATEGORIES.items()
+                         for category in categories}
+    canonical = {key: value for key, value in keywords.items() if key not in category_endpoint}
+    keywords_in = keywords_out = 0
+
+    for endpoint, categories in ENDPOINT_CATEGORIES.items():
+        entries: List[Tuple[str, str, FrozenSet[str]]] = []
+        for category in categories:
+            for keyword in keywords.get(category) or []:
+                keywords_in += 1
+                phrase = normalize_keyword(keyword)
+                terms = content_terms(phrase)
+                if terms:
+                    entries.append((category, phrase, terms))
+
+        kept: List[Tuple[str, str, FrozenSet[str]]] = []
+        for category, phrase, terms in entries:
+            if any(terms <= other for _, _, other in kept):
+                continue
+            # A more specific phrase replaces the ones it subsumes
+            kept = [entry for entry in kept if not entry[2] < terms]
+            kept.append((category, phrase, terms))
+
+        for category, phrase, _ in kept:
+            canonical.setdefault(category, []).append(phrase)
+            keywords_out += 1
+        for category in categories:
+            if category in keywords:
+                canonical.setdefault(category, [])
+
+    return canonical, {
+        "keywords_in": keywords_in,
+        "keywords_out": keywords_out,
+        "calls_saved": keywords_in - keywords_out
+    }
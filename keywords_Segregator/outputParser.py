@@ -0,0 +1,288 @@
+import ast
+import json
+import logging
+import re
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models.base import BaseModel
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_CATEGORIES = ("search_api", "text_api", "image_api", "local_api")
+
+REPAIR_PROMPT = (
+    "Your previous reply could not be parsed ({error}).\n"
+    "Return only the corrected JSON object, with no code fences and no other text.\n"
+    "Previous reply:\n{output}"
+)
+
+
+class OutputParseError(ValueError):
+    """Model output holds no object that passes the schema"""
+
+
+def validate_keywords(value) -> Dict:
+    """
+    Check and normalize a segregator/planner object.
+
+    Category values become lists of non-empty strings (a bare string is
+    wrapped, null counts as empty), api_needed becomes 0/1 and unknown keys such as a copied
+    "api_name" placeholder are dropped.
+
+    Raises:
+        OutputParseError: If the object does not describe keywords or a message
+    """
+    if not isinstance(value, dict):
+        raise OutputParseError(f"expected an object, got {type(value).__name__}")
+
+    result = {}
+    for key in KEYWORD_CATEGORIES + ("message",):
+        if key not in value:
+            continue
+        items = value[key]
+        if items is None:
+            continue
+        if isinstance(items, str):
+            items = [items]
+        if not isinstance(items, (list, tuple)):
+            raise OutputParseError(f"'{key}' must be a list of strings")
+        items = [str(item).strip() for item in items if isinstance(item, (str, int, float)) and str(item).strip()]
+        if items:
+            result[key] = items
+    if isinstance(value.get("translated_query"), str):
+        result["translated_query"] = value["translated_query"].strip()
+
+    has_keywords = any(key in result for key in KEYWORD_CATEGORIES)
+    api_needed = value.get("api_needed", 1 if has_keywords else 0)
+    api_needed = 1 if str(api_needed).strip().lower() in ("1", "true", "yes") else 0
+    if api_needed and not has_keywords:
+        raise OutputParseError("api_needed is 1 but no keywords were given")
+    if not api_needed and not has_keywords and "message" not in result:
+        raise OutputParseError("neither keywords nor a message were given")
+    result["api_needed"] = api_needed
+    return result
+
+
+class ObjectScanner:
+    """
+    Incrementally find balanced top-level {...} spans in model output.
+
+    Tracks string literals (either quote style) and escapes so braces inside
+    strings do not count. Text can be fed in chunks, e.g. from a stream;
+    ``pending`` returns an object cut off mid-way with its open strings and
+    brackets closed.
+    """
+
+    _CLOSERS = {"{": "}", "[": "]"}
+
+    def __init__(self):
+        self._current: List[str] = []
+        self._stack: List[str] = []
+        self._quote: Optional[str] = None
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume text; returns the objects completed by it"""
+        completed = []
+        for char in chunk:
+            if not self._stack:
+                if char == "{":
+                    self._current = [char]
+                    self._stack = ["{"]
+                continue
+            self._current.append(char)
+            if self._quote is not None:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == self._quote:
+                    self._quote = None
+                continue
+            if char in "\"'":
+                # An apostrophe inside a word is prose, not a string delimiter
+                previous = self._current[-2] if len(self._current) > 1 else ""
+                if char == '"' or not previous.isalnum():
+                    self._quote = char
+            elif char in self._CLOSERS:
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    completed.append("".join(self._current))
+                    self._current = []
+        return completed
+
+    def pending(self) -> Optional[str]:
+        if not self._stack:
+            return None
+        text = "".join(self._current)
+        if self._quote is not None:
+            text += self._quote
+        return text.rstrip().rstrip(",") + "".join(self._CLOSERS[opener] for opener in reversed(self._stack))
+
+
+_FENCE = re.compile(r"```[a-zA-Z]*")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_][\w]*)\s*:")
+_MISSING_COMMA = re.compile(r"([\]}\"'\d])(\s*\n\s*)([\"'])")
+_JSON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+
+def _load(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        pass
+    # JSON literals for literal_eval (a literal inside a string is rare in keyword output)
+    return ast.literal_eval(re.sub(r"\b(true|false|null)\b", lambda m: _JSON_LITERALS[m.group(1)], text))
+
+
+def _repairs(candidate: str) -> Iterator[str]:
+    """Progressively repaired versions of a candidate object"""
+    text = candidate.translate(_SMART_QUOTES)
+    yield text
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    yield text
+    text = _UNQUOTED_KEY.sub(r'\1"\2":', text)
+    yield text
+    yield _MISSING_COMMA.sub(r"\1,\2\3", text)
+
+
+class StructuredOutputParser:
+    """
+    Tolerant parser for LLM replies that should be a single object.
+
+    Code fences and surrounding prose are ignored and the first object that
+    passes ``validator`` is returned. Candidates that fail to load are
+    repaired locally (smart quotes, trailing commas, unquoted keys, missing
+    commas, JSON/Python literals, output cut off mid-object). Only when that
+    fails is the model asked once to fix its reply; after that the fallback,
+    if any, is returned.
+    """
+
+    def __init__(self, name: str, validator: Callable[[object], Dict] = validate_keywords):
+        self.name = name
+        self.validator = validator
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "clean": 0, "repaired": 0, "reprompted": 0, "failed": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _candidates(self, text: str) -> Iterator[str]:
+        scanner = ObjectScanner()
+        yield from scanner.feed(_FENCE.sub("", text))
+        pending = scanner.pending()
+        if pending is not None:
+            yield pending
+
+    def parse_local(self, text: str) -> Tuple[Dict, bool]:
+        """
+        Parse without calling the model
+
+        Returns:
+            (validated object, whether any repair was needed)
+        Raises:
+            OutputParseError: If no candidate object can be loaded and validated
+        """
+        text = (text or "").strip().lstrip("﻿")
+        try:
+            return self.validator(_load(text)), False
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            pass
+
+        error: Exception = OutputParseError("no object found in the output")
+        for candidate in self._candidates(text):
+            for attempt in _repairs(candidate):
+                try:
+                    value = _load(attempt)
+                except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError) as e:
+                    error = OutputParseError(f"invalid object: {str(e)}")
+                    continue
+                try:
+                    return self.validator(value), True
+                except OutputParseError as e:
+                    # Loaded but wrong shape: try the next object in the output
+                    error = e
+                    break
+        raise error if isinstance(error, OutputParseError) else OutputParseError(str(error))
+
+    def parse(self, text: str, model: Optional[BaseModel] = None, fallback: Optional[Dict] = None) -> Dict:
+        """
+        Parse model output, re-prompting ``model`` once as a last resort
+
+        Raises:
+            OutputParseError: If nothing parses and no fallback was given
+        """
+        self._count("calls")
+        try:
+            value, repaired = self.parse_local(text)
+            self._count("repaired" if repaired else "clean")
+            return value
+        except OutputParseError as e:
+            error = e
+
+        if model is not None:
+            self._count("reprompted")
+            try:
+                reply = model.generate_content(REPAIR_PROMPT.format(error=str(error), output=(text or "")[:2000]))
+                value, _ = self.parse_local(reply)
+                return value
+            except Exception as e:
+                error = e
+
+        self._count("failed")
+        logger.warning(f"{self.name}: unparseable model output ({str(error)}): {(text or '')[:200]!r}")
+        if fallback is not None:
+            return dict(fallback)
+        raise error if isinstance(error, OutputParseError) else OutputParseError(str(error))
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        calls = stats["calls"] or 1
+        return {
+            **stats,
+            "repair_rate": round(stats["repaired"] / calls, 4),
+            "reprompt_rate": round(stats["reprompted"] / calls, 4),
+            "failure_rate": round(stats["failed"] / calls, 4)
+        }
+
+
+_parsers: Dict[str, StructuredOutputParser] = {}
+_parsers_lock = threading.Lock()
+
+
+def get_parser(name: str) -> StructuredOutputParser:
+    """Process-wide parser per pipeline stage, so its rates cover every request"""
+    with _parsers_lock:
+        parser = _parsers.get(name)
+        if parser is None:
+            parser = StructuredOutputParser(name)
+            _parsers[name] = parser
+        return parser
+
+
+def stats() -> Dict[str, Dict]:
+    with _parsers_lock:
+        parsers = list(_parsers.values())
+    return {parser.name: parser.summary() for parser in parsers}
+
+
+def prometheus_text(prefix: str = "output_parser") -> str:
+    lines = [
+        f"# HELP {prefix}_results_total Structured model outputs by how they were parsed",
+        f"# TYPE {prefix}_results_total counter"
+    ]
+    for name, summary in stats().items():
+        for outcome in ("clean", "repaired", "reprompted", "failed"):
+            lines.append(f'{prefix}_results_total{{stage="{name}",outcome="{outcome}"}} {summary[outcome]}')
+    return "\n".join(lines) + "\n"
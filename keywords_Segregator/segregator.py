@@ -1,13 +1,17 @@
 from pathlib import Path
 import os
+from typing import Dict, Optional
 from models.factory import ModelFactory
+from models.base import BaseModel
+from utils import tracing
+from keywords_Segregator.outputParser import get_parser
 from dotenv import load_dotenv
-import ast
 load_dotenv()
 import json
 
 class Segregator:
-    def __init__(self, api_key: str, model_type: str, model_name: str, prompt_template_path: str = None):
+    def __init__(self, api_key: str, model_type: str, model_name: str, prompt_template_path: str = None,
+                 model: Optional[BaseModel] = None):
         self.api_key = api_key
         self.model_name = model_name
         self.model_type = model_type
@@ -16,36 +20,43 @@ class Segregator:
         else:
             self.prompt_template_path = Path("prompts/query_router/query_keywords_seggregator.txt")
             
-        self.model = ModelFactory.get_model(model_type, api_key, model_name)
+        self._prompt_template: Optional[str] = None
+        # Reuse a shared client when one is injected (see main.pipeline.PipelineEngine)
+        self.model = model or ModelFactory.get_model(model_type, api_key, model_name)
+        self.parser = get_parser("segregator")
         
     def load_prompt_template(self) -> str:
+        if self._prompt_template is not None:
+            return self._prompt_template
         try:
             with open(self.prompt_template_path,"r", encoding="utf-8") as f:
-                return f.read()
+                self._prompt_template = f.read()
+                return self._prompt_template
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt template not found at {self.prompt_template_path}")
         except Exception as e:
             raise Exception(f"Error loading prompt template: {str(e)}")
     
     
-    def keywords_seggregator(self, restructured_query: str) -> str: 
-        try:
-            with open(self.prompt_template_path, "r", encoding="utf-8") as f:
-                prompt = f.read()
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Prompt file not found at {self.prompt_template_path}")
-        
-        formatted_prompt = prompt.format(re_structured_query = restructured_query)
-        keywords_result = self.model.generate_content(formatted_prompt)
-        # return keywords_result
+    def keywords_seggregator(self, restructured_query: str) -> Dict:
+        """
+        Classify the query and extract router keywords
+
+        Fenced, chatty or slightly malformed model output is repaired locally; the
+        model is re-prompted only if that fails, and a plain web search for the
+        query itself is the last fallback, so the result is always a valid dict.
+        """
+        with tracing.span("segregate"):
+            prompt = self.load_prompt_template()
         
-        try: 
-            
-            return ast.literal_eval(keywords_result)   # better method to converting the keywords_result to dictionary
-            
-        except Exception as e:
-            
-            return -1    # return -1 if the keywords_result is not a valid dictionary
+            formatted_prompt = prompt.format(re_structured_query = restructured_query)
+            keywords_result = self.model.generate_content(formatted_prompt)
+
+            return self.parser.parse(
+                keywords_result,
+                model=self.model,
+                fallback={"api_needed": 1, "search_api": [restructured_query]}
+            )
     
         
         # try:
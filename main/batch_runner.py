@@ -0,0 +1,299 @@
+"""
+Precompute answers for a file of questions.
+
+Reads queries from a JSONL file (one object per line; the text is taken from
+--query-field or the first of query/question/body/title) and appends one
+result per line to the output JSONL as answers complete. Work is done in
+chunks: a chunk's queries are planned in parallel, the search keywords of the
+whole chunk are de-duplicated and fetched once, then answers are generated
+in parallel while the next chunk is being planned.
+
+Re-running with the same output file resumes: ids already answered without
+an error are skipped, failed ones are retried.
+
+Usage:
+    python -m main.batch_runner questions.jsonl answers.jsonl [--workers 4]
+        [--chunk-size 32] [--llm-rpm 60] [--serper-rps 5] [--restart]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from keywords_Segregator.canonicalizer import canonicalize
+from main.pipeline import PipelineEngine
+from queryRouter.router import QueryRouter
+from utils import rateLimiter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUERY_FIELDS = ("query", "question", "body", "title")
+ID_FIELDS = ("id", "request_id")
+REPRESENTATIVE_CATEGORY = {"search": "search_api", "image": "image_api", "local": "local_api"}
+
+
+def _normalize(keyword: str) -> str:
+    return " ".join(str(keyword).lower().split())
+
+
+def read_queries(path: Path, id_field: Optional[str] = None,
+                 query_field: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Stream (id, query) pairs from a JSONL file, skipping blank and malformed lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line {line_number} of {path}")
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            query = next((item[k] for k in ([query_field] if query_field else QUERY_FIELDS) if item.get(k)), None)
+            if not query:
+                logger.warning(f"Skipping line {line_number} of {path}: no query field")
+                continue
+            item_id = next((item[k] for k in ([id_field] if id_field else ID_FIELDS) if item.get(k)), None)
+            yield str(item_id or f"line-{line_number}"), str(query)
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """Ids already answered successfully in an output file; a torn last line is ignored"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not record.get("error"):
+                done.add(record.get("id"))
+    return done
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchRunner:
+    def __init__(self, engine: PipelineEngine, output_path: Path,
+                 workers: int = 4, chunk_size: int = 32, progress_every: int = 10):
+        """
+        :param engine: pipeline used for every stage.
+        :param output_path: JSONL file results are appended to.
+        :param workers: queries planned, and answers generated, in parallel.
+        :param chunk_size: queries whose keywords are de-duplicated together.
+        :param progress_every: log throughput after this many finished queries.
+        """
+        self.engine = engine
+        self.output_path = Path(output_path)
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.progress_every = max(1, progress_every)
+        self.stats = {
+            "completed": 0, "failed": 0, "skipped": 0,
+            "keywords_merged": 0, "keywords_requested": 0, "keywords_fetched": 0
+        }
+        self._lock = threading.Lock()
+        self._output = None
+        self._started = 0.0
+
+    def _plan(self, item_id: str, query: str) -> Tuple[str, str, object]:
+        try:
+            keywords, report = canonicalize(self.engine.plan(query))
+        except Exception as e:
+            return item_id, query, e
+        with self._lock:
+            self.stats["keywords_merged"] += report["calls_saved"]
+        return item_id, query, keywords
+
+    def _route(self, planned: List[Tuple[str, str, object]]) -> Dict[Tuple[str, str], Dict]:
+        """Fetch each distinct (endpoint, keyword) of the chunk once"""
+        merged: Dict[str, List[str]] = {}
+        seen = set()
+        requested = 0
+        for _, _, keywords in planned:
+            if not isinstance(keywords, dict):
+                continue
+            for category, keyword_list in keywords.items():
+                endpoint = QueryRouter.CATEGORY_ENDPOINTS.get(category)
+                if endpoint is None:
+                    continue
+                for keyword in keyword_list:
+                    requested += 1
+                    key = (endpoint, _normalize(keyword))
+                    if key not in seen:
+                        seen.add(key)
+                        # One representative category per endpoint is enough to route it
+                        merged.setdefault(REPRESENTATIVE_CATEGORY[endpoint], []).append(keyword)
+
+        lookup = {}
+        if merged:
+            routed = self.engine.router.route_keywords(merged)
+            for category, responses in routed.items():
+                endpoint = QueryRouter.CATEGORY_ENDPOINTS[category]
+                for response in responses:
+                    for keyword, result in response.items():
+                        lookup[(endpoint, _normalize(keyword))] = result
+                        if endpoint == "local":
+                            # Search keywords the local index covered come back as local_api
+                            lookup.setdefault(("search", _normalize(keyword)), result)
+        with self._lock:
+            self.stats["keywords_requested"] += requested
+            self.stats["keywords_fetched"] += len(seen)
+        return lookup
+
+    @staticmethod
+    def _raw_results(keywords: Dict, lookup: Dict[Tuple[str, str], Dict]) -> Dict[str, List[Dict]]:
+        """Rebuild one query's routed results from the chunk-wide lookup"""
+        raw_results = {"image_api": [], "search_api": [], "text_api": [], "local_api": []}
+        for category, keyword_list in keywords.items():
+            endpoint = QueryRouter.CATEGORY_ENDPOINTS.get(category)
+            if endpoint is None:
+                continue
+            for keyword in keyword_list:
+                result = lookup.get((endpoint, _normalize(keyword)))
+                if result is not None:
+                    raw_results[category].append({keyword: result})
+        return raw_results
+
+    def _answer(self, item_id: str, query: str, keywords, lookup: Dict) -> None:
+        started = time.perf_counter()
+        record = {"id": item_id, "query": query}
+        try:
+            if isinstance(keywords, Exception):
+                raise keywords
+            if not isinstance(keywords, dict):
+                raise ValueError("Query planning returned no keywords")
+            formatted_results = self.engine.format(self._raw_results(keywords, lookup))
+            answer = self.engine.compose(formatted_results, query)
+            if answer.get("error"):
+                # compose returns the failure as text; record it as an error so --resume retries it
+                raise RuntimeError(answer["error"])
+            record.update(answer)
+        except Exception as e:
+            record["error"] = str(e)
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        self._write(record)
+
+    def _write(self, record: Dict) -> None:
+        with self._lock:
+            self._output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._output.flush()
+            self.stats["failed" if record.get("error") else "completed"] += 1
+            finished = self.stats["completed"] + self.stats["failed"]
+        if finished % self.progress_every == 0:
+            logger.info(self._progress())
+
+    def _progress(self) -> str:
+        elapsed = time.perf_counter() - self._started
+        finished = self.stats["completed"] + self.stats["failed"]
+        return (f"{finished} queries done ({self.stats['failed']} failed) in {elapsed:.1f}s, "
+                f"{finished / elapsed if elapsed else 0:.2f} queries/s")
+
+    def run(self, items: Iterable[Tuple[str, str]], resume: bool = True) -> Dict:
+        """
+        Answer every (id, query) pair, appending results to the output file.
+
+        :return: run statistics, including throughput and keywords saved by de-duplication.
+        """
+        done = completed_ids(self.output_path) if resume else set()
+
+        def pending() -> Iterator[Tuple[str, str]]:
+            for item_id, query in items:
+                if item_id in done:
+                    self.stats["skipped"] += 1
+                    continue
+                done.add(item_id)
+                yield item_id, query
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._started = time.perf_counter()
+        with open(self.output_path, "a" if resume else "w", encoding="utf-8") as output, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-plan") as planner, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-answer") as answerer:
+            self._output = output
+            chunks = _chunks(pending(), self.chunk_size)
+            next_chunk = next(chunks, None)
+            plans = [planner.submit(self._plan, *item) for item in next_chunk or []]
+            answering = []
+            while plans:
+                planned = [future.result() for future in plans]
+                # Plan the next chunk while this one is searched and answered
+                next_chunk = next(chunks, None)
+                plans = [planner.submit(self._plan, *item) for item in next_chunk or []]
+                lookup = self._route(planned)
+                # Keep at most two chunks of answers in flight
+                wait(answering)
+                answering = [answerer.submit(self._answer, *item, lookup) for item in planned]
+            wait(answering)
+            self._output = None
+
+        elapsed = time.perf_counter() - self._started
+        finished = self.stats["completed"] + self.stats["failed"]
+        self.stats.update({
+            "seconds": round(elapsed, 3),
+            "queries_per_second": round(finished / elapsed, 3) if elapsed and finished else 0.0,
+            "keywords_saved": (self.stats["keywords_merged"]
+                               + self.stats["keywords_requested"] - self.stats["keywords_fetched"])
+        })
+        return self.stats
+
+
+def build_engine(args) -> PipelineEngine:
+    """Engine whose LLM and Serper calls honour the configured rate limits"""
+    # The shared per-provider limiters are configured in place; clients pick them up
+    if args.llm_rpm > 0:
+        rateLimiter.get_limiter(args.model_type).configure(rate=args.llm_rpm / 60.0, burst=max(1, args.workers))
+    if args.serper_rps > 0:
+        rateLimiter.get_limiter("serper").configure(rate=args.serper_rps)
+    return PipelineEngine(api_key=os.getenv("GEMINI_API_KEY"), model_type=args.model_type,
+                          model_name=args.model_name, query_pipeline=args.pipeline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="JSONL file of queries")
+    parser.add_argument("output", type=Path, help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel queries per stage")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Queries whose keywords are de-duplicated together")
+    parser.add_argument("--llm-rpm", type=float, default=float(os.getenv("LLM_RPM", "0")),
+                        help="LLM requests per minute (0 = unlimited)")
+    parser.add_argument("--serper-rps", type=float, default=float(os.getenv("SERPER_RPS", "0")),
+                        help="Serper requests per second (0 = unlimited)")
+    parser.add_argument("--query-field", help="Field holding the query text")
+    parser.add_argument("--id-field", help="Field holding a stable id used for resuming")
+    parser.add_argument("--pipeline", choices=("two_stage", "planner"), help="Query pipeline (default: QUERY_PIPELINE)")
+    parser.add_argument("--model-type", default="gemini")
+    parser.add_argument("--model-name", default="gemini-1.5-flash")
+    parser.add_argument("--restart", action="store_true", help="Overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runner = BatchRunner(build_engine(args), args.output, workers=args.workers, chunk_size=args.chunk_size)
+    stats = runner.run(read_queries(args.input, args.id_field, args.query_field), resume=not args.restart)
+    stats["rate_limits"] = rateLimiter.stats()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 from pathlib import Path
-import json
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Union
+import time
 import logging
-from langchain_openai import OpenAI
-from translator.queryTranslator import Translator
+from models.base import BaseModel
 from models.factory import ModelFactory
 import os
 from dotenv import load_dotenv
 from utils.responseFormater import ResponseFormatter
+from utils.contextPacker import ContextPacker
+from utils.records import FormattedResults
+from utils import tracing
 
 load_dotenv()
 
@@ -14,59 +18,120 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize models
-model = ModelFactory.get_model("gemini", os.getenv("GEMINI_API_KEY"), "gemini-1.5-flash")
+PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "final_response" / "final_prompt.txt"
 
-def generate_final_prompt(raw_results: dict, user_query: str) -> str:
-    """Generate LLM-ready prompt with formatted search results"""
-    try:
-        # Format results for LLM consumption
-        formatter = ResponseFormatter(raw_results, max_content_length=4000)
-        formatted_results = formatter.format_for_llm()
+context_packer = ContextPacker(token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")))
+
+def get_default_model() -> BaseModel:
+    """Shared Gemini client, created on first use rather than at import time"""
+    return ModelFactory.get_shared_model("gemini", os.getenv("GEMINI_API_KEY"), "gemini-1.5-flash")
+
+@lru_cache(maxsize=None)
+def load_final_template(prompt_path: Path = PROMPT_PATH) -> str:
+    """Read the final response template once per process"""
+    if not prompt_path.exists():
+        raise FileNotFoundError(f"Prompt template not found at {prompt_path}")
         
-        # Validate formatted results
-        if not formatted_results.get('organic_results'):
-            logger.warning("No organic results found in formatted data")
-            
-        # Load prompt template
-        prompt_path = Path(__file__).parent.parent / "prompts" / "final_response" / "final_prompt.txt"
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"Prompt template not found at {prompt_path}")
-            
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            template = f.read()
-
-        # Create structured context
-        context = {
-            "query": user_query,
-            "sources": [
-                {
-                    "domain": result["domain"],
-                    "key_points": result["content"]["key_points"],
-                    "main_content": result["content"]["main_content"][:3]  # First 3 paragraphs
-                } 
-                for result in formatted_results.get("organic_results", [])[:5]  # Top 5 results
-            ],
-            "related_questions": formatted_results.get("related_questions", [])[:3],
-            "freshness": formatted_results.get("metadata", {}).get("processing_date")
-        }
-
-        # Generate final prompt
-        llm_prompt = template.format(
-            context=json.dumps(context, indent=2),
-            query=user_query
-        )
-
-        logger.debug(f"Generated LLM prompt length: {len(llm_prompt)} characters")
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def _as_formatted(results: Union[FormattedResults, Dict]) -> FormattedResults:
+    """Accept formatting-stage output directly; only raw routed results are formatted here"""
+    if isinstance(results, FormattedResults):
+        return results
+    if 'organic_results' in results or 'metadata' in results:
+        return FormattedResults.from_dict(results)
+    return ResponseFormatter(results, max_content_length=4000).format()
+
+def _build_llm_prompt(formatted_results: Union[FormattedResults, Dict], user_query: str) -> str:
+    """Fill the final response template with the packed search results"""
+    formatted_results = _as_formatted(formatted_results)
+    
+    # Validate formatted results
+    if not formatted_results.organic_results:
+        logger.warning("No organic results found in formatted data")
+        
+    template = load_final_template()
+
+    # Pack the most relevant content into the token budget
+    with tracing.span("pack") as span:
+        context, stats = context_packer.pack(formatted_results, user_query)
+        span.set(estimated_tokens=stats["estimated_tokens"], sources=stats["sources"])
+
+    # Generate final prompt
+    llm_prompt = template.format(
+        context=context,
+        query=user_query
+    )
+
+    logger.debug(f"Generated LLM prompt length: {len(llm_prompt)} characters")
+    return llm_prompt
+
+def generate_final_prompt(formatted_results: Union[FormattedResults, Dict], user_query: str,
+                          model: Optional[BaseModel] = None,
+                          metrics: Optional[Dict] = None) -> str:
+    """Generate the final answer from formatted search results
+
+    Args:
+        formatted_results: Output of ResponseFormatter.format (or its dict form);
+            raw routed results are still accepted and formatted once
+        user_query: The user's original query
+        model: Model to use; defaults to the shared Gemini client
+        metrics: Optional dict that receives 'error' when the answer could not be
+            generated (the returned text is then an error message, not an answer)
+    """
+    try:
+        llm_prompt = _build_llm_prompt(formatted_results, user_query)
 
         # Get model response with error handling
-        response = model.generate_content(llm_prompt)
-        return _parse_model_response(response)
+        with tracing.span("final", prompt_chars=len(llm_prompt)) as span:
+            response = (model or get_default_model()).generate_content(llm_prompt)
+            answer = _parse_model_response(response)
+            span.set(response_chars=len(answer))
+        return answer
 
     except Exception as e:
         logger.error(f"Prompt generation failed: {str(e)}")
+        if metrics is not None:
+            metrics["error"] = str(e)
         return f"Error processing request: {str(e)}"
 
+def generate_final_prompt_stream(formatted_results: Union[FormattedResults, Dict], user_query: str,
+                                 metrics: Optional[Dict] = None,
+                                 model: Optional[BaseModel] = None) -> Iterator[str]:
+    """Streaming variant of generate_final_prompt that yields text as it is generated
+
+    Args:
+        formatted_results: Search results, as for generate_final_prompt
+        user_query: The user's original query
+        metrics: Optional dict that receives 'time_to_first_token' and
+            'total_time' (seconds, measured from the call), plus 'error' when
+            generation failed and an error message was yielded instead
+        model: Model to use; defaults to the shared Gemini client
+    """
+    metrics = metrics if metrics is not None else {}
+    started = time.perf_counter()
+    try:
+        llm_prompt = _build_llm_prompt(formatted_results, user_query)
+
+        with tracing.span("final", prompt_chars=len(llm_prompt), stream=True) as span:
+            response_chars = 0
+            for chunk in (model or get_default_model()).stream_content(llm_prompt):
+                if "time_to_first_token" not in metrics:
+                    metrics["time_to_first_token"] = time.perf_counter() - started
+                    logger.info(f"Time to first token: {metrics['time_to_first_token']:.3f}s")
+                    span.set(time_to_first_token_ms=round(metrics["time_to_first_token"] * 1000, 3))
+                response_chars += len(chunk)
+                yield chunk
+            span.set(response_chars=response_chars)
+
+    except Exception as e:
+        logger.error(f"Prompt generation failed: {str(e)}")
+        metrics["error"] = str(e)
+        yield f"Error processing request: {str(e)}"
+    finally:
+        metrics["total_time"] = time.perf_counter() - started
+
 def _parse_model_response(response) -> str:
     """Handle different model response formats uniformly"""
     try:
@@ -0,0 +1,171 @@
+"""
+Build and update the local Varanasi index the router can answer from.
+
+Sources are Wikipedia article titles (fetched with Wikipedia-API) or web page
+URLs (fetched with the Scraper). Each is split into passages of a few
+paragraphs, stored in the corpus file, and the BM25 index is rebuilt when
+anything changed. Sources already in the corpus are skipped unless --refresh
+is given, and a refreshed source whose content is unchanged leaves the index
+untouched.
+
+Usage:
+    python -m main.local_ingest                       # default Varanasi pages
+    python -m main.local_ingest --wiki "Assi Ghat" --url https://varanasi.nic.in/history/
+    python -m main.local_ingest --refresh             # re-fetch every stored source
+    python -m main.local_ingest --remove "wiki:Assi Ghat"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from tools.localIndex import LocalCorpus, LocalIndex
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIKI_PAGES = (
+    "Varanasi",
+    "Ghats in Varanasi",
+    "List of tourist attractions in Varanasi",
+    "Religion in Varanasi",
+    "Kashi Vishwanath Temple",
+    "Dashashwamedh Ghat",
+    "Manikarnika Ghat",
+    "Assi Ghat",
+    "Harishchandra Ghat",
+    "Sankat Mochan Hanuman Temple",
+    "Durga Temple, Varanasi",
+    "Tulsi Manas Mandir",
+    "Sarnath",
+    "Ramnagar Fort",
+    "Banaras Hindu University",
+    "Dev Deepawali",
+    "Ganga Aarti",
+)
+PARAGRAPHS_PER_PASSAGE = 4
+MAX_PASSAGE_CHARS = 1500
+USER_AGENT = "varanasi-rag-local-ingest/1.0"
+
+
+def _passages(section: str, paragraphs: List[str]) -> List[Dict]:
+    """Group a section's paragraphs into passages of bounded size"""
+    passages, current, size = [], [], 0
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and (len(current) >= PARAGRAPHS_PER_PASSAGE or size + len(paragraph) > MAX_PASSAGE_CHARS):
+            passages.append({"section": section, "paragraphs": current})
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+    if current:
+        passages.append({"section": section, "paragraphs": current})
+    return passages
+
+
+def fetch_wikipedia(title: str, language: str = "en") -> Optional[Tuple[str, str, List[Dict]]]:
+    """(title, url, passages) of a Wikipedia article, section by section"""
+    import wikipediaapi
+
+    wiki = wikipediaapi.Wikipedia(user_agent=USER_AGENT, language=language,
+                                  extract_format=wikipediaapi.ExtractFormat.WIKI)
+    page = wiki.page(title)
+    if not page.exists():
+        return None
+
+    passages = _passages("", page.summary.split("\n"))
+
+    def walk(sections, prefix=""):
+        for section in sections:
+            name = f"{prefix}{section.title}"
+            passages.extend(_passages(name, section.text.split("\n")))
+            walk(section.sections, prefix=f"{name} / ")
+
+    walk(page.sections)
+    return page.title, page.fullurl, passages
+
+
+def fetch_url(url: str) -> Optional[Tuple[str, str, List[Dict]]]:
+    """(title, url, passages) of a web page, paragraphs grouped under the page title"""
+    from tools.scraperTool import Scraper
+
+    content = Scraper().get_website_content(url, max_paragraphs=200, max_headings=0,
+                                            fields=("paragraphs", "domain_info"))
+    if not content.get("paragraphs"):
+        return None
+    title = content.get("domain_info", {}).get("title") or url
+    return title, url, _passages("", content["paragraphs"])
+
+
+def ingest(corpus: LocalCorpus, sources: List[str], refresh: bool = False) -> Dict[str, int]:
+    """Fetch new (or, with refresh, all) sources into the corpus; returns counts per outcome"""
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    for source in sources:
+        if source in corpus and not refresh:
+            stats["skipped"] += 1
+            continue
+        kind, _, name = source.partition(":")
+        try:
+            fetched = fetch_wikipedia(name) if kind == "wiki" else fetch_url(name)
+        except Exception as e:
+            logger.warning(f"Could not fetch {source}: {str(e)}")
+            stats["failed"] += 1
+            continue
+        if fetched is None:
+            logger.warning(f"No content for {source}")
+            stats["failed"] += 1
+            continue
+        title, url, passages = fetched
+        digest = hashlib.sha256(json.dumps(passages, sort_keys=True).encode("utf-8")).hexdigest()
+        existed = source in corpus
+        if corpus.upsert(source, title, url, passages, digest):
+            stats["updated" if existed else "added"] += 1
+            logger.info(f"Ingested {source}: {len(passages)} passages")
+        else:
+            stats["unchanged"] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wiki", action="append", default=[], help="Wikipedia article title (repeatable)")
+    parser.add_argument("--url", action="append", default=[], help="Web page URL (repeatable)")
+    parser.add_argument("--remove", action="append", default=[], help="Source id to drop, e.g. wiki:Sarnath")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch sources already in the corpus")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if nothing changed")
+    parser.add_argument("--index", default=os.getenv("LOCAL_INDEX_PATH", ".cache/local_index/index"),
+                        help="Index directory (default: LOCAL_INDEX_PATH)")
+    parser.add_argument("--corpus", help="Corpus JSONL (default: corpus.jsonl next to the index)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    index_dir = Path(args.index)
+    corpus = LocalCorpus(args.corpus or str(index_dir.parent / "corpus.jsonl"))
+
+    sources = [f"wiki:{title}" for title in args.wiki] + [f"url:{url}" for url in args.url]
+    if not sources and not args.remove:
+        # Nothing named: ingest the default pages, or refresh everything already stored
+        sources = list(corpus.sources) if args.refresh and corpus.sources else \
+            [f"wiki:{title}" for title in DEFAULT_WIKI_PAGES]
+
+    stats = ingest(corpus, sources, refresh=args.refresh)
+    stats["removed"] = sum(corpus.remove(source) for source in args.remove)
+    changed = stats["added"] + stats["updated"] + stats["removed"]
+    if changed:
+        corpus.save()
+    if changed or args.rebuild or not (index_dir / "meta.json").exists():
+        index = LocalIndex.build(corpus.passages(), str(index_dir))
+        stats.update(passages=index.count, terms=len(index.lexicon))
+        index.close()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+import os
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+from models.base import BaseModel
+from models.factory import ModelFactory
+from translator.queryTranslator import Translator
+from keywords_Segregator.segregator import Segregator
+from keywords_Segregator.canonicalizer import canonicalize
+from queryPlanner.planner import QueryPlanner
+from queryRouter.router import QueryRouter
+from tools.scraperTool import Scraper
+from utils.responseFormater import ResponseFormatter
+from utils.records import FormattedResults
+from utils import tracing
+from utils import singleflight
+from main.final_response import generate_final_prompt, generate_final_prompt_stream, load_final_template
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+
+class PipelineEngine:
+    """
+    Long-lived query pipeline shared by every session in the process.
+
+    Model clients, the Serper router, the scraper and prompt templates are built
+    once; a request only allocates its own intermediate results.
+    """
+
+    def __init__(self, api_key: Optional[str] = None,
+                 serper_api_key: Optional[str] = None,
+                 model_type: str = "gemini",
+                 model_name: str = "gemini-1.5-flash",
+                 query_pipeline: Optional[str] = None,
+                 model: Optional[BaseModel] = None,
+                 router: Optional[QueryRouter] = None):
+        """
+        :param api_key: LLM API key (defaults to GEMINI_API_KEY).
+        :param serper_api_key: Serper API key (defaults to SERPER_API_KEY).
+        :param model_type: model backend passed to ModelFactory.
+        :param model_name: model used by every LLM stage.
+        :param query_pipeline: "two_stage" (Translator -> Segregator) or "planner"
+            (one fused call); defaults to QUERY_PIPELINE.
+        :param model: model shared by every LLM stage, e.g. a rate-limited wrapper;
+            defaults to the process-wide client for model_type/model_name, hedged
+            onto the "type:name" backups in HEDGE_MODELS when that is set.
+        :param router: preconfigured QueryRouter; one is built from serper_api_key otherwise.
+        """
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.query_pipeline = (query_pipeline or os.getenv("QUERY_PIPELINE", "two_stage")).lower()
+
+        # One client per process, shared by every LLM stage
+        hedges = os.getenv("HEDGE_MODELS")
+        if model is None and hedges:
+            model = ModelFactory.get_hedged_model(model_type, api_key, model_name, hedges)
+        self.model = model or ModelFactory.get_shared_model(model_type, api_key, model_name)
+        self.translator = Translator(
+            api_key, model_type, model_name,
+            PROMPTS_DIR / "translator" / "translator_prompt.txt",
+            model=self.model
+        )
+        self.segregator = Segregator(
+            api_key, model_type, model_name,
+            PROMPTS_DIR / "query_router" / "query_keywords_seggregator.txt",
+            model=self.model
+        )
+        self.planner = QueryPlanner(
+            api_key, model_type, model_name,
+            PROMPTS_DIR / "query_planner" / "planner_prompt.txt",
+            model=self.model
+        )
+        self.router = router or QueryRouter(serper_api_key=serper_api_key or os.getenv("SERPER_API_KEY"))
+        self.scraper = Scraper()
+        self._research_flight = singleflight.group("research")
+        self._answer_flight = singleflight.group("answer")
+        self._warm = False
+
+    def warm_up(self, ping_model: bool = False) -> None:
+        """
+        Load prompt templates and open caches and pools before the first request.
+
+        :param ping_model: also send a tiny generation to establish the model connection.
+        """
+        started = time.perf_counter()
+        for stage in (self.translator, self.segregator, self.planner):
+            stage.load_prompt_template()
+        load_final_template()
+        self.router.serper_client.cache_stats()
+        if ping_model:
+            try:
+                self.model.generate_content("ping")
+            except Exception as e:
+                logger.warning(f"Model warm-up failed: {str(e)}")
+        self._warm = True
+        logger.info(f"Pipeline warm-up took {time.perf_counter() - started:.3f}s")
+
+    def plan(self, user_input: str):
+        """Turn the raw user input into router keywords using the configured pipeline"""
+        started = time.perf_counter()
+        if self.query_pipeline == "planner":
+            keywords = self.planner.plan(user_input)
+        else:
+            restructured_query = self.translator.translate_query(user_input)
+            keywords = self.segregator.keywords_seggregator(restructured_query)
+
+        logger.info(f"Query planning ({self.query_pipeline}) took {time.perf_counter() - started:.3f}s: {keywords}")
+        return keywords
+
+    def _flight_key(self, user_input: str) -> Tuple[int, str, str]:
+        """Identical questions, ignoring case and spacing, on this engine"""
+        return id(self), self.query_pipeline, " ".join(user_input.lower().split())
+
+    def research(self, user_input: str) -> Tuple[Dict, FormattedResults]:
+        """
+        Plan, search and scrape for a query; each stage runs exactly once.
+
+        Concurrent calls for the same question share one run, so the results
+        must be treated as read-only.
+
+        :return: (raw routed results, formatted results records)
+        """
+        (raw_results, formatted_results), shared = self._research_flight.do(
+            self._flight_key(user_input), self._research, user_input
+        )
+        if shared:
+            logger.info(f"Reused in-flight research for: {user_input}")
+        return raw_results, formatted_results
+
+    def _research(self, user_input: str) -> Tuple[Dict, FormattedResults]:
+        keywords = self.plan(user_input)
+        raw_results = self.route(keywords)
+        return raw_results, self.format(raw_results)
+
+    def route(self, keywords) -> Dict:
+        """Canonicalize planned keywords, then fetch them, logging the Serper calls saved"""
+        keywords, report = canonicalize(keywords)
+        raw_results = self.router.route_keywords(keywords, report=report)
+        logger.info(
+            f"Routing saved {report['calls_saved']} Serper calls "
+            f"({report['keywords_in'] - report['keywords_out']} merged keywords, "
+            f"{report.get('local_hits', 0)} local hits, "
+            f"{report.get('images_from_search', 0)} image lookups served by search)"
+        )
+        return raw_results
+
+    def format(self, raw_results: Dict) -> FormattedResults:
+        """Scrape and structure routed results with the shared scraper"""
+        return ResponseFormatter(raw_results, scraper=self.scraper).format()
+
+    def compose(self, formatted_results: FormattedResults, user_input: str) -> Dict:
+        """
+        Generate the answer for researched results, with its sources and images.
+
+        When generation fails, "content" holds the error message shown to the user
+        and "error" is set, so callers do not cache or count it as an answer.
+        """
+        metrics: Dict = {}
+        result = {
+            "content": generate_final_prompt(formatted_results, user_input, model=self.model, metrics=metrics),
+            "sources": [source.to_dict() for source in formatted_results.organic_results[:3]],
+            "images": [image.to_dict() for image in formatted_results.image_results[:6]]
+        }
+        if "error" in metrics:
+            result["error"] = metrics["error"]
+        return result
+
+    def answer(self, user_input: str) -> Dict:
+        """
+        Run the full pipeline and return the answer with its sources and images.
+
+        Concurrent calls for the same question share one answer (treat it as read-only).
+        """
+        with tracing.trace("ask", query=user_input, pipeline=self.query_pipeline):
+            result, shared = self._answer_flight.do(self._flight_key(user_input), self._answer, user_input)
+            tracing.annotate(coalesced=shared)
+            return result
+
+    def _answer(self, user_input: str) -> Dict:
+        _, formatted_results = self.research(user_input)
+        return self.compose(formatted_results, user_input)
+
+    def answer_stream(self, formatted_results: FormattedResults, user_input: str,
+                      metrics: Optional[Dict] = None) -> Iterator[str]:
+        """Stream the final answer for already researched results"""
+        return generate_final_prompt_stream(formatted_results, user_input, metrics=metrics, model=self.model)
+
+
+_engine: Optional[PipelineEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(**kwargs) -> PipelineEngine:
+    """Process-wide engine, built on first use; kwargs only apply to that first build"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PipelineEngine(**kwargs)
+        return _engine
@@ -0,0 +1,422 @@
+"""
+ASGI service exposing the pipeline over HTTP.
+
+Endpoints:
+    POST /ask           {"question": "..."} -> answer, sources, images and
+                        ``responses`` ({title, snippet, link}) for streamlit_app.py
+    POST /ask/stream    same request; newline-delimited JSON events: one
+                        "sources" event, "token" events as the answer is
+                        generated, then "done" (or "error")
+    GET  /healthz       liveness and load
+    GET  /metrics       Prometheus text (service gauges, rate limits, parser and tracing metrics)
+
+The pipeline itself is blocking, so each request runs on a bounded thread
+pool. At most ASK_MAX_IN_FLIGHT requests run at once per worker process and
+at most ASK_MAX_QUEUE wait for a slot; further requests get 429 with
+Retry-After instead of piling up. Questions close enough to an earlier one
+(see utils.semanticCache) are answered from the answer cache without
+taking a slot.
+
+Set ASK_STUB=1 to serve stub models and a local Serper/page replay server
+(see benchmarks.stubs), which allows load testing without API keys.
+
+Usage:
+    python -m main.service [--host 0.0.0.0] [--port 8000] [--workers 2] [--stub]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from utils import tracing
+from utils import singleflight
+from utils import rateLimiter
+from utils.semanticCache import SemanticCache, get_answer_cache
+from keywords_Segregator import outputParser
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Overloaded(Exception):
+    pass
+
+
+def _stub_engine():
+    """Engine wired to stub models and an in-process replay server"""
+    from benchmarks.extractor_bench import PROJECT_ROOT, load_pages
+    from benchmarks.stubs import ReplayServer, load_recorded_payloads, stub_engine
+
+    recorded = load_recorded_payloads([PROJECT_ROOT / "results.json", PROJECT_ROOT / "main" / "results.json"])
+    server = ReplayServer(
+        recorded["search"], load_pages(), recorded["images"],
+        latency=float(os.getenv("ASK_STUB_NETWORK_LATENCY", "0.01"))
+    ).start()
+    return stub_engine(
+        server.url,
+        model_latency=float(os.getenv("ASK_STUB_MODEL_LATENCY", "0.05")),
+        final_latency=float(os.getenv("ASK_STUB_FINAL_LATENCY", "0.2"))
+    )
+
+
+def default_engine_factory():
+    if os.getenv("ASK_STUB", "0").lower() in ("1", "true", "yes"):
+        return _stub_engine()
+    from main.pipeline import get_engine
+    return get_engine()
+
+
+class AskService:
+    """Pure ASGI application; one instance per worker process"""
+
+    def __init__(self, engine_factory: Callable = default_engine_factory,
+                 max_in_flight: Optional[int] = None,
+                 max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None,
+                 answer_cache: Optional[SemanticCache] = None):
+        """
+        Args:
+            engine_factory: Builds the PipelineEngine on first use
+            max_in_flight: Requests processed concurrently (ASK_MAX_IN_FLIGHT, default 8)
+            max_queue: Requests allowed to wait for a slot (ASK_MAX_QUEUE, default 32)
+            queue_timeout: Seconds a queued request waits before 503 (ASK_QUEUE_TIMEOUT, default 30)
+            answer_cache: Cache answering near-duplicate questions without taking a slot;
+                defaults to the process-wide cache (off with SEMANTIC_CACHE=0)
+        """
+        self.engine_factory = engine_factory
+        self.max_in_flight = max_in_flight or int(os.getenv("ASK_MAX_IN_FLIGHT", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ASK_MAX_QUEUE", "32"))
+        self.queue_timeout = queue_timeout or float(os.getenv("ASK_QUEUE_TIMEOUT", "30"))
+        self.answer_cache = answer_cache or get_answer_cache()
+        self.stats = {"accepted": 0, "rejected": 0, "timed_out": 0, "failed": 0, "completed": 0, "cached": 0}
+        self.in_flight = 0
+        self.waiting = 0
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ask")
+
+    # -- engine and admission ---------------------------------------------
+
+    @property
+    def engine(self):
+        with self._engine_lock:
+            if self._engine is None:
+                self._engine = self.engine_factory()
+                self._engine.warm_up()
+            return self._engine
+
+    async def _run(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, tracing.propagate(fn), *args)
+
+    async def _admit(self) -> None:
+        """Take a processing slot, or raise Overloaded when the wait queue is full"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.stats["accepted"] += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    # -- ASGI plumbing -------------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route = (scope["method"], scope["path"].rstrip("/") or "/")
+        handlers = {
+            ("POST", "/ask"): self._ask,
+            ("POST", "/ask/stream"): self._ask_stream,
+            ("GET", "/healthz"): self._health,
+            ("GET", "/metrics"): self._metrics,
+        }
+        handler = handlers.get(route)
+        if handler is None:
+            status = 405 if any(path == route[1] for _, path in handlers) else 404
+            await self._json(send, status, {"error": "Method not allowed" if status == 405 else "Not found"})
+            return
+        await handler(receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    # Build clients, caches and pools before accepting traffic
+                    await self._run(lambda: self.engine)
+                except Exception as e:
+                    logger.error(f"Engine start-up failed: {str(e)}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _body(receive) -> bytes:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise ValueError("Request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _start(send, status: int, content_type: str, extra: Optional[List] = None) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode())] + (extra or [])
+        })
+
+    async def _json(self, send, status: int, payload: Dict, extra: Optional[List] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._start(send, status, "application/json", [(b"content-length", str(len(body)).encode())] + (extra or []))
+        await send({"type": "http.response.body", "body": body})
+
+    async def _question(self, receive, send) -> Optional[str]:
+        """Parse the request body, answering 400 and returning None when it is invalid"""
+        try:
+            payload = json.loads(await self._body(receive) or b"{}")
+            question = payload.get("question") or payload.get("query")
+        except (ValueError, AttributeError) as e:
+            await self._json(send, 400, {"error": f"Invalid request body: {str(e)}"})
+            return None
+        if not isinstance(question, str) or not question.strip():
+            await self._json(send, 400, {"error": "Field 'question' is required"})
+            return None
+        return question.strip()
+
+    async def _admit_or_reject(self, send) -> bool:
+        try:
+            await self._admit()
+            return True
+        except Overloaded:
+            await self._json(send, 429, {"error": "Too many requests, retry shortly"}, [(b"retry-after", b"1")])
+        except asyncio.TimeoutError:
+            await self._json(send, 503, {"error": "Timed out waiting for capacity"}, [(b"retry-after", b"5")])
+        return False
+
+    # -- handlers --------------------------------------------------------------
+
+    @staticmethod
+    def _responses(sources: List[Dict]) -> List[Dict]:
+        return [{"title": s["title"], "snippet": s["snippet"], "link": s["link"]} for s in sources]
+
+    def _cached(self, question: str) -> Optional[Dict]:
+        """Answer, sources and images stored for a near-duplicate question, if any"""
+        if self.answer_cache is None:
+            return None
+        hit = self.answer_cache.lookup(question)
+        if hit is None:
+            return None
+        self.stats["cached"] += 1
+        answer, similarity, _ = hit
+        return {**answer, "cache_similarity": round(similarity, 3)}
+
+    def _answer(self, question: str) -> Dict:
+        started = time.perf_counter()
+        # Copy: concurrent identical questions share the engine's answer dict
+        result = dict(self.engine.answer(question))
+        # A failed generation carries its error message as content; never serve that again
+        if self.answer_cache is not None and result.get("content") and not result.get("error"):
+            self.answer_cache.store(question, {key: result[key] for key in ("content", "sources", "images")})
+        result["responses"] = self._responses(result["sources"])
+        result["metrics"] = {"total_time": round(time.perf_counter() - started, 3)}
+        return result
+
+    async def _ask(self, receive, send) -> None:
+        question = await self._question(receive, send)
+        if question is None:
+            return
+        cached = self._cached(question)
+        if cached is not None:
+            cached["responses"] = self._responses(cached["sources"])
+            cached["metrics"] = {"total_time": 0.0, "cached": True}
+            await self._json(send, 200, cached)
+            return
+        if not await self._admit_or_reject(send):
+            return
+        try:
+            result = await self._run(self._answer, question)
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"/ask failed: {str(e)}")
+            await self._json(send, 500, {"error": str(e)})
+            return
+        finally:
+            self._release()
+        await self._json(send, 200, result)
+
+    def _research(self, question: str):
+        _, formatted_results = self.engine.research(question)
+        return formatted_results
+
+    async def _ask_stream(self, receive, send) -> None:
+        question = await self._question(receive, send)
+        if question is None:
+            return
+
+        async def event(payload: Dict) -> None:
+            line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+
+        cached = self._cached(question)
+        if cached is not None:
+            # Same events as a live answer, with the whole text in one token
+            await self._start(send, 200, "application/x-ndjson", [(b"cache-control", b"no-cache")])
+            await event({"type": "sources", "sources": cached["sources"],
+                         "responses": self._responses(cached["sources"]), "images": cached["images"]})
+            await event({"type": "token", "text": cached["content"]})
+            await event({"type": "done", "metrics": {"cached": True, "cache_similarity": cached["cache_similarity"]}})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if not await self._admit_or_reject(send):
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        producer = None
+        started = False
+
+        def pump(formatted_results, metrics: Dict) -> None:
+            # Drive the blocking generator on one worker thread and hand chunks to the event loop
+            try:
+                for chunk in self.engine.answer_stream(formatted_results, question, metrics=metrics):
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("token", chunk))
+                loop.call_soon_threadsafe(chunks.put_nowait, ("done", None))
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, ("error", e))
+
+        try:
+            with tracing.trace("ask_stream", query=question):
+                formatted_results = await self._run(self._research, question)
+                sources = [source.to_dict() for source in formatted_results.organic_results[:3]]
+                await self._start(send, 200, "application/x-ndjson", [(b"cache-control", b"no-cache")])
+                started = True
+                await event({
+                    "type": "sources",
+                    "sources": sources,
+                    "responses": self._responses(sources),
+                    "images": [image.to_dict() for image in formatted_results.image_results[:6]]
+                })
+
+                metrics: Dict = {}
+                producer = asyncio.ensure_future(self._run(pump, formatted_results, metrics))
+                text = []
+                while True:
+                    kind, value = await chunks.get()
+                    if kind == "token":
+                        text.append(value)
+                        await event({"type": "token", "text": value})
+                    elif kind == "done":
+                        await event({"type": "done", "metrics": metrics})
+                        break
+                    else:
+                        raise value
+                if self.answer_cache is not None and text and "error" not in metrics:
+                    self.answer_cache.store(question, {
+                        "content": "".join(text),
+                        "sources": sources,
+                        "images": [image.to_dict() for image in formatted_results.image_results[:6]]
+                    })
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"/ask/stream failed: {str(e)}")
+            if not started:
+                await self._json(send, 500, {"error": str(e)})
+                return
+            await event({"type": "error", "error": str(e)})
+        finally:
+            if producer is not None:
+                # Keep the slot until generation stops, even if the client went away
+                await asyncio.gather(producer, return_exceptions=True)
+            self._release()
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _health(self, receive, send) -> None:
+        await self._json(send, 200, {
+            "status": "ok",
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "answer_cache": self.answer_cache.summary() if self.answer_cache is not None else None
+        })
+
+    async def _metrics(self, receive, send) -> None:
+        lines = [
+            "# HELP ask_in_flight Requests being processed",
+            "# TYPE ask_in_flight gauge",
+            f"ask_in_flight {self.in_flight}",
+            "# HELP ask_waiting Requests waiting for a processing slot",
+            "# TYPE ask_waiting gauge",
+            f"ask_waiting {self.waiting}",
+            "# HELP ask_requests_total Requests by outcome",
+            "# TYPE ask_requests_total counter",
+            *(f'ask_requests_total{{outcome="{key}"}} {value}' for key, value in self.stats.items()),
+        ]
+        body = ("\n".join(lines) + "\n" + singleflight.prometheus_text()
+                + rateLimiter.prometheus_text() + outputParser.prometheus_text() + tracing.prometheus_text()).encode("utf-8")
+        await self._start(send, 200, "text/plain; version=0.0.4", [(b"content-length", str(len(body)).encode())])
+        await send({"type": "http.response.body", "body": body})
+
+
+app = AskService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("ASK_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ASK_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ASK_WORKERS", "1")),
+                        help="Worker processes, each with its own engine and limits")
+    parser.add_argument("--stub", action="store_true", help="Serve stub models and replayed search results")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.stub:
+        # Inherited by the worker processes uvicorn spawns
+        os.environ["ASK_STUB"] = "1"
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run("main.service:app", host=args.host, port=args.port, workers=args.workers,
+                lifespan="on", log_level="info")
+
+
+if __name__ == "__main__":
+    main()
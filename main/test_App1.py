@@ -19,20 +19,21 @@ sys.path.insert(0, PROJECT_ROOT)
 sys.path.append(os.path.abspath(r"D:\Projects\Serious_Banarasia"))
 
 # Rest of imports
-from translator.queryTranslator import Translator
-from queryRouter.router import QueryRouter
-from main.final_response import generate_final_prompt
-from models.factory import ModelFactory
-from keywords_Segregator.segregator import Segregator
-from utils.responseFormater import ResponseFormatter
+from main.pipeline import get_engine
+from utils import tracing
+from utils.semanticCache import get_answer_cache
 
 # 3. THEN SET OTHER CONFIGURATIONS
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini Model
-model = ModelFactory.get_model("gemini", os.getenv("gemini_api"), "gemini-1.5-flash")
+# Pipeline engine shared by all sessions; QUERY_PIPELINE selects "two_stage" or "planner"
+@st.cache_resource
+def load_engine():
+    engine = get_engine()
+    engine.warm_up()
+    return engine
 
 # Custom CSS for Perplexity-like interface
 
@@ -171,51 +172,62 @@ def main():
     if submit_button and user_input:
         st.session_state.chat_history.append({"type": "user", "content": user_input})
         
-        with st.spinner("🔍 Researching your query..."):
-            try:
-                # Initialize components
-                tslr = Translator(os.getenv("GEMINI_API_KEY"), "gemini", "gemini-1.5-flash")
-                sgr = Segregator(
-                    os.getenv("GEMINI_API_KEY"), 
-                    "gemini", 
-                    "gemini-1.5-flash",
-                    Path(__file__).parent.parent / "prompts" / "query_router" / "query_keywords_seggregator.txt"
-                )
-                
-                # Process query
-                restructured_query = tslr.translate_query(user_input)
-                keywords = sgr.keywords_seggregator(restructured_query)
-                
-                # Route keywords and format results
-                router = QueryRouter(serper_api_key=os.getenv("SERPER_API_KEY"))
-                raw_results = router.route_keywords(keywords)
-                
-                # Format for LLM
-                formatter = ResponseFormatter(raw_results)
-                formatted_results = formatter.format_for_llm()
-                
-                # Generate final response
-                ai_response = generate_final_prompt(formatted_results, user_input)
-                
-                # Add to chat history
-                response_entry = {
-                    "type": "ai",
-                    "content": ai_response,
-                    "sources": formatted_results.get("organic_results", [])[:3],
-                    "images": formatted_results.get("image_results", [])[:6]
-                }
-                
-                st.session_state.chat_history.append(response_entry)
+        try:
+            # Near-duplicates of an answered question reuse its answer, sources and images
+            answer_cache = get_answer_cache()
+            cached = answer_cache.lookup(user_input) if answer_cache is not None else None
+            if cached is not None:
+                answer, similarity, matched = cached
+                logger.info(f"Semantic cache hit ({similarity:.2f}) for: {user_input} ~ {matched}")
+                st.session_state.chat_history.append({"type": "ai", **answer, "metrics": {"cached": True}})
                 st.rerun()
+
+            # One trace per question when TRACING is enabled
+            with tracing.trace("ask", query=user_input):
+                with st.spinner("🔍 Researching your query..."):
+                    # Plan, search and format results on the shared engine
+                    engine = load_engine()
+                    raw_results, formatted_results = engine.research(user_input)
                 
-            except Exception as e:
-                logger.error(f"Error processing query: {str(e)}")
-                st.error(f"An error occurred: {str(e)}")
-                st.session_state.chat_history.append({
-                    "type": "ai",
-                    "content": f"Sorry, I encountered an error: {str(e)}"
+                # Stream the final response into the chat as tokens arrive
+                stream_metrics = {}
+                with chat_container:
+                    ai_response = st.write_stream(
+                        engine.answer_stream(formatted_results, user_input, metrics=stream_metrics)
+                    )
+            logger.info(
+                f"Final response: time to first token "
+                f"{stream_metrics.get('time_to_first_token', float('nan')):.3f}s, "
+                f"total {stream_metrics.get('total_time', float('nan')):.3f}s"
+            )
+            
+            # Add to chat history
+            response_entry = {
+                "type": "ai",
+                "content": ai_response,
+                "sources": [source.to_dict() for source in formatted_results.organic_results[:3]],
+                "images": [image.to_dict() for image in formatted_results.image_results[:6]],
+                "metrics": stream_metrics
+            }
+            
+            st.session_state.chat_history.append(response_entry)
+            # A failed generation streams an error message; only real answers are cached
+            if answer_cache is not None and ai_response and "error" not in stream_metrics:
+                answer_cache.store(user_input, {
+                    "content": ai_response,
+                    "sources": response_entry["sources"],
+                    "images": response_entry["images"]
                 })
-                st.rerun()
+            st.rerun()
+            
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            st.error(f"An error occurred: {str(e)}")
+            st.session_state.chat_history.append({
+                "type": "ai",
+                "content": f"Sorry, I encountered an error: {str(e)}"
+            })
+            st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
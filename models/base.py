@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class BaseModel(ABC):
     @abstractmethod
     def generate_content(self, prompt: str) -> str:
         """Generate content based on the prompt."""
         pass
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """Yield generated text chunks as they arrive.
+
+        Backends without native streaming yield the whole response as one chunk.
+        """
+        yield self.generate_content(prompt)
@@ -1,7 +1,14 @@
+import threading
 from .gemini import GeminiModel
 from .openai import ModelOpenAI
+from .hedged import HedgedModel
+from .rateLimited import RateLimitedModel
+from utils.rateLimiter import get_limiter
 
 class ModelFactory:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
     @staticmethod
     def get_model(model_type: str, api_key: str, model_name: str):
         if model_type.lower() == "gemini":
@@ -13,3 +20,43 @@ class ModelFactory:
             return ModelOpenAI(model_name, api_key)
         else:
             raise ValueError(f"Unsupported model type: {model_type}")
+
+    @classmethod
+    def get_shared_model(cls, model_type: str, api_key: str, model_name: str):
+        """
+        Return one long-lived client per (type, key, name) for the whole process.
+
+        Shared clients queue on their provider's process-wide limiter (see utils.rateLimiter).
+        """
+        key = (model_type.lower(), api_key, model_name)
+        with cls._shared_lock:
+            model = cls._shared.get(key)
+            if model is None:
+                model = RateLimitedModel(cls.get_model(model_type, api_key, model_name),
+                                         get_limiter(model_type))
+                cls._shared[key] = model
+            return model
+
+    @classmethod
+    def get_hedged_model(cls, model_type: str, api_key: str, model_name: str, hedges: str):
+        """
+        Process-wide HedgedModel: the primary model backed by the "type:name" models in hedges.
+
+        hedges is a comma-separated list such as "openai:gpt-4o-mini,gemini:gemini-1.5-pro".
+        Gemini backups reuse api_key; OpenAI backups read OPENAI_API_KEY.
+        """
+        specs = [spec.strip().split(":", 1) for spec in hedges.split(",") if spec.strip()]
+        key = ("hedged", model_type.lower(), api_key, model_name, tuple(tuple(spec) for spec in specs))
+        with cls._shared_lock:
+            model = cls._shared.get(key)
+        if model is not None:
+            return model
+
+        backends = [cls.get_shared_model(model_type, api_key, model_name)]
+        names = [f"{model_type.lower()}:{model_name}"]
+        for backup_type, backup_name in specs:
+            backup_key = api_key if backup_type.lower() == "gemini" else None
+            backends.append(cls.get_shared_model(backup_type, backup_key, backup_name))
+            names.append(f"{backup_type.lower()}:{backup_name}")
+        with cls._shared_lock:
+            return cls._shared.setdefault(key, HedgedModel(backends, names=names))
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+from typing import Iterator
 import google.generativeai as genai
 from .base import BaseModel
 
@@ -30,3 +31,16 @@ class GeminiModel(BaseModel):
         response = self.model.generate_content([prompt])
         
         return response.text
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        
+        response = self.model.generate_content([prompt], stream=True)
+        
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety-only chunk)
+                continue
+            if text:
+                yield text
@@ -0,0 +1,329 @@
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Sequence
+import logging
+import queue
+import threading
+import time
+from .base import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Log-spaced latency histogram (50 ms .. ~2 min) with percentile estimates"""
+
+    BOUNDS = tuple(0.05 * 1.25 ** i for i in range(36))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+            self.total += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile, or None without samples"""
+        with self._lock:
+            if not self.total:
+                return None
+            rank = q / 100 * self.total
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+            return self.BOUNDS[-1]
+
+
+class CircuitBreaker:
+    """
+    Stop calling a backend after consecutive failures.
+
+    After ``failure_threshold`` failures in a row the circuit opens and the
+    backend is skipped; once ``reset_timeout`` has passed a single trial call
+    is allowed (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_abandoned(self) -> None:
+        """A call was cancelled before it finished: free the trial slot without judging the backend"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class _Backend:
+    def __init__(self, name: str, model: BaseModel, breaker: CircuitBreaker):
+        self.name = name
+        self.model = model
+        self.breaker = breaker
+        self.latency = LatencyHistogram()
+        self.first_chunk = LatencyHistogram()
+        self.stats = {"calls": 0, "wins": 0, "hedges": 0, "failures": 0, "cancelled": 0}
+        self.lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+
+class HedgedModel(BaseModel):
+    """
+    Composite model that hedges slow calls onto backup backends.
+
+    The first available backend gets the request. If it has not answered
+    after its adaptive hedge delay (the ``hedge_percentile`` of its recent
+    latency, clamped to [min_delay, max_delay]), or fails, the same prompt is
+    sent to the next backend; the first successful answer wins and the other
+    call is abandoned (streams are closed, blocking calls are discarded).
+    Backends that keep failing are skipped by a per-backend circuit breaker.
+    """
+
+    def __init__(self, backends: Sequence[BaseModel], names: Optional[Sequence[str]] = None,
+                 hedge_percentile: float = 95.0, initial_delay: float = 2.0,
+                 min_delay: float = 0.25, max_delay: float = 10.0, min_samples: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, max_workers: int = 16):
+        """
+        Args:
+            backends: Models in preference order; the first is the primary
+            names: Labels used in stats and logs (default: position and class name)
+            hedge_percentile: Latency percentile after which a hedge is sent
+            initial_delay: Hedge delay used until a backend has min_samples calls
+            min_delay: Lower bound for the hedge delay
+            max_delay: Upper bound for the hedge delay
+            min_samples: Samples required before the percentile is trusted
+            failure_threshold: Consecutive failures that open a backend's circuit
+            reset_timeout: Seconds before an open circuit allows a trial call
+            max_workers: Threads available for in-flight backend calls
+        """
+        if len(backends) < 1:
+            raise ValueError("HedgedModel needs at least one backend")
+        names = list(names or [f"{index}:{type(model).__name__}" for index, model in enumerate(backends)])
+        self.backends = [
+            _Backend(name, model, CircuitBreaker(failure_threshold, reset_timeout))
+            for name, model in zip(names, backends)
+        ]
+        self.hedge_percentile = hedge_percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def _delay(self, histogram: LatencyHistogram) -> float:
+        if histogram.total < self.min_samples:
+            return self.initial_delay
+        estimate = histogram.percentile(self.hedge_percentile)
+        return min(self.max_delay, max(self.min_delay, estimate))
+
+    @staticmethod
+    def _next_allowed(candidates: List[_Backend]) -> Optional[_Backend]:
+        """Pop the next backend whose circuit admits a call; breakers are only asked when needed"""
+        while candidates:
+            backend = candidates.pop(0)
+            if backend.breaker.allow():
+                return backend
+        return None
+
+    # -- blocking calls ------------------------------------------------------
+
+    def _call(self, backend: _Backend, prompt: str) -> str:
+        backend.count("calls")
+        started = time.perf_counter()
+        try:
+            result = backend.model.generate_content(prompt)
+        except Exception:
+            backend.count("failures")
+            backend.breaker.record_failure()
+            raise
+        backend.latency.record(time.perf_counter() - started)
+        backend.breaker.record_success()
+        return result
+
+    def generate_content(self, prompt: str) -> str:
+        candidates = list(self.backends)
+        running = {}
+        errors = []
+
+        def launch() -> bool:
+            backend = self._next_allowed(candidates)
+            if backend is None:
+                return False
+            if running or errors:
+                backend.count("hedges")
+            running[self._executor.submit(self._call, backend, prompt)] = backend
+            return True
+
+        if not launch():
+            raise RuntimeError("All model backends are unavailable (circuits open)")
+        while running:
+            newest = list(running.values())[-1]
+            timeout = self._delay(newest.latency) if candidates else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow: hedge onto the next backend and keep waiting for both
+                launch()
+                continue
+            for future in done:
+                backend = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{backend.name}: {str(e)}")
+                    launch()
+                    continue
+                backend.count("wins")
+                for loser_future, loser in running.items():
+                    # Threads cannot be interrupted; the losing answer is discarded.
+                    # A call cancelled before it started never reports to its breaker.
+                    if loser_future.cancel():
+                        loser.breaker.record_abandoned()
+                    loser.count("cancelled")
+                return result
+        raise RuntimeError(f"All model backends failed: {'; '.join(errors)}")
+
+    # -- streaming -------------------------------------------------------------
+
+    def _pump(self, index: int, backend: _Backend, prompt: str,
+              events: queue.Queue, cancel: threading.Event) -> None:
+        """Read one backend's stream into the shared event queue until done or cancelled"""
+        backend.count("calls")
+        started = time.perf_counter()
+        stream = None
+        first = True
+        try:
+            stream = backend.model.stream_content(prompt)
+            for chunk in stream:
+                if cancel.is_set():
+                    backend.breaker.record_abandoned()
+                    break
+                if first:
+                    backend.first_chunk.record(time.perf_counter() - started)
+                    first = False
+                events.put((index, "chunk", chunk))
+            else:
+                backend.latency.record(time.perf_counter() - started)
+                backend.breaker.record_success()
+                events.put((index, "done", None))
+        except Exception as e:
+            backend.count("failures")
+            backend.breaker.record_failure()
+            events.put((index, "error", e))
+        finally:
+            # Closing the generator lets the backend release its HTTP stream
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """Hedge on time to first chunk; once a backend produces text, only it is streamed"""
+        candidates = list(self.backends)
+        events: queue.Queue = queue.Queue()
+        launched: List[_Backend] = []
+        cancels: List[threading.Event] = []
+        errors = []
+
+        def launch() -> bool:
+            backend = self._next_allowed(candidates)
+            if backend is None:
+                return False
+            if launched:
+                backend.count("hedges")
+            cancel = threading.Event()
+            launched.append(backend)
+            cancels.append(cancel)
+            self._executor.submit(self._pump, len(launched) - 1, backend, prompt, events, cancel)
+            return True
+
+        if not launch():
+            raise RuntimeError("All model backends are unavailable (circuits open)")
+        active = 1
+        winner = None
+        try:
+            while True:
+                timeout = None
+                if winner is None and candidates:
+                    timeout = self._delay(launched[-1].first_chunk)
+                try:
+                    index, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    active += launch()
+                    continue
+
+                if winner is not None and index != winner:
+                    continue
+                if kind == "error":
+                    if winner is not None:
+                        raise value
+                    errors.append(f"{launched[index].name}: {str(value)}")
+                    active -= 1
+                    active += launch()
+                    if not active:
+                        raise RuntimeError(f"All model backends failed: {'; '.join(errors)}")
+                    continue
+                if winner is None:
+                    winner = index
+                    launched[index].count("wins")
+                    for other, cancel in enumerate(cancels):
+                        if other != index:
+                            cancel.set()
+                            launched[other].count("cancelled")
+                if kind == "done":
+                    return
+                yield value
+        finally:
+            for cancel in cancels:
+                cancel.set()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-backend counters, circuit state and latency percentiles (seconds)"""
+        return {
+            backend.name: {
+                **backend.stats,
+                "circuit": backend.breaker.state,
+                "p50": backend.latency.percentile(50),
+                "p95": backend.latency.percentile(95),
+                "first_chunk_p95": backend.first_chunk.percentile(95),
+                "hedge_delay": self._delay(backend.latency)
+            }
+            for backend in self.backends
+        }
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+from typing import Iterator
 from .base import BaseModel
 from openai import OpenAI 
 
@@ -24,3 +25,21 @@ class ModelOpenAI(BaseModel):
         )
         
         return completion.choices[0].message.content
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "developer", "content": "You are a helpful assistant."},
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            stream=True
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,67 @@
+from typing import Iterator, Optional, Tuple
+from .base import BaseModel
+from utils.rateLimiter import AdaptiveLimiter, parse_retry_after
+
+# Exception class names the Gemini and OpenAI SDKs use for quota errors
+THROTTLE_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+
+
+def _throttled(error: Exception) -> Tuple[bool, Optional[float]]:
+    """Whether an SDK error is a rate limit (HTTP 429), and its Retry-After if the response had one"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status != 429 and type(error).__name__ not in THROTTLE_ERRORS:
+        return False, None
+    headers = getattr(response, "headers", None) or {}
+    return True, parse_retry_after(headers.get("retry-after"))
+
+
+class RateLimitedModel(BaseModel):
+    """
+    Wrap a model so every call queues on its provider's limiter.
+
+    Rate limit errors are reported to the limiter, which pauses the provider
+    and shrinks its concurrency, and the call queues again instead of failing
+    (up to ``retries`` times; a stream is only retried before its first chunk).
+    """
+
+    def __init__(self, model: BaseModel, limiter: AdaptiveLimiter,
+                 retries: int = 3, queue_timeout: Optional[float] = None):
+        self.model = model
+        self.limiter = limiter
+        self.retries = retries
+        self.queue_timeout = queue_timeout
+
+    def generate_content(self, prompt: str) -> str:
+        for attempt in range(self.retries + 1):
+            with self.limiter.slot(self.queue_timeout) as permit:
+                try:
+                    return self.model.generate_content(prompt)
+                except Exception as e:
+                    throttled, retry_after = _throttled(e)
+                    if not throttled:
+                        raise
+                    permit.throttle(retry_after)
+                    if attempt == self.retries:
+                        raise
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        for attempt in range(self.retries + 1):
+            started_output = False
+            with self.limiter.slot(self.queue_timeout) as permit:
+                try:
+                    for chunk in self.model.stream_content(prompt):
+                        if not started_output:
+                            permit.mark_first_response()
+                            started_output = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    throttled, retry_after = _throttled(e)
+                    if not throttled:
+                        raise
+                    permit.throttle(retry_after)
+                    if started_output or attempt == self.retries:
+                        raise
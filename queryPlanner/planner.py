@@ -0,0 +1,67 @@
+from pathlib import Path
+from typing import Optional
+from models.factory import ModelFactory
+from models.base import BaseModel
+from utils import tracing
+from keywords_Segregator.outputParser import get_parser
+from dotenv import load_dotenv
+load_dotenv()
+
+
+class QueryPlanner:
+    """
+    Translate, classify and extract keywords in one LLM call.
+
+    Replaces the Translator -> Segregator pair with a single structured call and
+    returns the same dict that QueryRouter.route_keywords expects.
+    """
+
+    def __init__(self, api_key: str, model_type: str, model_name: str, prompt_template_path: str = None,
+                 model: Optional[BaseModel] = None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.model_type = model_type
+        if prompt_template_path:
+            self.prompt_template_path = Path(prompt_template_path)
+        else:
+            self.prompt_template_path = Path("prompts/query_planner/planner_prompt.txt")
+
+        self._prompt_template: Optional[str] = None
+        # Reuse a shared client when one is injected (see main.pipeline.PipelineEngine)
+        self.model = model or ModelFactory.get_model(model_type, api_key, model_name)
+        self.parser = get_parser("planner")
+
+    def load_prompt_template(self) -> str:
+        if self._prompt_template is not None:
+            return self._prompt_template
+        try:
+            with open(self.prompt_template_path, "r", encoding="utf-8") as f:
+                self._prompt_template = f.read()
+                return self._prompt_template
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Prompt template not found at {self.prompt_template_path}")
+        except Exception as e:
+            raise Exception(f"Error loading prompt template: {str(e)}")
+
+    def plan(self, user_query: str):
+        """
+        Build the routing plan for a raw user query
+
+        :param user_query: query in any language.
+        :return: dict of api categories to keywords (plus 'api_needed'); output the
+            parser cannot recover falls back to a web search for the query, like Segregator.
+        """
+        with tracing.span("plan"):
+            template = self.load_prompt_template()
+            formatted_prompt = template.format(user_query=user_query)
+            plan_result = self.model.generate_content(formatted_prompt)
+
+            plan = self.parser.parse(
+                plan_result,
+                model=self.model,
+                fallback={"api_needed": 1, "search_api": [user_query]}
+            )
+
+            # The translation is only an intermediate step for the model
+            plan.pop("translated_query", None)
+            return plan
@@ -1,71 +1,236 @@
-from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 import os
 from dotenv import load_dotenv
-import streamlit as st
+from keywords_Segregator.canonicalizer import covers
+from tools.localIndex import LocalIndex, get_local_index
 from tools.serper import SerperClient
-from models.gemini import GeminiModel
+from utils.traceRecorder import TraceRecorder, get_recorder
+from utils import tracing
 
 # Load environment variables
 load_dotenv()
 
 
 class QueryRouter:
-    def __init__(self, serper_api_key):
+    # Categories understood by the router and the Serper endpoint each one maps to
+    CATEGORY_ENDPOINTS = {
+        "search_api": "search",
+        "text_api": "search",
+        "image_api": "image",
+        "local_api": "local",
+    }
+    # Categories whose keywords may be answered from the local index instead of Serper
+    LOCAL_FIRST_CATEGORIES = ("search_api", "text_api")
+
+    def __init__(self, serper_api_key, max_concurrency: int = 8, request_timeout: float = 15.0,
+                 recorder: Optional[TraceRecorder] = None,
+                 serper_client: Optional[SerperClient] = None,
+                 local_index: Optional[LocalIndex] = None,
+                 local_first: Optional[bool] = None,
+                 local_min_coverage: Optional[float] = None,
+                 local_results: int = 5,
+                 images_from_search: bool = True):
         """
         Initialize the QueryRouter with keywords and the Serper API key.
 
-        :param keywords: dict containing categories (e.g., 'text_api', 'image_api') and associated keywords.
         :param serper_api_key: API key for the SerperClient.
+        :param max_concurrency: maximum number of Serper requests in flight at once.
+        :param request_timeout: per-request timeout in seconds, on top of the time the
+            client may queue for a rate-limit slot; slower lookups are dropped.
+        :param recorder: sink for routed results; defaults to the process-wide
+            background JSONL recorder (see utils.traceRecorder).
+        :param serper_client: preconfigured client, e.g. one pointed at a replay server.
+        :param local_index: BM25 index serving the local_api category; defaults to the
+            index at LOCAL_INDEX_PATH when one has been built (see main.local_ingest).
+        :param local_first: answer search/text keywords from the local index when it
+            covers them (defaults to LOCAL_FIRST, on).
+        :param local_min_coverage: fraction of a keyword's terms the best local passage
+            must contain to count as covered (defaults to LOCAL_MIN_COVERAGE, 0.8).
+        :param local_results: passages returned per local keyword.
+        :param images_from_search: serve an image keyword from the images block of a
+            search response for a keyword that covers it, instead of a separate lookup.
         """
-        self.serper_client = SerperClient(api_key=serper_api_key)
-        self.results_file = Path("results.json")   # Define a path for storing results
+        self.serper_client = serper_client or SerperClient(api_key=serper_api_key)
+        self.recorder = recorder or get_recorder()
+        self.local_index = local_index or get_local_index()
+        self.local_first = (os.getenv("LOCAL_FIRST", "1").lower() in ("1", "true", "yes")
+                            if local_first is None else local_first)
+        self.local_min_coverage = (float(os.getenv("LOCAL_MIN_COVERAGE", "0.8"))
+                                   if local_min_coverage is None else local_min_coverage)
+        self.local_results = local_results
+        self.images_from_search = images_from_search
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="serper"
+        )
+
+    def _call_serper(self, category: str, keyword: str) -> Any:
+        """Blocking Serper call for a single keyword, run on the router's worker pool."""
+        endpoint = self.CATEGORY_ENDPOINTS[category]
+        if endpoint == "local":
+            if self.local_index is not None:
+                with tracing.span("local", keyword=keyword):
+                    return self.local_index.search_results(keyword, self.local_results)
+            # No index built: fall back to a web search
+            return self.serper_client.search_query(keyword)
+        if endpoint == "image":
+            return self.serper_client.image_query(keyword)
+        return self.serper_client.search_query(keyword)
+
+    def _local_answer(self, keyword: str) -> Optional[Dict]:
+        """Local results for a keyword the index covers well, else None"""
+        results = self.local_index.search_results(keyword, self.local_results)
+        hits = results["organic"]
+        if hits and hits[0]["coverage"] >= self.local_min_coverage:
+            return results
+        return None
+
+    def _local_answers(self, keywords: List[str]) -> List[Optional[Dict]]:
+        """Score a request's keywords against the local index in one worker-pool call"""
+        with tracing.span("local", keywords=len(keywords)):
+            return [self._local_answer(keyword) for keyword in keywords]
+
+    async def _fetch_keyword(self, category: str, keyword: str,
+                             semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """Fetch one keyword under the concurrency cap and the per-call timeout."""
+        loop = asyncio.get_running_loop()
+        # Waiting for a rate-limit slot is queueing, not a failure, so it gets its own budget
+        timeout = self.request_timeout + self.serper_client.queue_timeout
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, tracing.propagate(self._call_serper), category, keyword),
+                    timeout=timeout
+                )
+                # Parse and validate response
+                if isinstance(result, str):
+                    result = json.loads(result)
+                return result
+
+            except asyncio.TimeoutError:
+                print(f"Timed out after {timeout}s processing {keyword}")
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON for {keyword}: {str(e)}")
+            except Exception as e:
+                print(f"Error processing {keyword}: {str(e)}")
+        return None
 
-    def route_keywords(self, keywords):
+    async def _fetch_all(self, jobs: List[Tuple[str, str]]) -> List[Optional[Dict]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(
+            self._fetch_keyword(category, keyword, semaphore)
+            for category, keyword in jobs
+        ))
+
+    async def route_keywords_async(self, keywords: Dict[str, Any],
+                                   report: Optional[Dict] = None) -> Dict[str, List[Dict]]:
         """
-        Route keywords to appropriate search APIs and return the results.
+        Route all keywords to their search APIs concurrently.
 
-        :return: dict containing results categorized by API type.
+        :param keywords: dict of categories ('search_api', 'text_api', 'image_api') to keyword lists.
+        :param report: optional dict updated with this request's serper_calls, local_hits
+            and images_from_search; the last two are added to its calls_saved.
+        :return: dict containing results categorized by API type, in keyword order.
         """
-        results = {"image_api": [], "search_api": []}
+        results = {"image_api": [], "search_api": [], "text_api": [], "local_api": []}
 
         # Filter out control parameters
         categories = {k: v for k, v in keywords.items() if k != 'api_needed'}
 
+        jobs = []
         for category, keyword_list in categories.items():
-            if category not in results:
+            if category not in self.CATEGORY_ENDPOINTS:
                 print(f"Unknown category: {category}")
                 continue
+            jobs.extend((category, keyword) for keyword in keyword_list)
+
+        # Well-covered keywords skip Serper and scraping. BM25 scoring is CPU work,
+        # so it runs on the worker pool rather than blocking the event loop
+        local_hits = 0
+        if self.local_first and self.local_index is not None:
+            local_jobs = [job for job in jobs if job[0] in self.LOCAL_FIRST_CATEGORIES]
+            if local_jobs:
+                loop = asyncio.get_running_loop()
+                answers = await loop.run_in_executor(
+                    self._executor, tracing.propagate(self._local_answers), [keyword for _, keyword in local_jobs]
+                )
+                for job, local in zip(local_jobs, answers):
+                    if local is not None:
+                        results["local_api"].append({job[1]: local})
+                        jobs.remove(job)
+                        local_hits += 1
+
+        # Image keywords covered by a search keyword wait for that search: Serper
+        # search responses usually carry an images block that can answer them
+        deferred = []
+        if self.images_from_search:
+            search_keywords = [keyword for category, keyword in jobs
+                               if self.CATEGORY_ENDPOINTS[category] == "search"]
+            for category, keyword in list(jobs):
+                if self.CATEGORY_ENDPOINTS[category] != "image":
+                    continue
+                source = next((search for search in search_keywords if covers(search, keyword)), None)
+                if source is not None:
+                    jobs.remove((category, keyword))
+                    deferred.append((category, keyword, source))
 
-            for keyword in keyword_list:
-                try:
-                    # Route to appropriate API
-                    if category in "search_api": 
-                        result = self.serper_client.search_query(keyword)
-                        print(result)
-                    elif category == "image_api":
-                        result = self.serper_client.image_query(keyword)
-                    else:
-                        continue
-
-                    # Parse and validate response
-                    if isinstance(result, str):
-                        result = json.loads(result)
+        responses = await self._fetch_all(jobs)
+        searched = {}
+        for (category, keyword), result in zip(jobs, responses):
+            if result is not None:
+                results[category].append({keyword: result})
+                if self.CATEGORY_ENDPOINTS[category] == "search":
+                    searched[keyword] = result
+
+        images_from_search = 0
+        fallback = []
+        for category, keyword, source in deferred:
+            images = (searched.get(source) or {}).get("images")
+            if images:
+                results[category].append({keyword: {"images": images}})
+                images_from_search += 1
+            else:
+                fallback.append((category, keyword))
+        if fallback:
+            for (category, keyword), result in zip(fallback, await self._fetch_all(fallback)):
+                if result is not None:
                     results[category].append({keyword: result})
 
-                except json.JSONDecodeError as e:
-                    print(f"Error decoding JSON for {keyword}: {str(e)}")
-                except Exception as e:
-                    print(f"Error processing {keyword}: {str(e)}")
-
-        # Save results to file
-        try:
-            self.results_file.write_text(
-                json.dumps(results, indent=4, ensure_ascii=False),
-                encoding='utf-8'
-            )
-        except Exception as e:
-            print(f"Error saving results: {str(e)}")
-
-        return results
\ No newline at end of file
+        tracing.annotate(local_hits=local_hits, images_from_search=images_from_search)
+        if report is not None:
+            report.update(serper_calls=len(jobs) + len(fallback), local_hits=local_hits,
+                          images_from_search=images_from_search)
+            report["calls_saved"] = report.get("calls_saved", 0) + local_hits + images_from_search
+
+        # Hand the results to the recorder; it writes them off the request path
+        self.recorder.record("route", {"keywords": categories, "results": results})
+
+        return results
+
+    def route_keywords(self, keywords, report: Optional[Dict] = None):
+        """
+        Route keywords to appropriate search APIs and return the results.
+
+        Synchronous wrapper around :meth:`route_keywords_async` for existing callers.
+        When called from inside a running event loop (e.g. a notebook) the
+        coroutine is driven on a helper thread instead.
+
+        :param report: optional dict filled with per-request call counts (see route_keywords_async).
+        :return: dict containing results categorized by API type.
+        """
+        with tracing.span("route") as span:
+            coroutine = self.route_keywords_async(keywords, report)
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                results = asyncio.run(coroutine)
+            else:
+                with ThreadPoolExecutor(max_workers=1) as runner:
+                    results = runner.submit(tracing.propagate(asyncio.run), coroutine).result()
+            span.set(results=sum(len(responses) for responses in results.values()))
+            return results
@@ -1,6 +1,10 @@
+import os
 import streamlit as st
 import requests
 
+# The /ask endpoint of main/service.py
+ASK_API_URL = os.getenv("ASK_API_URL", "http://localhost:8000/ask")
+
 st.set_page_config(page_title="Varanasi Chatbot", page_icon="🕉️", layout="wide")
 
 st.title("Explore Varanasi with Shivendra 🕉️")
@@ -35,9 +39,11 @@ user_input = st.text_input("Type your question here...")
 if st.button("Ask"):
     if user_input:
         with st.spinner("Shivendra is thinking..."):
-            response = requests.post("http://api.example.com/ask", json={"question": user_input})
+            response = requests.post(ASK_API_URL, json={"question": user_input}, timeout=120)
             if response.status_code == 200:
                 data = response.json()
+                if data.get('content'):
+                    st.markdown(data['content'])
                 for item in data['responses']:
                     st.markdown(f"""
                         <div class='response'>
@@ -46,6 +52,8 @@ if st.button("Ask"):
                             <a href="{item['link']}" target="_blank">Read more</a>
                         </div>
                     """, unsafe_allow_html=True)
+            elif response.status_code in (429, 503):
+                st.warning("Shivendra is busy right now, please try again in a moment.")
             else:
                 st.error("Error: Unable to get response from Shivendra.")
     else:
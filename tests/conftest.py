@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.stubs import ReplayServer, stub_engine
+
+SEARCH = {"organic": [{"title": "Ghats of Varanasi", "link": "https://example.org/ghats",
+                       "snippet": "Dashashwamedh Ghat hosts the evening aarti.", "position": 1}]}
+PAGE = b"<html><body><p>Dashashwamedh Ghat hosts the evening Ganga aarti every day.</p></body></html>"
+
+
+@pytest.fixture
+def replay_server():
+    with ReplayServer({"varanasi ghats": SEARCH}, {"ghats": PAGE}) as server:
+        yield server
+
+
+@pytest.fixture
+def engine(replay_server):
+    """PipelineEngine with stub models, searching and scraping the replay server"""
+    return stub_engine(replay_server.url, model_latency=0, final_latency=0)
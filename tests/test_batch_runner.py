@@ -0,0 +1,65 @@
+import json
+
+from benchmarks.stubs import StubModel
+from main.batch_runner import BatchRunner, completed_ids, read_queries
+
+
+class FailingModel(StubModel):
+    def generate_content(self, prompt):
+        raise RuntimeError("quota exceeded")
+
+
+def write_queries(path, queries):
+    path.write_text("".join(json.dumps({"id": item_id, "query": query}) + "\n" for item_id, query in queries),
+                    encoding="utf-8")
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_read_queries_skips_malformed_lines(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    path.write_text('{"id": "a", "question": "Varanasi ghats"}\nnot json\n\n"Sarnath"\n{"id": "c"}\n',
+                    encoding="utf-8")
+
+    assert list(read_queries(path)) == [("a", "Varanasi ghats"), ("line-4", "Sarnath")]
+
+
+def test_completed_ids_ignores_failures_and_torn_lines(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    path.write_text('{"id": "a", "content": "x"}\n{"id": "b", "error": "boom"}\n{"id": "c", "con',
+                    encoding="utf-8")
+
+    assert completed_ids(path) == {"a"}
+
+
+def test_failed_answer_is_retried_on_resume(engine, tmp_path):
+    queries, output = tmp_path / "queries.jsonl", tmp_path / "answers.jsonl"
+    write_queries(queries, [("q1", "Varanasi ghats")])
+    final_model = engine.model
+
+    engine.model = FailingModel()
+    stats = BatchRunner(engine, output, workers=1).run(read_queries(queries))
+    assert stats["failed"] == 1
+    assert "quota exceeded" in read_records(output)[0]["error"]
+    assert completed_ids(output) == set()
+
+    engine.model = final_model
+    stats = BatchRunner(engine, output, workers=1).run(read_queries(queries))
+    assert stats["completed"] == 1 and stats["skipped"] == 0
+    assert completed_ids(output) == {"q1"}
+
+    stats = BatchRunner(engine, output, workers=1).run(read_queries(queries))
+    assert stats["skipped"] == 1
+
+
+def test_shared_keywords_are_fetched_once_per_chunk(engine, tmp_path):
+    queries, output = tmp_path / "queries.jsonl", tmp_path / "answers.jsonl"
+    write_queries(queries, [("q1", "Varanasi ghats"), ("q2", "varanasi  ghats"), ("q3", "Varanasi Ghats")])
+
+    stats = BatchRunner(engine, output, workers=2).run(read_queries(queries))
+
+    assert stats["completed"] == 3
+    assert stats["keywords_saved"] >= 2
+    assert {record["id"] for record in read_records(output)} == {"q1", "q2", "q3"}
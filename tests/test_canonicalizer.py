@@ -0,0 +1,35 @@
+from keywords_Segregator.canonicalizer import canonicalize, content_terms, covers, normalize_keyword
+
+
+def test_normalize_and_content_terms():
+    assert normalize_keyword("  Varanasi,   GHATS! ") == "varanasi ghats"
+    assert content_terms("Show me photos of the Varanasi ghats") == {"varanasi", "ghat"}
+    # Short words and double-s endings are not plurals
+    assert content_terms("bus pass") == {"bus", "pass"}
+
+
+def test_covers_needs_every_narrower_term():
+    assert covers("famous Varanasi ghats", "Varanasi ghat images")
+    assert not covers("Varanasi ghats", "famous Varanasi ghats")
+    assert not covers("Varanasi ghats", "images")
+
+
+def test_canonicalize_merges_within_an_endpoint():
+    canonical, report = canonicalize({
+        "api_needed": 1,
+        "search_api": ["Varanasi ghats", "ghats of Varanasi", "famous Varanasi ghats"],
+        "text_api": ["famous ghats in Varanasi", "Sarnath"],
+        "image_api": ["images", "Varanasi ghat photos"],
+    })
+
+    assert canonical == {
+        "api_needed": 1,
+        "search_api": ["famous varanasi ghats"],
+        "text_api": ["sarnath"],
+        "image_api": ["varanasi ghat photos"],
+    }
+    assert report == {"keywords_in": 7, "keywords_out": 3, "calls_saved": 4}
+
+
+def test_canonicalize_passes_non_dicts_through():
+    assert canonicalize("no keywords") == ("no keywords", {"keywords_in": 0, "keywords_out": 0, "calls_saved": 0})
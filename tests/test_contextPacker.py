@@ -0,0 +1,51 @@
+import json
+
+from utils.contextPacker import ContextPacker, estimate_tokens
+from utils.records import EnrichedSource, FormattedResults, ImageResult
+
+
+def source(index, snippet="", paragraphs=(), quality="high"):
+    return EnrichedSource(
+        title=f"Title {index}", domain=f"site{index}.org", link=f"https://site{index}.org/",
+        snippet=snippet, key_points=[], main_content=list(paragraphs), meta_description="",
+        last_updated="", position=index + 1, source_quality=quality
+    )
+
+
+def test_unscraped_source_keeps_its_snippet():
+    results = FormattedResults(processing_date="today", organic_results=[
+        source(0, snippet="Dashashwamedh Ghat hosts the Ganga aarti every evening.")
+    ])
+
+    context, stats = ContextPacker().pack(results, "When is the Ganga aarti?")
+
+    packed = json.loads(context)["sources"][0]
+    assert packed["snippet"] == "Dashashwamedh Ghat hosts the Ganga aarti every evening."
+    assert packed["main_content"] == []
+    assert stats["sources"] == 1
+
+
+def test_context_stays_within_budget_and_prefers_relevant_paragraphs():
+    filler = "Unrelated text about railway timetables and hotel booking. " * 8
+    results = FormattedResults(processing_date="today", organic_results=[
+        source(0, paragraphs=[filler, "The Ganga aarti at Dashashwamedh Ghat starts at sunset.", filler]),
+        source(1, paragraphs=[filler] * 5, quality="medium"),
+    ], image_results=[ImageResult(title="Ganga aarti", url="https://img/1.jpg", context="")])
+
+    context, stats = ContextPacker(token_budget=200).pack(results, "Ganga aarti timing")
+
+    assert estimate_tokens(context) <= 200
+    assert stats["estimated_tokens"] <= 200
+    assert "starts at sunset" in context
+
+
+def test_paragraphs_keep_page_order():
+    results = FormattedResults(processing_date="today", organic_results=[
+        source(0, paragraphs=["first about ghats", "second about aarti ghats", "third about ghats"])
+    ])
+
+    context, _ = ContextPacker().pack(results, "aarti")
+
+    assert json.loads(context)["sources"][0]["main_content"] == [
+        "first about ghats", "second about aarti ghats", "third about ghats"
+    ]
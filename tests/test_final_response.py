@@ -0,0 +1,58 @@
+from benchmarks.stubs import StubModel
+from main.final_response import generate_final_prompt, generate_final_prompt_stream
+from models.base import BaseModel
+from utils.records import EnrichedSource, FormattedResults
+
+RESULTS = FormattedResults(processing_date="today", organic_results=[EnrichedSource(
+    title="Ghats", domain="example.org", link="https://example.org/", snippet="Aarti at dusk.",
+    key_points=[], main_content=["The Ganga aarti starts at dusk."], meta_description="",
+    last_updated="", position=1, source_quality="high"
+)])
+
+
+class FailingModel(BaseModel):
+    def generate_content(self, prompt):
+        raise RuntimeError("quota exceeded")
+
+
+class OneShotModel(BaseModel):
+    def generate_content(self, prompt):
+        return "  whole answer  "
+
+
+def test_stream_yields_chunks_and_reports_timings():
+    model = StubModel("The aarti starts at dusk every day.", latency=0.05, first_token_latency=0.02, chunk_chars=8)
+    metrics = {}
+
+    chunks = list(generate_final_prompt_stream(RESULTS, "When is the aarti?", metrics=metrics, model=model))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == "The aarti starts at dusk every day."
+    assert 0 < metrics["time_to_first_token"] <= metrics["total_time"]
+    assert "error" not in metrics
+
+
+def test_models_without_native_streaming_yield_one_chunk():
+    chunks = list(generate_final_prompt_stream(RESULTS, "When is the aarti?", model=OneShotModel()))
+
+    assert chunks == ["  whole answer  "]
+
+
+def test_failures_are_reported_in_metrics():
+    metrics = {}
+    chunks = list(generate_final_prompt_stream(RESULTS, "q", metrics=metrics, model=FailingModel()))
+    blocking = {}
+    answer = generate_final_prompt(RESULTS, "q", model=FailingModel(), metrics=blocking)
+
+    assert chunks == ["Error processing request: quota exceeded"]
+    assert metrics["error"] == blocking["error"] == "quota exceeded"
+    assert answer == "Error processing request: quota exceeded"
+
+
+def test_prompt_carries_the_packed_context():
+    prompts = []
+    model = StubModel(responder=lambda prompt: prompts.append(prompt) or "answer")
+
+    assert generate_final_prompt(RESULTS, "When is the aarti?", model=model) == "answer"
+    assert "The Ganga aarti starts at dusk." in prompts[0]
+    assert "When is the aarti?" in prompts[0]
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from benchmarks.stubs import StubModel
+from models.hedged import CircuitBreaker, HedgedModel, LatencyHistogram
+
+
+def test_abandoned_trial_frees_half_open_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_abandoned()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_half_open_primary_recovers_after_losing_a_hedge():
+    primary = StubModel("primary", latency=0.3, first_token_latency=0.3)
+    backup = StubModel("backup")
+    hedged = HedgedModel([primary, backup], initial_delay=0.05,
+                         failure_threshold=1, reset_timeout=0.05)
+    breaker = hedged.backends[0].breaker
+    breaker.record_failure()
+    time.sleep(0.1)
+
+    # The primary's half-open trial is slow, so the backup wins the hedge
+    assert "".join(hedged.stream_content("q")) == "backup"
+    assert hedged.backends[0].stats["cancelled"] == 1
+    time.sleep(0.5)
+    assert breaker.state == "half_open"
+
+    # The abandoned trial must not keep the primary locked out
+    primary.latency = primary.first_token_latency = 0.0
+    assert "".join(hedged.stream_content("q")) == "primary"
+    assert breaker.state == "closed"
+
+
+class BrokenModel(StubModel):
+    def generate_content(self, prompt):
+        self._reply(prompt)
+        raise RuntimeError("503 unavailable")
+
+    def stream_content(self, prompt):
+        self._reply(prompt)
+        raise RuntimeError("503 unavailable")
+
+
+def test_fast_primary_is_never_hedged():
+    primary, backup = StubModel("primary"), StubModel("backup")
+    hedged = HedgedModel([primary, backup], initial_delay=0.5)
+
+    assert hedged.generate_content("q") == "primary"
+    assert backup.calls == 0
+
+
+def test_slow_primary_is_hedged_onto_the_backup():
+    primary, backup = StubModel("primary", latency=0.5), StubModel("backup")
+    hedged = HedgedModel([primary, backup], initial_delay=0.05)
+
+    started = time.perf_counter()
+    assert hedged.generate_content("q") == "backup"
+    assert time.perf_counter() - started < 0.4
+
+    stats = hedged.stats()
+    assert stats["1:StubModel"]["hedges"] == 1 and stats["1:StubModel"]["wins"] == 1
+    assert stats["0:StubModel"]["cancelled"] == 1
+
+
+def test_failure_fails_over_and_opens_the_circuit():
+    primary, backup = BrokenModel(), StubModel("backup")
+    hedged = HedgedModel([primary, backup], initial_delay=5.0, failure_threshold=2)
+
+    for _ in range(3):
+        assert hedged.generate_content("q") == "backup"
+        assert "".join(hedged.stream_content("q")) == "backup"
+
+    # Two failures open the primary's circuit; later calls skip it
+    assert primary.calls == 2
+    assert hedged.stats()["0:BrokenModel"]["circuit"] == "open"
+
+
+def test_all_backends_failing_raises():
+    hedged = HedgedModel([BrokenModel(), BrokenModel()], initial_delay=5.0, failure_threshold=1)
+
+    with pytest.raises(RuntimeError, match="All model backends failed"):
+        hedged.generate_content("q")
+    with pytest.raises(RuntimeError, match="unavailable"):
+        hedged.generate_content("q")
+
+
+def test_stream_hedges_on_a_slow_first_chunk():
+    primary = StubModel("primary", first_token_latency=0.5)
+    backup = StubModel("backup")
+    hedged = HedgedModel([primary, backup], initial_delay=0.05)
+
+    assert "".join(hedged.stream_content("q")) == "backup"
+
+
+def test_hedge_delay_follows_observed_latency():
+    hedged = HedgedModel([StubModel()], initial_delay=2.0, min_samples=20, min_delay=0.25, max_delay=10.0)
+    fast, slow = LatencyHistogram(), LatencyHistogram()
+    for _ in range(20):
+        fast.record(0.1)
+        slow.record(1.0)
+
+    assert 0.1 <= fast.percentile(95) < 0.13
+    # Too few samples: the initial delay; fast backends: clamped to min_delay
+    assert hedged._delay(LatencyHistogram()) == 2.0
+    assert hedged._delay(fast) == 0.25
+    assert 1.0 <= hedged._delay(slow) < 1.25
@@ -0,0 +1,87 @@
+import pytest
+
+from tools.htmlExtractor import EXTRACTORS, ExtractionSession, get_extractor, sniff_encoding
+
+PAGE = (
+    "<html><head><title>Varanasi Ghats</title>"
+    "<meta name='description' content='Guide to the ghats'>"
+    "<script>var p = '<p>not text</p>';</script></head>"
+    "<body><h1>Ghats</h1><p>Dashashwamedh <b>Ghat</b> hosts the aarti.</p>"
+    "<h2>Temples</h2><p>Kashi Vishwanath is nearby.</p><p>Third paragraph.</p></body></html>"
+).encode("utf-8")
+
+
+@pytest.mark.parametrize("name", sorted(EXTRACTORS))
+def test_extractors_agree_on_paragraphs_headings_and_head(name):
+    result = get_extractor(name).extract(PAGE, max_paragraphs=2, max_headings=5)
+
+    assert result["paragraphs"] == ["Dashashwamedh Ghat hosts the aarti.", "Kashi Vishwanath is nearby."]
+    assert result["headings"] == ["Ghats", "Temples"]
+    assert result["title"] == "Varanasi Ghats"
+    assert result["meta_description"] == "Guide to the ghats"
+    assert "not text" not in result["text"]
+
+
+def test_stdlib_session_is_satisfied_before_the_document_ends():
+    session = get_extractor("stdlib").session(max_paragraphs=1, max_headings=1,
+                                              fields=["paragraphs", "headings"])
+    body = PAGE + b"<p>padding</p>" * 200
+
+    fed = 0
+    for start in range(0, len(body), 64):
+        session.feed(body[start:start + 64])
+        fed = start + 64
+        if session.is_satisfied():
+            break
+    session.close()
+
+    assert fed < len(body)
+    assert session.result()["paragraphs"] == ["Dashashwamedh Ghat hosts the aarti."]
+
+
+def test_multibyte_characters_split_across_chunks():
+    html = "<p>गंगा आरती at the ghat</p>".encode("utf-8")
+    session = get_extractor("stdlib").session(fields=["paragraphs"])
+    for index in range(len(html)):
+        session.feed(html[index:index + 1])
+    session.close()
+
+    assert session.result()["paragraphs"] == ["गंगा आरती at the ghat"]
+
+
+@pytest.mark.parametrize("prefix, encoding", [
+    (b'<meta charset="windows-1251">', "windows-1251"),
+    (b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">', "shift_jis"),
+    (b"<meta charset='iso-8859-1'>", "cp1252"),
+    (b'<meta charset="utf-16">', "utf-8"),
+    (b"\xef\xbb\xbf<p>x</p>", "utf-8-sig"),
+    (b"<p>no declaration</p>", "utf-8"),
+])
+def test_sniff_encoding(prefix, encoding):
+    assert sniff_encoding(prefix) == encoding
+
+
+def test_document_declared_charset_is_honoured_without_a_header():
+    html = '<html><head><meta charset="windows-1251"></head><body><p>Варанаси</p></body></html>'
+
+    result = get_extractor("stdlib").extract(html.encode("windows-1251"), fields=["paragraphs"])
+
+    assert result["paragraphs"] == ["Варанаси"]
+
+
+def test_header_charset_wins_over_sniffing():
+    html = '<meta charset="windows-1251"><p>café</p>'.encode("utf-8")
+
+    result = get_extractor("stdlib").extract(html, fields=["paragraphs"], encoding="utf-8")
+
+    assert result["paragraphs"] == ["café"]
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError):
+        get_extractor("stdlib").session(fields=["paragraphs", "links"])
+
+
+def test_extraction_session_is_abstract():
+    with pytest.raises(TypeError):
+        ExtractionSession(1, 1, frozenset())
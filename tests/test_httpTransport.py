@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from tools.httpTransport import HttpTransport
+
+
+class Response:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def transport(responses, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    http = HttpTransport(**kwargs)
+    patcher = mock.patch.object(http.session, "request", side_effect=responses)
+    return http, patcher
+
+
+def test_retryable_status_is_retried_then_returned():
+    http, patcher = transport([Response(503), Response(502), Response(200)])
+    with patcher as request:
+        response = http.get("http://x")
+
+    assert response.status_code == 200
+    assert request.call_count == 3
+    assert http.stats == {"requests": 3, "retries": 2, "failures": 0}
+
+
+def test_last_retryable_status_is_returned_when_retries_run_out():
+    http, patcher = transport([Response(503)] * 3, max_retries=2)
+    with patcher as request:
+        assert http.get("http://x").status_code == 503
+    assert request.call_count == 3
+
+
+def test_retry_after_header_sets_the_backoff():
+    http = HttpTransport(backoff_max=8.0)
+
+    assert http._backoff(0, Response(429, {"Retry-After": "3"})) == 3.0
+    assert http._backoff(0, Response(429, {"Retry-After": "120"})) == 8.0
+    assert 0 <= http._backoff(2) <= min(8.0, http.backoff_base * 4)
+
+
+def test_caller_can_exclude_statuses_from_retries():
+    http, patcher = transport([Response(429), Response(200)])
+    with patcher as request:
+        assert http.post("http://x", retry_statuses={503}).status_code == 429
+    assert request.call_count == 1
+
+
+@pytest.mark.parametrize("method, error, calls", [
+    ("GET", requests.exceptions.ConnectionError("reset"), 4),
+    ("GET", requests.exceptions.ConnectTimeout("timeout"), 4),
+    # The POST may have reached the server; sending it again could bill it twice
+    ("POST", requests.exceptions.ConnectionError("reset"), 1),
+    ("POST", requests.exceptions.ConnectTimeout("timeout"), 4),
+])
+def test_connection_errors_are_retried_only_when_safe(method, error, calls):
+    http, patcher = transport(error)
+    with patcher as request, pytest.raises(type(error)):
+        http.request(method, "http://x")
+
+    assert request.call_count == calls
+    assert http.stats["failures"] == 1
+
+
+def test_post_retries_after_a_sent_request_can_be_opted_into():
+    http, patcher = transport([requests.exceptions.ConnectionError("reset"), Response(200)])
+    with patcher as request:
+        assert http.post("http://x", retry_unsent_only=False).status_code == 200
+    assert request.call_count == 2
+
+
+def test_bare_timeout_sets_the_read_timeout():
+    http = HttpTransport(connect_timeout=3.05, read_timeout=10.0)
+
+    assert http._timeout(None) == (3.05, 10.0)
+    assert http._timeout(5) == (3.05, 5)
+    assert http._timeout(1) == (1, 1)
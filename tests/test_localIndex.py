@@ -0,0 +1,57 @@
+from tools.localIndex import LocalCorpus, LocalIndex, tokenize
+
+PASSAGES = [
+    {"title": "Dashashwamedh Ghat", "url": "https://w/ghat", "section": "Aarti",
+     "paragraphs": ["The Ganga aarti is performed every evening at Dashashwamedh Ghat."]},
+    {"title": "Sarnath", "url": "https://w/sarnath", "section": "",
+     "paragraphs": ["Sarnath is where the Buddha gave his first sermon."]},
+    {"title": "Kashi Vishwanath Temple", "url": "https://w/temple", "section": "History",
+     "paragraphs": ["The temple is dedicated to Shiva and rebuilt in 1780."]},
+]
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("What are the best Ghats in Varanasi?") == ["ghat", "varanasi"]
+
+
+def test_search_ranks_matching_passage_first_with_coverage(tmp_path):
+    index = LocalIndex.build(PASSAGES, str(tmp_path / "index"))
+
+    hits = index.search("Ganga aarti ghat")
+
+    assert hits[0][2]["title"] == "Dashashwamedh Ghat"
+    assert hits[0][1] == 1.0
+    assert index.search("kathmandu") == []
+
+
+def test_search_results_look_like_a_serper_response(tmp_path):
+    index = LocalIndex.build(PASSAGES, str(tmp_path / "index"))
+
+    results = index.search_results("Sarnath sermon", k=2)
+
+    hit = results["organic"][0]
+    assert results["searchParameters"]["engine"] == "local"
+    assert hit["link"] == "https://w/sarnath" and hit["position"] == 1
+    assert hit["paragraphs"] == PASSAGES[1]["paragraphs"]
+
+
+def test_rebuild_replaces_the_index_in_place(tmp_path):
+    directory = str(tmp_path / "index")
+    LocalIndex.build(PASSAGES, directory).close()
+
+    index = LocalIndex.build(PASSAGES[1:], directory)
+
+    assert index.count == 2
+    assert index.search("aarti") == []
+
+
+def test_corpus_upsert_skips_unchanged_sources(tmp_path):
+    corpus = LocalCorpus(str(tmp_path / "corpus.jsonl"))
+    assert corpus.upsert("Sarnath", "Sarnath", "https://w/sarnath", [{"paragraphs": ["a"]}], "h1")
+    assert not corpus.upsert("Sarnath", "Sarnath", "https://w/sarnath", [{"paragraphs": ["a"]}], "h1")
+    corpus.save()
+
+    reloaded = LocalCorpus(str(tmp_path / "corpus.jsonl"))
+
+    assert "Sarnath" in reloaded
+    assert [p["title"] for p in reloaded.passages()] == ["Sarnath"]
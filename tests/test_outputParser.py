@@ -0,0 +1,79 @@
+import pytest
+
+from benchmarks.stubs import StubModel
+from keywords_Segregator import outputParser
+from keywords_Segregator.outputParser import ObjectScanner, OutputParseError, StructuredOutputParser, validate_keywords
+
+KEYWORDS = {"api_needed": 1, "search_api": ["varanasi ghats"]}
+
+
+@pytest.mark.parametrize("text", [
+    '{"api_needed": 1, "search_api": ["varanasi ghats"]}',
+    "{'api_needed': 1, 'search_api': ['varanasi ghats']}",
+    '```json\n{"api_needed": 1, "search_api": ["varanasi ghats"]}\n```',
+    'Sure! Here you go: {"api_needed": 1, "search_api": ["varanasi ghats"]} Hope that helps.',
+    '{“api_needed”: 1, “search_api”: [“varanasi ghats”]}',
+    '{"api_needed": 1, "search_api": ["varanasi ghats",],}',
+    '{api_needed: 1, search_api: ["varanasi ghats"]}',
+    '{"api_needed": true, "search_api": ["varanasi ghats"], "image_api": null}',
+    '{"api_needed": 1, "search_api": ["varanasi ghats"',
+])
+def test_malformed_replies_are_repaired_locally(text):
+    assert StructuredOutputParser("test").parse(text) == KEYWORDS
+
+
+def test_missing_comma_between_lines_is_repaired():
+    text = '{"api_needed": 1,\n "search_api": ["varanasi ghats"]\n "image_api": ["aarti"]}'
+
+    assert StructuredOutputParser("test").parse(text)["image_api"] == ["aarti"]
+
+
+def test_first_object_that_passes_the_schema_wins():
+    text = 'Example: {"api_name": ["..."]}. Answer: {"api_needed": 1, "search_api": "varanasi ghats"}'
+
+    assert StructuredOutputParser("test").parse(text) == KEYWORDS
+
+
+def test_validate_keywords_normalizes_and_rejects():
+    assert validate_keywords({"api_needed": "0", "message": "Namaste!"}) == {"api_needed": 0, "message": ["Namaste!"]}
+    assert validate_keywords({"search_api": ["  ghats ", "", 7], "api_name": ["x"]}) == {
+        "api_needed": 1, "search_api": ["ghats", "7"]
+    }
+    with pytest.raises(OutputParseError):
+        validate_keywords({"api_needed": 1})
+    with pytest.raises(OutputParseError):
+        validate_keywords(["varanasi ghats"])
+
+
+def test_model_is_reprompted_once_before_the_fallback():
+    parser = StructuredOutputParser("test")
+    fixer = StubModel('{"api_needed": 1, "search_api": ["varanasi ghats"]}')
+
+    assert parser.parse("I cannot help with that.", model=fixer) == KEYWORDS
+    assert fixer.calls == 1
+
+    useless = StubModel("still no JSON")
+    assert parser.parse("nothing", model=useless, fallback={"api_needed": 0}) == {"api_needed": 0}
+    assert useless.calls == 1
+    with pytest.raises(OutputParseError):
+        parser.parse("nothing")
+
+    assert parser.summary()["reprompted"] == 2 and parser.summary()["failed"] == 2
+
+
+def test_scanner_finds_objects_across_chunks():
+    scanner = ObjectScanner()
+
+    assert scanner.feed('prose {"a": "}{", "b": [1, ') == []
+    assert scanner.pending() == '{"a": "}{", "b": [1]}'
+    assert scanner.feed("2]} and it's {'c': 3}") == ['{"a": "}{", "b": [1, 2]}', "{'c': 3}"]
+    assert scanner.pending() is None
+
+
+def test_stage_parsers_are_shared_and_exported():
+    parser = outputParser.get_parser("test-export")
+    assert outputParser.get_parser("test-export") is parser
+    parser.parse('{api_needed: 1, search_api: ["ghats"]}')
+
+    assert outputParser.stats()["test-export"]["repair_rate"] == 1.0
+    assert 'output_parser_results_total{stage="test-export",outcome="repaired"} 1' in outputParser.prometheus_text()
@@ -0,0 +1,42 @@
+from benchmarks.stubs import STUB_ANSWER, StubModel
+from main.pipeline import PipelineEngine
+from models.factory import ModelFactory
+
+
+def test_shared_model_is_one_client_per_process():
+    first = ModelFactory.get_shared_model("gemini", "key", "gemini-1.5-flash")
+
+    assert ModelFactory.get_shared_model("gemini", "key", "gemini-1.5-flash") is first
+    assert ModelFactory.get_shared_model("gemini", "key", "gemini-1.5-pro") is not first
+
+
+def test_every_llm_stage_shares_the_engine_model():
+    model = StubModel()
+    engine = PipelineEngine(api_key="key", serper_api_key="key", model=model)
+
+    assert engine.translator.model is engine.segregator.model is engine.planner.model is model
+
+
+def test_warm_up_loads_templates_once(engine):
+    engine.warm_up()
+
+    assert engine.translator._prompt_template and engine.segregator._prompt_template
+    assert engine.planner._prompt_template
+
+
+def test_answer_runs_every_stage(engine, replay_server):
+    answer = engine.answer("Varanasi ghats")
+
+    assert answer["content"] == STUB_ANSWER.strip()
+    assert answer["sources"][0]["title"] == "Ghats of Varanasi"
+    assert "error" not in answer
+    assert replay_server.requests["search"] >= 1
+    # Formatting happens once: each organic hit's page is fetched once
+    assert replay_server.requests["page"] == len(answer["sources"])
+
+
+def test_both_query_pipelines_produce_keywords(engine):
+    two_stage = engine.plan("Varanasi ghats")
+    engine.query_pipeline = "planner"
+
+    assert two_stage["search_api"] and engine.plan("Varanasi ghats")["search_api"]
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from benchmarks.stubs import StubModel
+from queryPlanner.planner import QueryPlanner
+
+PROMPT = Path(__file__).resolve().parent.parent / "prompts" / "query_planner" / "planner_prompt.txt"
+
+
+def planner(reply):
+    model = StubModel(responder=lambda prompt: reply)
+    return QueryPlanner("key", "gemini", "stub", prompt_template_path=str(PROMPT), model=model), model
+
+
+def test_plan_is_one_model_call_without_the_translation():
+    fused, model = planner(repr({"translated_query": "Places to visit in Varanasi",
+                                 "search_api": ["places to visit in Varanasi"], "api_needed": 1}))
+
+    plan = fused.plan("Varanasi mein ghumne ki jagah")
+
+    assert plan == {"search_api": ["places to visit in Varanasi"], "api_needed": 1}
+    assert model.calls == 1
+
+
+def test_chit_chat_needs_no_api():
+    fused, _ = planner('{"api_needed": 0, "message": ["Namaste! How can I help?"]}')
+
+    assert fused.plan("namaste") == {"api_needed": 0, "message": ["Namaste! How can I help?"]}
+
+
+def test_unusable_reply_falls_back_to_searching_the_query():
+    fused, model = planner("Sorry, I cannot help with that.")
+
+    assert fused.plan("ghats") == {"api_needed": 1, "search_api": ["ghats"]}
+    # One planning call plus one repair attempt
+    assert model.calls == 2
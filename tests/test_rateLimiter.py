@@ -0,0 +1,143 @@
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+from benchmarks.stubs import StubModel
+from models.rateLimited import RateLimitedModel
+from utils.rateLimiter import AdaptiveLimiter, RateLimitTimeout, TokenBucket, parse_retry_after
+
+
+class TooManyRequests(Exception):
+    """Shaped like an SDK quota error carrying the HTTP response"""
+
+    def __init__(self, retry_after="0"):
+        super().__init__("429 rate limit exceeded")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after}})()
+
+
+class FlakyModel(StubModel):
+    """Raises the queued errors first, then answers; mid_stream fails streams after one chunk"""
+
+    def __init__(self, errors, mid_stream=False):
+        super().__init__("ghats", chunk_chars=2)
+        self.errors = list(errors)
+        self.mid_stream = mid_stream
+
+    def generate_content(self, prompt):
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().generate_content(prompt)
+
+    def stream_content(self, prompt):
+        chunks = super().stream_content(prompt)
+        if self.errors and self.mid_stream:
+            yield next(chunks)
+        if self.errors:
+            raise self.errors.pop(0)
+        yield from chunks
+
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire()
+
+    assert time.monotonic() - started >= 0.04
+    assert bucket.stats["waited"] == 1
+    assert not bucket.acquire(timeout=0.001)
+    assert TokenBucket(rate=0).acquire(tokens=100)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_callers_are_admitted_in_arrival_order():
+    limiter = AdaptiveLimiter("test", max_concurrency=1)
+    holder = limiter.acquire()
+    order = []
+
+    def call(index):
+        with limiter.slot():
+            order.append(index)
+
+    threads = []
+    for index in range(4):
+        threads.append(threading.Thread(target=call, args=(index,)))
+        threads[-1].start()
+        time.sleep(0.02)
+    limiter.release(holder)
+    for thread in threads:
+        thread.join()
+
+    assert order == [0, 1, 2, 3]
+    assert limiter.stats["max_queue_depth"] == 4
+
+
+def test_success_grows_the_limit_additively():
+    limiter = AdaptiveLimiter("test", max_concurrency=4, initial_concurrency=2)
+    limiter.release(limiter.acquire())
+
+    assert limiter.limit == 2.5
+
+
+def test_throttle_halves_the_limit_and_pauses_the_provider():
+    limiter = AdaptiveLimiter("test", max_concurrency=8)
+    permit = limiter.acquire()
+    permit.throttle(retry_after=0.2)
+    limiter.release(permit)
+
+    assert limiter.concurrency_limit() == 4
+    assert limiter.acquire(timeout=0.05) is None
+    assert limiter.stats["timeouts"] == 1
+    with pytest.raises(RateLimitTimeout):
+        with limiter.slot(timeout=0.01):
+            pass
+    time.sleep(0.2)
+    assert limiter.acquire(timeout=0.05) is not None
+
+
+def test_slow_calls_count_as_congestion():
+    limiter = AdaptiveLimiter("test", max_concurrency=8, latency_target=0.01)
+    with limiter.slot():
+        time.sleep(0.02)
+
+    assert limiter.stats["slow"] == 1
+    assert limiter.concurrency_limit() == 4
+
+
+def test_model_queues_again_after_a_rate_limit_error():
+    limiter = AdaptiveLimiter("test")
+    model = RateLimitedModel(FlakyModel([TooManyRequests(), TooManyRequests()]), limiter)
+
+    assert model.generate_content("q") == "ghats"
+    assert limiter.stats["throttled"] == 2 and limiter.in_flight == 0
+
+
+def test_model_gives_up_after_retries_and_passes_other_errors():
+    limiter = AdaptiveLimiter("test", cooldown=0.0)
+    with pytest.raises(TooManyRequests):
+        RateLimitedModel(FlakyModel([TooManyRequests()] * 2), limiter, retries=1).generate_content("q")
+    with pytest.raises(ValueError):
+        RateLimitedModel(FlakyModel([ValueError("bad prompt")]), limiter).generate_content("q")
+
+    assert limiter.stats["throttled"] == 2
+
+
+def test_stream_is_retried_only_before_its_first_chunk():
+    limiter = AdaptiveLimiter("test", cooldown=0.0)
+
+    assert "".join(RateLimitedModel(FlakyModel([TooManyRequests()]), limiter).stream_content("q")) == "ghats"
+
+    model = FlakyModel([TooManyRequests()], mid_stream=True)
+    with pytest.raises(TooManyRequests):
+        list(RateLimitedModel(model, limiter).stream_content("q"))
+    assert model.calls == 1
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from utils.responseFormater import ResponseFormatter
+
+SEARCH = {
+    "organic": [
+        {"title": "Ghats", "link": "https://www.example.org/ghats", "snippet": "The ghats.", "position": 1},
+        {"title": "Temples", "link": "https://temples.example.com/", "snippet": "Temples.", "position": 2},
+    ],
+    "peopleAlsoAsk": [{"question": "When is the aarti?", "snippet": "At dusk.", "link": "https://q/1"}]
+}
+
+
+class FakeScraper:
+    """Scraper stand-in returning fixed page content after an optional delay"""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.links = []
+        self.lock = threading.Lock()
+
+    def get_website_content(self, link, **kwargs):
+        with self.lock:
+            self.links.append(link)
+        time.sleep(self.delays.get(link, 0.0))
+        return {"paragraphs": [f"Scraped {link}"], "headings": ["Heading"],
+                "domain_info": {"meta_description": "About"}}
+
+
+def test_images_shared_by_search_and_image_keyword_are_listed_once():
+    images = [{"title": "Ghat", "imageUrl": "u1"}, {"title": "Aarti", "imageUrl": "u2"}]
+    raw_results = {
+        "search_api": [{"varanasi ghats": {"images": images}}],
+        "image_api": [{"ghats": {"images": images}}, {"aarti": {"images": [{"imageUrl": "u3"}]}}]
+    }
+
+    formatted = ResponseFormatter(raw_results).format()
+
+    assert [image.url for image in formatted.image_results] == ["u1", "u2", "u3"]
+
+
+def test_each_organic_hit_is_scraped_once_and_enriched():
+    scraper = FakeScraper()
+
+    formatted = ResponseFormatter({"search_api": [{"varanasi ghats": SEARCH}]}, scraper=scraper).format()
+
+    assert sorted(scraper.links) == ["https://temples.example.com/", "https://www.example.org/ghats"]
+    first = formatted.organic_results[0]
+    assert (first.domain, first.main_content, first.key_points) == (
+        "example.org", ["Scraped https://www.example.org/ghats"], ["Heading"])
+    assert first.source_quality == "high"
+    assert formatted.related_questions[0].question == "When is the aarti?"
+
+
+def test_total_content_length_measures_the_historical_dict():
+    formatter = ResponseFormatter({"search_api": [{"varanasi ghats": SEARCH}]}, scraper=FakeScraper())
+
+    formatted = formatter.format()
+
+    layout = formatted.to_dict()
+    layout["metadata"]["total_content_length"] = 0
+    assert formatted.total_content_length == len(str(layout))
+    assert formatter.format_for_llm()["metadata"]["sources_used"] == 2
+
+
+def test_hits_carrying_paragraphs_are_not_scraped():
+    local = {"organic": [{"title": "Sarnath", "link": "https://w/sarnath", "snippet": "s",
+                          "paragraphs": ["Sarnath is near Varanasi."], "headings": ["History"]}]}
+    scraper = FakeScraper()
+
+    formatted = ResponseFormatter({"local_api": [{"sarnath": local}]}, scraper=scraper).format()
+
+    assert scraper.links == []
+    assert formatted.organic_results[0].main_content == ["Sarnath is near Varanasi."]
+
+
+def test_scrapes_run_in_parallel_and_stop_at_the_deadline():
+    organic = [{"title": f"Page {i}", "link": f"https://site{i}.org/", "snippet": f"Snippet {i}", "position": i}
+               for i in range(1, 5)]
+    delays = {f"https://site{i}.org/": 0.15 for i in range(1, 4)}
+    delays["https://site4.org/"] = 2.0
+    formatter = ResponseFormatter({"search_api": [{"q": {"organic": organic}}]},
+                                  scraper=FakeScraper(delays), scrape_deadline=0.5)
+
+    started = time.perf_counter()
+    formatted = formatter.format()
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert [source.main_content for source in formatted.organic_results[:3]] == [
+        [f"Scraped https://site{i}.org/"] for i in range(1, 4)]
+    # The page that missed the deadline keeps its SERP snippet
+    assert formatted.organic_results[3].main_content == []
+    assert formatted.organic_results[3].snippet == "Snippet 4"
+
+
+def test_per_domain_limit_bounds_concurrent_scrapes_of_one_host():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    class CountingScraper:
+        def get_website_content(self, link, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {}
+
+    organic = [{"title": "t", "link": f"https://example.org/{i}", "snippet": "s"} for i in range(6)]
+    ResponseFormatter({"search_api": [{"q": {"organic": organic}}]}, scraper=CountingScraper(),
+                      per_domain_limit=2).format()
+
+    assert peak[0] == 2
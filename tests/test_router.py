@@ -0,0 +1,141 @@
+import threading
+import time
+
+from queryRouter.router import QueryRouter
+from tools.localIndex import LocalIndex
+from utils.traceRecorder import NullRecorder
+
+
+class FakeSerper:
+    """SerperClient stand-in answering every query from memory"""
+
+    queue_timeout = 0.0
+
+    def __init__(self, images=True, latency=0.0, slow=()):
+        self.calls = []
+        self.images = images
+        self.latency = latency
+        self.slow = set(slow)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def _wait(self, keyword):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(2.0 if keyword in self.slow else self.latency)
+        with self.lock:
+            self.in_flight -= 1
+
+    def _record(self, kind, keyword):
+        with self.lock:
+            self.calls.append((kind, keyword))
+
+    def search_query(self, keyword):
+        self._record("search", keyword)
+        self._wait(keyword)
+        result = {"organic": [{"title": keyword, "link": f"https://s/{keyword}", "snippet": keyword}]}
+        if self.images:
+            result["images"] = [{"title": keyword, "imageUrl": f"https://i/{keyword}.jpg"}]
+        return result
+
+    def image_query(self, keyword):
+        self._record("image", keyword)
+        self._wait(keyword)
+        return {"images": [{"title": keyword, "imageUrl": f"https://i/{keyword}/own.jpg"}]}
+
+
+class ThreadRecordingIndex(LocalIndex):
+    """Real index that remembers which threads scored queries"""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.threads = set()
+
+    def search_results(self, query, k=5):
+        self.threads.add(threading.current_thread().name)
+        return super().search_results(query, k)
+
+
+def router(serper, **kwargs):
+    kwargs.setdefault("local_first", False)
+    return QueryRouter("key", recorder=NullRecorder(), serper_client=serper, **kwargs)
+
+
+def test_local_first_scores_off_the_event_loop(tmp_path):
+    LocalIndex.build([{"title": "Dashashwamedh Ghat", "url": "https://w/ghat", "section": "",
+                       "paragraphs": ["The Ganga aarti is performed every evening."]}],
+                     str(tmp_path / "index")).close()
+    index = ThreadRecordingIndex(str(tmp_path / "index"))
+    serper = FakeSerper()
+    report = {}
+
+    results = router(serper, local_index=index, local_first=True).route_keywords(
+        {"api_needed": 1, "search_api": ["Ganga aarti ghat", "Sarnath museum"]}, report=report
+    )
+
+    assert [next(iter(entry)) for entry in results["local_api"]] == ["Ganga aarti ghat"]
+    assert serper.calls == [("search", "Sarnath museum")]
+    assert report["local_hits"] == 1 and report["serper_calls"] == 1
+    assert threading.current_thread().name not in index.threads
+
+
+def test_keywords_are_fetched_concurrently_under_the_cap():
+    serper = FakeSerper(latency=0.2)
+    keywords = {"api_needed": 1, "search_api": ["a", "b", "c", "d"], "text_api": ["e"], "image_api": ["f"]}
+
+    started = time.perf_counter()
+    results = router(serper, max_concurrency=3, images_from_search=False).route_keywords(keywords)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.6
+    assert serper.peak == 3
+    assert [next(iter(entry)) for entry in results["search_api"]] == ["a", "b", "c", "d"]
+    # text_api keywords go to the search endpoint
+    assert ("search", "e") in serper.calls and results["text_api"]
+    assert [next(iter(entry)) for entry in results["image_api"]] == ["f"]
+
+
+def test_slow_keyword_is_dropped_after_the_timeout():
+    serper = FakeSerper(slow={"slow"})
+
+    results = router(serper, request_timeout=0.2).route_keywords({"search_api": ["fast", "slow"]})
+
+    assert [next(iter(entry)) for entry in results["search_api"]] == ["fast"]
+
+
+def test_route_keywords_works_inside_a_running_event_loop():
+    import asyncio
+
+    async def call():
+        return router(FakeSerper()).route_keywords({"search_api": ["ghats"]})
+
+    assert len(asyncio.run(call())["search_api"]) == 1
+
+
+def test_covered_image_keyword_is_served_from_search():
+    serper = FakeSerper()
+    report = {}
+
+    results = router(serper).route_keywords(
+        {"search_api": ["famous varanasi ghats"], "image_api": ["varanasi ghat photos", "sarnath"]}, report=report
+    )
+
+    images = {next(iter(entry)): next(iter(entry.values())) for entry in results["image_api"]}
+    assert sorted(serper.calls) == [("image", "sarnath"), ("search", "famous varanasi ghats")]
+    assert images["varanasi ghat photos"]["images"][0]["imageUrl"] == "https://i/famous varanasi ghats.jpg"
+    assert report == {"serper_calls": 2, "local_hits": 0, "images_from_search": 1, "calls_saved": 1}
+
+
+def test_image_keyword_falls_back_when_search_has_no_images():
+    serper = FakeSerper(images=False)
+    report = {}
+
+    results = router(serper).route_keywords(
+        {"search_api": ["varanasi ghats"], "image_api": ["varanasi ghats"]}, report=report
+    )
+
+    assert serper.calls == [("search", "varanasi ghats"), ("image", "varanasi ghats")]
+    assert results["image_api"][0]["varanasi ghats"]["images"][0]["imageUrl"].endswith("/own.jpg")
+    assert report["images_from_search"] == 0 and report["serper_calls"] == 2
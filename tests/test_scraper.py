@@ -0,0 +1,138 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.cacheStore import SQLiteCache
+from tools.httpTransport import HttpTransport
+from tools.scraperTool import Scraper
+
+
+class Site:
+    """Local site serving one page with an ETag, counting full and conditional responses"""
+
+    def __init__(self):
+        self.body = b"<html><head><title>Ghats</title></head><body><p>Version one.</p></body></html>"
+        self.etag = '"v1"'
+        self.counts = {"200": 0, "304": 0}
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path == "/file.pdf":
+                    self._send(200, b"%PDF", "application/pdf")
+                elif self.headers.get("If-None-Match") == site.etag:
+                    site.counts["304"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", site.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    site.counts["200"] += 1
+                    self._send(200, site.body, "text/html; charset=utf-8")
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", site.etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeResponse:
+    """Streaming response stand-in that records how much of the body was read"""
+
+    def __init__(self, body, content_type="text/html; charset=utf-8", chunk=1024):
+        self.body = body
+        self.headers = {"Content-Type": content_type}
+        self.encoding = "utf-8"
+        self.chunk = chunk
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), self.chunk):
+            self.read += len(self.body[start:start + self.chunk])
+            yield self.body[start:start + self.chunk]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    yield site
+    site.close()
+
+
+def scraper(**kwargs):
+    return Scraper(cache=SQLiteCache(":memory:"), transport=HttpTransport(max_retries=0), **kwargs)
+
+
+def test_fresh_page_is_served_from_cache(site):
+    pages = scraper()
+
+    first = pages.get_website_content(site.url + "/ghats")
+    second = pages.get_website_content(site.url + "/ghats")
+
+    assert first == second
+    assert first["paragraphs"] == ["Version one."]
+    assert site.counts == {"200": 1, "304": 0}
+
+
+def test_expired_page_is_revalidated_with_its_etag(site):
+    pages = scraper()
+    pages.CACHE_TTL = 0
+
+    pages.get_website_content(site.url + "/ghats")
+    revalidated = pages.get_website_content(site.url + "/ghats")
+    assert revalidated["paragraphs"] == ["Version one."]
+    assert site.counts == {"200": 1, "304": 1}
+
+    site.body, site.etag = site.body.replace(b"one", b"two"), '"v2"'
+    changed = pages.get_website_content(site.url + "/ghats")
+
+    assert changed["paragraphs"] == ["Version two."]
+    assert site.counts == {"200": 2, "304": 1}
+
+
+def test_non_html_content_is_rejected(site):
+    with pytest.raises(RuntimeError, match="Unsupported content type"):
+        scraper().get_website_content(site.url + "/file.pdf")
+
+
+def test_streaming_stops_once_requested_content_is_collected():
+    body = b"<html><head><title>t</title></head><body>" + b"<h1>Ghats</h1><p>A paragraph.</p>" * 2000
+    response = FakeResponse(body)
+
+    content = scraper().stream_extractor(response, max_paragraphs=2, max_headings=1,
+                                         fields=["paragraphs", "headings"])
+
+    assert content["paragraphs"] == ["A paragraph.", "A paragraph."]
+    assert response.read < len(body) // 10
+    assert response.closed
+
+
+def test_streaming_read_is_capped_at_max_bytes():
+    body = b"<html><body>" + b"<p>" + b"x" * 200_000 + b"</p></body></html>"
+    response = FakeResponse(body, chunk=4096)
+
+    scraper().stream_extractor(response, max_bytes=10_000, fields=["cleaned_text"])
+
+    assert response.read <= 10_000 + 4096
+    assert response.closed
@@ -0,0 +1,51 @@
+import time
+
+from utils.semanticCache import SemanticCache, normalize_query
+
+
+def test_normalize_query_folds_aliases_plurals_and_word_order():
+    assert normalize_query("Best ghats in Banaras") == normalize_query("varanasi ghat")
+    assert normalize_query("famous places to visit in Kashi") == normalize_query("Varanasi sightseeing")
+
+
+def test_near_duplicate_question_hits():
+    cache = SemanticCache()
+    cache.store("What are the best places to visit in Varanasi?", {"content": "Ghats"})
+
+    hit = cache.lookup("places to visit in Banaras")
+
+    assert hit is not None
+    assert hit[0] == {"content": "Ghats"}
+    assert hit[1] >= cache.threshold
+
+
+def test_different_question_misses():
+    cache = SemanticCache()
+    cache.store("What are the best places to visit in Varanasi?", {"content": "Ghats"})
+
+    assert cache.lookup("Varanasi street food") is None
+    assert cache.summary()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = SemanticCache(ttl=0.05)
+    cache.store("Varanasi ghats", {"content": "Ghats"})
+    assert cache.lookup("Varanasi ghats") is not None
+
+    time.sleep(0.1)
+
+    assert cache.lookup("Varanasi ghats") is None
+    assert cache.summary()["entries"] == 0
+
+
+def test_full_cache_evicts_least_recently_used():
+    cache = SemanticCache(max_entries=2)
+    cache.store("Varanasi ghats", 1)
+    cache.store("Sarnath stupa", 2)
+    cache.lookup("Varanasi ghats")
+
+    cache.store("Kashi Vishwanath temple", 3)
+
+    assert cache.lookup("Sarnath stupa") is None
+    assert cache.lookup("Varanasi ghats")[0] == 1
+    assert cache.summary()["evictions"] == 1
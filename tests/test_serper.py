@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.stubs import ReplayServer
+from tools.cacheStore import SQLiteCache
+from tools.httpTransport import HttpTransport
+from tools.serper import SerperClient
+from utils.rateLimiter import AdaptiveLimiter
+
+SEARCH = {"organic": [{"title": "Ghats", "link": "https://example.org/ghats", "snippet": "Ghats"}]}
+
+
+@pytest.fixture
+def server():
+    with ReplayServer({"varanasi ghats": SEARCH}, {}) as server:
+        yield server
+
+
+def client(url, cache, **kwargs):
+    return SerperClient(api_key="test", cache=cache, transport=HttpTransport(max_retries=0),
+                        base_url=url, rate_limiter=AdaptiveLimiter("test"), **kwargs)
+
+
+def test_cache_entries_expire_and_are_evicted_least_recently_used():
+    cache = SQLiteCache(":memory:", max_entries=2)
+    cache.set("short", "v", ttl=0.05)
+    cache.set("a", "1", ttl=60)
+    time.sleep(0.06)
+    assert cache.get("short") == (None, False)
+
+    cache.set("b", "2", ttl=60)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") == (None, False)
+    assert cache.get("a") == ("1", True)
+
+
+def test_stale_window_serves_expired_entries():
+    cache = SQLiteCache(":memory:")
+    cache.set("k", "v", ttl=0, stale_ttl=60)
+
+    assert cache.get("k") == ("v", False)
+    assert cache.summary()["stale_hits"] == 1
+
+
+def test_repeated_query_is_served_from_cache(server):
+    serper = client(server.url, SQLiteCache(":memory:"))
+
+    first = serper.search_query("Varanasi ghats")
+    second = serper.search_query("  varanasi   GHATS ")
+
+    assert json.loads(first) == json.loads(second)
+    assert server.requests["search"] == 1
+
+
+def test_clients_with_different_base_urls_do_not_share_entries(server):
+    cache = SQLiteCache(":memory:")
+    with ReplayServer({"varanasi ghats": {"organic": []}}, {}) as other:
+        client(server.url, cache).search_query("Varanasi ghats")
+        replayed = client(other.url, cache).search_query("Varanasi ghats")
+
+        assert json.loads(replayed) == {"organic": []}
+        assert other.requests["search"] == 1
+
+
+def test_stale_entry_is_returned_and_refreshed_in_the_background(server):
+    serper = client(server.url, SQLiteCache(":memory:"))
+    serper.CACHE_TTLS = {"/search": 0, "/images": 0}
+
+    serper.search_query("Varanasi ghats")
+    stale = serper.search_query("Varanasi ghats")
+    deadline = time.time() + 2
+    while server.requests["search"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert json.loads(stale)["organic"][0]["title"] == "Ghats"
+    assert server.requests["search"] == 2
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import threading
+import time
+
+from main.service import AskService
+from utils.records import FormattedResults
+from utils.semanticCache import SemanticCache
+
+ANSWER = "The Ganga aarti starts at dusk on Dashashwamedh Ghat."
+
+
+class FakeEngine:
+    """Engine stand-in answering instantly, or failing the way the final stage does"""
+
+    def __init__(self, error=None, delay=0.0):
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def warm_up(self):
+        pass
+
+    def answer(self, question):
+        self.calls += 1
+        self.release.wait()
+        time.sleep(self.delay)
+        if self.error:
+            return {"content": f"Error processing request: {self.error}", "sources": [], "images": [],
+                    "error": self.error}
+        return {"content": ANSWER, "sources": [], "images": []}
+
+    def research(self, question):
+        self.calls += 1
+        return {}, FormattedResults(processing_date="today")
+
+    def answer_stream(self, formatted_results, question, metrics=None):
+        if self.error:
+            metrics["error"] = self.error
+            yield f"Error processing request: {self.error}"
+            return
+        yield ANSWER
+
+
+async def call(app, method, path, body=b""):
+    """Drive one ASGI request; returns (status, headers, body bytes)"""
+    messages = [{"type": "http.request", "body": body}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def ask(app, path, question):
+    return call(app, "POST", path, json.dumps({"question": question}).encode())
+
+
+def request(app, path, question):
+    """One POST with a question; returns (status, body bytes)"""
+    status, _, body = asyncio.run(ask(app, path, question))
+    return status, body
+
+
+def service(engine, **kwargs):
+    return AskService(engine_factory=lambda: engine, answer_cache=SemanticCache(), **kwargs)
+
+
+def test_answers_are_cached_for_near_duplicates():
+    engine = FakeEngine()
+    app = service(engine)
+
+    assert json.loads(request(app, "/ask", "What are the best ghats in Varanasi?")[1])["content"] == ANSWER
+    status, body = request(app, "/ask", "best ghats in Banaras")
+
+    assert status == 200
+    assert json.loads(body)["metrics"]["cached"] is True
+    assert engine.calls == 1
+
+
+def test_failed_answer_is_not_cached():
+    engine = FakeEngine(error="quota exceeded")
+    app = service(engine)
+
+    request(app, "/ask", "Varanasi ghats")
+    request(app, "/ask", "Varanasi ghats")
+
+    assert engine.calls == 2
+    assert app.stats["cached"] == 0
+
+
+def test_failed_stream_is_not_cached():
+    engine = FakeEngine(error="quota exceeded")
+    app = service(engine)
+
+    status, body = request(app, "/ask/stream", "Varanasi ghats")
+    events = [json.loads(line) for line in body.splitlines()]
+    request(app, "/ask/stream", "Varanasi ghats")
+
+    assert status == 200
+    assert events[-1]["metrics"]["error"] == "quota exceeded"
+    assert engine.calls == 2
+    assert app.stats["cached"] == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    engine = FakeEngine()
+    engine.release.clear()
+    app = service(engine, max_in_flight=1, max_queue=1)
+
+    async def scenario():
+        running = asyncio.ensure_future(ask(app, "/ask", "Varanasi ghats"))
+        queued = asyncio.ensure_future(ask(app, "/ask", "Sarnath stupa"))
+        await asyncio.sleep(0.05)
+        rejected = await ask(app, "/ask", "Kashi Vishwanath temple")
+        engine.release.set()
+        return rejected, await running, await queued
+
+    rejected, running, queued = asyncio.run(scenario())
+
+    assert rejected[0] == 429 and rejected[1][b"retry-after"] == b"1"
+    assert running[0] == queued[0] == 200
+    assert app.stats["rejected"] == 1 and app.stats["completed"] == 2
+    assert app.in_flight == app.waiting == 0
+
+
+def test_queued_request_times_out_with_503():
+    engine = FakeEngine()
+    engine.release.clear()
+    app = service(engine, max_in_flight=1, max_queue=4, queue_timeout=0.05)
+
+    async def scenario():
+        running = asyncio.ensure_future(ask(app, "/ask", "Varanasi ghats"))
+        await asyncio.sleep(0.01)
+        timed_out = await ask(app, "/ask", "Sarnath stupa")
+        engine.release.set()
+        return timed_out, await running
+
+    timed_out, running = asyncio.run(scenario())
+
+    assert timed_out[0] == 503 and running[0] == 200
+    assert app.stats["timed_out"] == 1
+
+
+def test_invalid_body_and_unknown_routes():
+    app = service(FakeEngine())
+
+    assert asyncio.run(call(app, "POST", "/ask", b"not json"))[0] == 400
+    assert asyncio.run(call(app, "POST", "/ask", b'{"question": "  "}'))[0] == 400
+    assert asyncio.run(call(app, "POST", "/ask", b"x" * 70000))[0] == 400
+    assert asyncio.run(call(app, "GET", "/ask"))[0] == 405
+    assert asyncio.run(call(app, "GET", "/nowhere"))[0] == 404
+
+
+def test_health_and_metrics_report_load():
+    app = service(FakeEngine())
+    request(app, "/ask", "Varanasi ghats")
+
+    status, _, health = asyncio.run(call(app, "GET", "/healthz"))
+    _, headers, metrics = asyncio.run(call(app, "GET", "/metrics"))
+
+    assert status == 200 and json.loads(health)["in_flight"] == 0
+    assert headers[b"content-type"].startswith(b"text/plain")
+    assert b'ask_requests_total{outcome="completed"} 1' in metrics
@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import singleflight
+from utils.singleflight import SingleFlight
+
+
+def run_together(count, fn):
+    with ThreadPoolExecutor(count) as pool:
+        return [future.result() for future in [pool.submit(fn) for _ in range(count)]]
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"content": "ghats"}
+
+    results = run_together(4, lambda: flight.do("ghats", slow))
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result is results[0][0] for result, _ in results)
+    assert flight.stats == {"executed": 1, "coalesced": 3, "errors": 0}
+    assert flight.in_flight() == 0
+
+
+def test_waiters_receive_the_leaders_exception():
+    flight = SingleFlight("test")
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("quota exceeded")
+
+    def call():
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            flight.do("ghats", failing)
+
+    run_together(3, call)
+
+    assert flight.stats["errors"] == 1 and flight.stats["executed"] == 1
+
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight("test")
+
+    assert flight.do("ghats", lambda: 1) == (1, False)
+    assert flight.do("ghats", lambda: 2) == (2, False)
+    assert flight.do("aarti", lambda: 3) == (3, False)
+
+
+def test_groups_are_process_wide_and_exported():
+    assert singleflight.group("test-export") is singleflight.group("test-export")
+    singleflight.group("test-export").do("ghats", lambda: None)
+
+    assert singleflight.stats()["test-export"]["executed"] >= 1
+    assert 'singleflight_calls_total{group="test-export",outcome="executed"}' in singleflight.prometheus_text()
+
+
+def test_engine_coalesces_identical_questions(engine, replay_server):
+    engine.segregator.model.latency = 0.2
+
+    results = run_together(3, lambda: engine.research("Varanasi ghats"))
+    engine.research("varanasi   GHATS")
+
+    assert engine.segregator.model.calls == 2
+    assert results[0][1] is results[1][1] is results[2][1]
@@ -0,0 +1,53 @@
+import json
+
+from benchmarks.pipeline_bench import percentile
+from benchmarks.stubs import ReplayServer, StubModel, load_recorded_payloads, prompt_argument, stub_keywords
+from tools.httpTransport import HttpTransport
+from tools.serper import SerperClient
+
+
+def test_stub_model_streams_its_reply_in_chunks():
+    model = StubModel("Dashashwamedh Ghat", chunk_chars=5)
+
+    assert list(model.stream_content("q")) == ["Dasha", "shwam", "edh G", "hat"]
+    assert model.generate_content("q") == "Dashashwamedh Ghat"
+    assert model.calls == 2
+
+
+def test_prompt_argument_recovers_the_substituted_value():
+    template = "Rewrite {{this}} query: {user_query}\nReturn JSON."
+
+    assert prompt_argument(template.format(user_query="banaras ghats"), template, "user_query") == "banaras ghats"
+
+
+def test_stub_keywords_ask_for_images_only_when_requested():
+    assert "image_api" not in stub_keywords("Varanasi ghats")
+    assert stub_keywords("Show me images of ghats")["image_api"]
+
+
+def test_replay_server_serves_localized_links_and_pages(replay_server):
+    client = SerperClient(api_key="replay", use_cache=False, transport=HttpTransport(max_retries=0),
+                          base_url=replay_server.url)
+
+    hit = json.loads(client.search_query("Varanasi ghats"))["organic"][0]
+    page = client.transport.get(hit["link"])
+    images = json.loads(client.image_query("unrecorded query"))["images"]
+
+    assert hit["link"].startswith(f"{replay_server.url}/page/ghats")
+    assert b"evening Ganga aarti" in page.content
+    assert images[0]["link"] == hit["link"]
+    assert replay_server.requests == {"search": 1, "images": 1, "page": 1}
+
+
+def test_load_recorded_payloads_reads_router_dumps(tmp_path):
+    dump = tmp_path / "results.json"
+    dump.write_text(json.dumps({"search_api": [{"ghats": {"organic": []}}], "image_api": [{"aarti": "{}"}]}))
+
+    recorded = load_recorded_payloads([dump, tmp_path / "missing.jsonl"])
+
+    assert recorded == {"search": {"ghats": {"organic": []}}, "images": {"aarti": {}}}
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 95) == 4.0
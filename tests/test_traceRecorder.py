@@ -0,0 +1,91 @@
+import gzip
+import json
+import threading
+
+from utils.traceRecorder import JsonlRecorder
+
+
+def read_lines(path, compressed=False):
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    recorder = JsonlRecorder(path=str(tmp_path / "router.jsonl"))
+    recorder.record("route", {"keyword": "ghats", "results": 3})
+    recorder.flush(timeout=5)
+
+    [line] = read_lines(tmp_path / "router.jsonl")
+    recorder.close()
+
+    assert line["kind"] == "route" and line["keyword"] == "ghats" and "ts" in line
+    assert recorder.stats["written"] == 1
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = tmp_path / "router.jsonl"
+    recorder = JsonlRecorder(path=str(path), max_bytes=1, backup_count=2)
+    for index in range(4):
+        recorder.record("route", {"index": index})
+    recorder.close()
+
+    assert recorder.stats["rotations"] == 4
+    assert [line["index"] for line in read_lines(tmp_path / "router.jsonl.1")] == [3]
+    assert read_lines(tmp_path / "router.jsonl.2")[0]["index"] == 2
+    assert not (tmp_path / "router.jsonl.3").exists()
+
+
+def test_compressed_reopen_counts_uncompressed_bytes(tmp_path):
+    first = JsonlRecorder(path=str(tmp_path / "router.jsonl"), compress=True, max_bytes=0)
+    first.record("route", {"text": "x" * 200})
+    first.close()
+
+    second = JsonlRecorder(path=str(tmp_path / "router.jsonl"), compress=True, max_bytes=0)
+    second.record("route", {"text": "y"})
+    second.flush(timeout=5)
+
+    assert second._file_bytes > 200
+    second.close()
+    assert [line["text"] for line in read_lines(tmp_path / "router.jsonl.gz", compressed=True)] == ["x" * 200, "y"]
+
+
+def test_sampling_drops_records_before_queueing(tmp_path):
+    recorder = JsonlRecorder(path=str(tmp_path / "router.jsonl"), sample_rate=0.0)
+    recorder.record("route", {"keyword": "ghats"})
+    recorder.close()
+
+    assert recorder.stats["sampled_out"] == 1
+    assert not (tmp_path / "router.jsonl").exists()
+
+
+class BlockedRecorder(JsonlRecorder):
+    """Recorder whose writer stalls on the first record until released"""
+
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _write(self, item):
+        self.release.wait()
+        super()._write(item)
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    recorder = BlockedRecorder(path=str(tmp_path / "router.jsonl"), queue_size=1)
+    for index in range(5):
+        recorder.record("route", {"index": index})
+
+    assert recorder.stats["dropped"] >= 3
+    recorder.release.set()
+    recorder.close()
+
+
+def test_flush_returns_when_writer_is_gone(tmp_path):
+    recorder = JsonlRecorder(path=str(tmp_path / "router.jsonl"))
+    recorder.close()
+
+    recorder.flush()
+    recorder.record("route", {"keyword": "ghats"})
+
+    assert recorder.stats["recorded"] == 0
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import tracing
+from utils.traceRecorder import TraceRecorder
+
+
+class ListRecorder(TraceRecorder):
+    def __init__(self):
+        self.records = []
+
+    def record(self, kind, payload):
+        self.records.append((kind, payload))
+
+
+@pytest.fixture
+def enabled():
+    was_enabled = tracing.is_enabled()
+    tracing.enable(True)
+    tracing.metrics.reset()
+    yield
+    tracing.enable(was_enabled)
+    tracing.metrics.reset()
+
+
+def test_disabled_tracing_is_a_shared_noop():
+    was_enabled = tracing.is_enabled()
+    tracing.enable(False)
+    try:
+        with tracing.span("route") as first, tracing.span("scrape") as second:
+            first.set(bytes=10)
+        assert first is second
+        with tracing.trace("request") as current:
+            assert current is None
+    finally:
+        tracing.enable(was_enabled)
+
+
+def test_trace_nests_spans_and_is_recorded(enabled):
+    recorder = ListRecorder()
+
+    with tracing.trace("request", recorder=recorder, query="ghats") as current:
+        with tracing.span("route", keywords=1):
+            with tracing.span("search"):
+                tracing.annotate(cache="hit")
+
+    [(kind, payload)] = recorder.records
+    spans = {item["name"]: item for item in payload["spans"]}
+    assert kind == "trace" and payload["trace_id"] == current.trace_id
+    assert spans["route"]["parent_id"] == spans["request"]["span_id"]
+    assert spans["search"]["parent_id"] == spans["route"]["span_id"]
+    assert spans["search"]["attributes"] == {"cache": "hit"}
+    assert payload["attributes"] == {"query": "ghats"}
+
+
+def test_propagate_joins_worker_spans_to_the_trace(enabled):
+    recorder = ListRecorder()
+
+    def search():
+        with tracing.span("search"):
+            pass
+
+    with tracing.trace("request", recorder=recorder):
+        with tracing.span("route") as route, ThreadPoolExecutor(2) as pool:
+            for future in [pool.submit(tracing.propagate(search)) for _ in range(2)]:
+                future.result()
+
+    searches = [item for item in recorder.records[0][1]["spans"] if item["name"] == "search"]
+    assert len(searches) == 2
+    assert all(item["parent_id"] == route.span_id for item in searches)
+
+
+def test_errors_bytes_and_cache_results_reach_prometheus(enabled):
+    with pytest.raises(ValueError):
+        with tracing.span("scrape", bytes=512, cache="miss"):
+            raise ValueError("boom")
+    with tracing.span("scrape", bytes=256, cache="hit"):
+        pass
+
+    text = tracing.prometheus_text()
+
+    assert 'pipeline_span_duration_seconds_count{span="scrape"} 2' in text
+    assert 'pipeline_span_duration_seconds_bucket{span="scrape",le="+Inf"} 2' in text
+    assert 'pipeline_span_errors_total{span="scrape"} 1' in text
+    assert 'pipeline_span_bytes_total{span="scrape"} 768' in text
+    assert 'pipeline_cache_lookups_total{span="scrape",result="hit"} 1' in text
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stubs import StubModel
+from translator.languageDetector import detect_language, is_english
+from translator.queryTranslator import Translator
+
+PROMPT = Path(__file__).resolve().parent.parent / "prompts" / "translator" / "translator_prompt.txt"
+
+
+@pytest.mark.parametrize("query, language", [
+    ("What are the best ghats in Varanasi?", "english"),
+    ("Café near Assi Ghat", "english"),
+    ("वाराणसी में घूमने की जगह", "devanagari"),
+    ("বারাণসী ঘাট", "other_script"),
+    ("Varanasi mein ghumne ki jagah batao", "romanized_hindi"),
+    ("Banaras ke ghat", "romanized_hindi"),
+    ("", "english"),
+])
+def test_detect_language(query, language):
+    assert detect_language(query) == language
+
+
+def test_place_names_alone_do_not_count_as_hindi():
+    assert is_english("Kashi Vishwanath temple timings")
+
+
+def translator(**kwargs):
+    model = StubModel(responder=lambda prompt: "translated")
+    return Translator("key", "gemini", "stub", prompt_template_path=str(PROMPT), model=model, **kwargs), model
+
+
+def test_english_query_skips_the_model():
+    english, model = translator()
+
+    assert english.translate_query("Best ghats in Varanasi") == "Best ghats in Varanasi"
+    assert model.calls == 0
+    assert english.stats == {"skipped": 1, "translated": 0}
+
+
+def test_other_languages_are_translated():
+    hindi, model = translator()
+
+    assert hindi.translate_query("Varanasi mein kya dekhna chahiye") == "translated"
+    assert model.calls == 1
+
+
+def test_skipping_can_be_disabled():
+    always, model = translator(skip_english=False)
+
+    always.translate_query("Best ghats in Varanasi")
+
+    assert model.calls == 1
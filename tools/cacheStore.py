@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class SQLiteCache:
+    """
+    Small disk-backed key/value cache with TTLs and LRU eviction.
+
+    Entries are kept past their expiry for an optional stale window so callers
+    can serve a stale value while refreshing it. Eviction removes the least
+    recently used entries once either the entry count or the total stored
+    bytes exceed their bounds.
+    """
+
+    _shared: Dict[str, "SQLiteCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = ".cache/cache.sqlite3",
+                 max_entries: int = 5000,
+                 max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: SQLite database file (created along with its directory)
+            max_entries: Maximum number of entries kept before LRU eviction
+            max_bytes: Optional bound on the total size of stored values
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache(last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls, path: str, **kwargs) -> "SQLiteCache":
+        """Return one process-wide cache instance per database path"""
+        with cls._shared_lock:
+            cache = cls._shared.get(path)
+            if cache is None:
+                cache = cls(path, **kwargs)
+                cls._shared[path] = cache
+            return cache
+
+    def get(self, key: str) -> Tuple[Optional[str], bool]:
+        """
+        Look up a key
+        Returns:
+            (value, is_fresh); value is None on a miss, is_fresh is False for
+            entries served from the stale window
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stale_until FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                self.stats["misses"] += 1
+                return None, False
+
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            if row[1] > now:
+                self.stats["hits"] += 1
+                return row[0], True
+            self.stats["stale_hits"] += 1
+            return row[0], False
+
+    def set(self, key: str, value: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        """
+        Store a value
+        Args:
+            key: Cache key
+            value: Serialized value
+            ttl: Seconds the entry counts as fresh
+            stale_ttl: Extra seconds the entry may be served stale
+        """
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, stale_until, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, size, now + ttl, now + ttl + stale_ttl, now)
+            )
+            self.stats["sets"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        """Extend the lifetime of an existing entry without rewriting its value"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE cache SET expires_at = ?, stale_until = ?, last_access = ? WHERE key = ?",
+                (now + ttl, now + ttl + stale_ttl, now, key)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until within bounds"""
+        cursor = self._conn.execute("DELETE FROM cache WHERE stale_until <= ?", (time.time(),))
+        self.stats["evictions"] += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        while count > self.max_entries or (self.max_bytes is not None and total > self.max_bytes and count > 1):
+            key, size = self._conn.execute(
+                "SELECT key, size FROM cache ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            count -= 1
+            total -= size
+
+    def summary(self) -> Dict:
+        """Counters plus current size, for logging or metrics export"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": count,
+            "bytes": total,
+            "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,415 @@
+import codecs
+import re
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template'}
+
+# Fields an extractor can produce; callers request a subset
+ALL_FIELDS = frozenset({"paragraphs", "headings", "cleaned_text", "domain_info"})
+
+
+# Bytes scanned for a <meta charset> declaration, as in the HTML prescan
+SNIFF_BYTES = 1024
+_META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_:.\-]+)', re.IGNORECASE)
+# Labels browsers decode as windows-1252
+_WINDOWS_1252_LABELS = {"iso-8859-1", "iso8859-1", "latin1", "latin-1", "us-ascii", "ascii"}
+
+
+def sniff_encoding(prefix: bytes) -> str:
+    """Encoding named by a BOM or a <meta charset> in the first bytes of a document, else UTF-8"""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    match = _META_CHARSET.search(prefix[:SNIFF_BYTES])
+    if match:
+        label = match.group(1).decode('ascii').lower()
+        if label in _WINDOWS_1252_LABELS:
+            return 'cp1252'
+        try:
+            # A byte stream that could be read this far is not UTF-16, whatever it declares
+            if not codecs.lookup(label).name.startswith('utf-16'):
+                return label
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def _requested(fields: Optional[Iterable[str]]) -> FrozenSet[str]:
+    if fields is None:
+        return ALL_FIELDS
+    fields = frozenset(fields)
+    unknown = fields - ALL_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown extractor fields: {sorted(unknown)}")
+    return fields
+
+
+class ExtractionSession(ABC):
+    """
+    One document being extracted.
+
+    Bytes are passed to ``feed`` as they arrive; ``is_satisfied`` turns True once
+    every requested field is complete so the caller can stop reading. ``result``
+    returns the raw (unprocessed) fields after ``close``.
+    """
+
+    def __init__(self, max_paragraphs: int, max_headings: int, fields: FrozenSet[str],
+                 encoding: Optional[str] = None):
+        self.max_paragraphs = max_paragraphs if "paragraphs" in fields else 0
+        self.max_headings = max_headings if "headings" in fields else 0
+        self.fields = fields
+
+    @abstractmethod
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the response body."""
+        pass
+
+    def is_satisfied(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def result(self) -> Dict:
+        """Raw extracted fields of the document."""
+        pass
+
+
+class StreamingContentParser(HTMLParser):
+    """
+    Incremental HTML parser collecting paragraphs, headings, title and meta description.
+
+    Chunks are passed to ``feed`` as they arrive from the network; ``is_satisfied``
+    turns True once the requested number of paragraphs and headings has been
+    collected and the document head is done, so the caller can stop reading.
+    """
+
+    def __init__(self, max_paragraphs: int = 20, max_headings: int = 10,
+                 collect_text: bool = True, collect_head: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.max_paragraphs = max_paragraphs
+        self.max_headings = max_headings
+        self.collect_text = collect_text
+        self.collect_head = collect_head
+        self.paragraphs: List[str] = []
+        self.headings: List[str] = []
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.text_parts: List[str] = []
+
+        self._head_done = False
+        self._skip_depth = 0
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._paragraph: Optional[List[str]] = None
+        self._heading: Optional[List[str]] = None
+        self._heading_tag: Optional[str] = None
+
+    def is_satisfied(self) -> bool:
+        # Whole-document text can only be complete at the end of the page
+        if self.collect_text:
+            return False
+        return (
+            (self._head_done or not self.collect_head)
+            and len(self.paragraphs) >= self.max_paragraphs
+            and len(self.headings) >= self.max_headings
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+        if tag == 'meta':
+            if self.meta_description is None:
+                attributes = dict(attrs)
+                if (attributes.get('name') or '').lower() == 'description':
+                    self.meta_description = attributes.get('content') or ''
+            return
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+            return
+        if tag == 'body' or tag == 'p' or tag in HEADING_TAGS:
+            self._head_done = True
+        if tag == 'p':
+            # An unclosed <p> is implicitly ended by the next one
+            self._close_paragraph()
+            if len(self.paragraphs) < self.max_paragraphs:
+                self._paragraph = []
+        elif tag in HEADING_TAGS and self._heading is None and len(self.headings) < self.max_headings:
+            self._heading = []
+            self._heading_tag = tag
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts)
+        elif tag == 'head':
+            self._head_done = True
+        elif tag == 'p':
+            self._close_paragraph()
+        elif tag == self._heading_tag:
+            self.headings.append(''.join(self._heading))
+            self._heading = None
+            self._heading_tag = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self.collect_text:
+            self.text_parts.append(data)
+        if self._paragraph is not None:
+            self._paragraph.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+    def _close_paragraph(self):
+        if self._paragraph is not None:
+            self.paragraphs.append(''.join(self._paragraph))
+            self._paragraph = None
+
+    def close(self):
+        super().close()
+        self._close_paragraph()
+        if self._heading is not None:
+            self.headings.append(''.join(self._heading))
+            self._heading = None
+
+    def result(self) -> Dict:
+        """Raw (unprocessed) extracted fields"""
+        return {
+            "paragraphs": self.paragraphs,
+            "headings": self.headings,
+            "text": ''.join(self.text_parts),
+            "title": self.title or '',
+            "meta_description": self.meta_description or ''
+        }
+
+
+class StdlibSession(ExtractionSession):
+    """Single-pass extraction on the standard library HTMLParser"""
+
+    def __init__(self, max_paragraphs: int, max_headings: int, fields: FrozenSet[str],
+                 encoding: Optional[str] = None):
+        super().__init__(max_paragraphs, max_headings, fields)
+        # Without a declared charset the first bytes are held back until it can be sniffed
+        self._decoder = self._make_decoder(encoding) if encoding else None
+        self._prefix = b''
+        self._parser = StreamingContentParser(
+            max_paragraphs=self.max_paragraphs,
+            max_headings=self.max_headings,
+            collect_text="cleaned_text" in fields,
+            collect_head="domain_info" in fields
+        )
+
+    @staticmethod
+    def _make_decoder(encoding: str):
+        try:
+            return codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, chunk: bytes) -> None:
+        if self._decoder is None:
+            self._prefix += chunk
+            if len(self._prefix) < SNIFF_BYTES:
+                return
+            chunk, self._prefix = self._prefix, b''
+            self._decoder = self._make_decoder(sniff_encoding(chunk))
+        self._parser.feed(self._decoder.decode(chunk))
+
+    def is_satisfied(self) -> bool:
+        return self._parser.is_satisfied()
+
+    def close(self) -> None:
+        if self._decoder is None:
+            self._decoder = self._make_decoder(sniff_encoding(self._prefix))
+            self._parser.feed(self._decoder.decode(self._prefix))
+            self._prefix = b''
+        self._parser.feed(self._decoder.decode(b'', final=True))
+        self._parser.close()
+
+    def result(self) -> Dict:
+        return self._parser.result()
+
+
+class LxmlSession(ExtractionSession):
+    """Single-pass extraction on lxml's incremental HTML pull parser"""
+
+    def __init__(self, max_paragraphs: int, max_headings: int, fields: FrozenSet[str],
+                 encoding: Optional[str] = None):
+        super().__init__(max_paragraphs, max_headings, fields)
+        from lxml import etree
+
+        # Without a declared charset let libxml2 detect it from the document
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        self._collect_text = "cleaned_text" in fields
+        self._collect_head = "domain_info" in fields
+        self._head_done = False
+        self._root = None
+        self.paragraphs: List[str] = []
+        self.headings: List[str] = []
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+
+    def _drain(self) -> None:
+        for event, element in self._parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ''
+            if self._root is None:
+                self._root = element.getroottree().getroot()
+            if event == 'start':
+                if tag == 'meta' and self.meta_description is None:
+                    if (element.get('name') or '').lower() == 'description':
+                        self.meta_description = element.get('content') or ''
+                elif tag in ('body', 'p') or tag in HEADING_TAGS:
+                    self._head_done = True
+                continue
+
+            if tag == 'p' and len(self.paragraphs) < self.max_paragraphs:
+                self.paragraphs.append(self._text(element))
+            elif tag in HEADING_TAGS and len(self.headings) < self.max_headings:
+                self.headings.append(self._text(element))
+            elif tag == 'title' and self.title is None:
+                self.title = element.text or ''
+            elif tag == 'head':
+                self._head_done = True
+
+    @staticmethod
+    def _text(element) -> str:
+        """Concatenated text of an element, skipping scripts, styles and comments"""
+        parts: List[str] = []
+
+        def walk(node):
+            if node.text:
+                parts.append(node.text)
+            for child in node:
+                if isinstance(child.tag, str) and child.tag not in SKIPPED_TAGS:
+                    walk(child)
+                if child.tail:
+                    parts.append(child.tail)
+
+        walk(element)
+        return ''.join(parts)
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.feed(chunk)
+        self._drain()
+
+    def is_satisfied(self) -> bool:
+        if self._collect_text:
+            return False
+        return (
+            (self._head_done or not self._collect_head)
+            and len(self.paragraphs) >= self.max_paragraphs
+            and len(self.headings) >= self.max_headings
+        )
+
+    def close(self) -> None:
+        try:
+            root = self._parser.close()
+            self._root = root if root is not None else self._root
+        except Exception:
+            pass
+        self._drain()
+
+    def result(self) -> Dict:
+        text = ''
+        if self._collect_text and self._root is not None:
+            text = self._text(self._root)
+        return {
+            "paragraphs": self.paragraphs,
+            "headings": self.headings,
+            "text": text,
+            "title": self.title or '',
+            "meta_description": self.meta_description or ''
+        }
+
+
+class BeautifulSoupSession(ExtractionSession):
+    """Buffers the whole document and extracts with BeautifulSoup (the original path)"""
+
+    def __init__(self, max_paragraphs: int, max_headings: int, fields: FrozenSet[str],
+                 encoding: Optional[str] = None):
+        super().__init__(max_paragraphs, max_headings, fields)
+        self._chunks: List[bytes] = []
+        self._result: Dict = {}
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+
+    def close(self) -> None:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(b''.join(self._chunks), 'html.parser')
+        meta = soup.find("meta", {"name": "description"}) if "domain_info" in self.fields else None
+        self._result = {
+            "paragraphs": [p.text for p in soup.find_all('p', limit=self.max_paragraphs)]
+            if self.max_paragraphs else [],
+            "headings": [h.text for h in soup.find_all(list(HEADING_TAGS), limit=self.max_headings)]
+            if self.max_headings else [],
+            "text": soup.get_text() if "cleaned_text" in self.fields else '',
+            "title": (soup.title.string or '') if soup.title else '',
+            "meta_description": meta.get("content", '') if meta else ''
+        }
+
+    def result(self) -> Dict:
+        return self._result
+
+
+class ExtractorEngine:
+    """Creates extraction sessions for one parser backend"""
+
+    def __init__(self, name: str, session_class):
+        self.name = name
+        self.session_class = session_class
+
+    def session(self, max_paragraphs: int = 20, max_headings: int = 10,
+                fields: Optional[Iterable[str]] = None,
+                encoding: Optional[str] = None) -> ExtractionSession:
+        return self.session_class(max_paragraphs, max_headings, _requested(fields), encoding)
+
+    def extract(self, html: bytes, max_paragraphs: int = 20, max_headings: int = 10,
+                fields: Optional[Iterable[str]] = None,
+                encoding: Optional[str] = None) -> Dict:
+        """Extract raw fields from a complete document"""
+        session = self.session(max_paragraphs, max_headings, fields, encoding)
+        session.feed(html)
+        session.close()
+        return session.result()
+
+
+EXTRACTORS = {
+    "stdlib": StdlibSession,
+    "lxml": LxmlSession,
+    "bs4": BeautifulSoupSession,
+}
+
+
+def get_extractor(name: str = "stdlib") -> ExtractorEngine:
+    """
+    Look up an extractor backend by name
+    Args:
+        name: One of 'stdlib' (default, no extra dependency), 'lxml' or 'bs4'
+    Raises:
+        ValueError: For unknown backends or when the backend's parser is not installed
+    """
+    session_class = EXTRACTORS.get(name)
+    if session_class is None:
+        raise ValueError(f"Unsupported extractor: {name}")
+    if name == "lxml":
+        try:
+            import lxml.etree  # noqa: F401
+        except ImportError as e:
+            raise ValueError("The 'lxml' extractor requires the lxml package") from e
+    return ExtractorEngine(name, session_class)
@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout
+from utils.rateLimiter import parse_retry_after
+
+
+class HttpTransport:
+    """
+    Shared HTTP transport with per-host connection pooling and retries.
+
+    Wraps a single requests.Session so keep-alive sockets are reused across
+    SerperClient and Scraper calls. Requests answered with 429/5xx, or that
+    fail to connect, are retried with exponential backoff and full jitter.
+    A connection dropped after the request may have been sent is only retried
+    for idempotent methods, so a billed POST is not charged twice.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+
+    def __init__(self, pool_connections: int = 32,
+                 pool_maxsize: int = 16,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0):
+        """
+        Args:
+            pool_connections: Number of per-host pools kept alive
+            pool_maxsize: Maximum sockets kept per host
+            max_retries: Retries after the first attempt on 429/5xx or connection errors
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Upper bound for a single backoff delay
+            connect_timeout: Default seconds to establish a connection
+            read_timeout: Default seconds to wait for response data
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    def _timeout(self, timeout: Union[None, float, Tuple[float, float]]) -> Tuple[float, float]:
+        """Normalize a timeout to (connect, read); a bare number sets the read timeout"""
+        if timeout is None:
+            return self.connect_timeout, self.read_timeout
+        if isinstance(timeout, tuple):
+            return timeout
+        return min(self.connect_timeout, timeout), timeout
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Honour the server's Retry-After when given (capped at backoff_max), else jittered backoff"""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def request(self, method: str, url: str,
+                timeout: Union[None, float, Tuple[float, float]] = None,
+                retry_statuses: Optional[Set[int]] = None,
+                retry_unsent_only: Optional[bool] = None,
+                **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session
+        Args:
+            method: HTTP method
+            url: Target URL
+            timeout: (connect, read) tuple, a read timeout, or None for defaults
+            retry_statuses: Statuses to retry (default RETRY_STATUSES); callers that
+                handle 429 through a rate limiter leave it out
+            retry_unsent_only: Retry connection errors only when the connection was never
+                established (ConnectTimeout); defaults to True for non-idempotent methods
+            **kwargs: Passed through to requests.Session.request
+        Returns:
+            The final response; a 429/5xx is returned once retries are exhausted
+        Raises:
+            RequestException: When the last attempt fails at the network level
+        """
+        timeout = self._timeout(timeout)
+        retry_statuses = self.RETRY_STATUSES if retry_statuses is None else retry_statuses
+        if retry_unsent_only is None:
+            retry_unsent_only = method.upper() not in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self._count("requests")
+            response = None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except ConnectionError as e:
+                # Any other connection error may have hit a request the server already received
+                if attempt >= self.max_retries or (retry_unsent_only and not isinstance(e, ConnectTimeout)):
+                    self._count("failures")
+                    raise
+            else:
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    return response
+                response.close()
+
+            self._count("retries")
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def pool_stats(self) -> Dict:
+        """
+        Connection pool statistics
+        Returns:
+            Request/retry counters and, per host, connections opened versus
+            requests served (the difference is keep-alive reuse)
+        """
+        pools = self._adapter.poolmanager.pools
+        hosts = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": max(pool.num_requests - pool.num_connections, 0)
+            }
+        with self._stats_lock:
+            return {**self.stats, "hosts": hosts}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Process-wide transport shared by the tools"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,259 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Words too common to help ranking
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it me of on or show "
+    "tell that the their there these this to was what when where which who why "
+    "with you your best about".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase ASCII-folded word tokens without stopwords; a trailing plural 's' is dropped"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = []
+    for token in _TOKEN.findall(text):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class LocalCorpus:
+    """
+    Curated pages the local index is built from, stored as JSONL.
+
+    Each line is one source (a Wikipedia title or URL) with its passages and a
+    content hash, so re-ingesting only replaces sources that changed.
+    """
+
+    def __init__(self, path: str = ".cache/local_index/corpus.jsonl"):
+        self.path = Path(path)
+        self.sources: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.sources[record["source"]] = record
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.sources
+
+    def upsert(self, source: str, title: str, url: str, passages: List[Dict], digest: str) -> bool:
+        """
+        Add or replace one source
+
+        Returns:
+            False if the stored source already has this content hash
+        """
+        current = self.sources.get(source)
+        if current is not None and current.get("hash") == digest:
+            return False
+        self.sources[source] = {
+            "source": source, "title": title, "url": url, "hash": digest,
+            "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "passages": passages
+        }
+        return True
+
+    def remove(self, source: str) -> bool:
+        return self.sources.pop(source, None) is not None
+
+    def passages(self) -> Iterable[Dict]:
+        for record in self.sources.values():
+            for passage in record["passages"]:
+                yield {"source": record["source"], "title": record["title"], "url": record["url"], **passage}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in self.sources.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+
+class LocalIndex:
+    """
+    Memory-mapped BM25 inverted index over the local corpus.
+
+    On disk (one directory, swapped in atomically on rebuild):
+        meta.json            passage count, average length, BM25 parameters
+        lexicon.json         term -> [postings offset, document frequency]
+        postings_doc.u32     passage ids, grouped by term
+        postings_tf.u16      term frequency per posting
+        doc_len.u32          tokens per passage
+        passages.jsonl       passage payloads, addressed by passages.offsets.u64
+
+    Postings, lengths and passages are read through memory maps, so opening
+    the index is cheap and only the pages a query touches are loaded.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(self.directory / "lexicon.json", "r", encoding="utf-8") as f:
+            self.lexicon: Dict[str, List[int]] = json.load(f)
+        self.count = self.meta["passages"]
+        self.avg_len = self.meta["avg_len"] or 1.0
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.postings_doc = self._memmap("postings_doc.u32", np.uint32)
+        self.postings_tf = self._memmap("postings_tf.u16", np.uint16)
+        self.doc_len = self._memmap("doc_len.u32", np.uint32)
+        self.offsets = self._memmap("passages.offsets.u64", np.uint64)
+        self._passages = open(self.directory / "passages.jsonl", "rb")
+        self._read_lock = threading.Lock()
+
+    def _memmap(self, name: str, dtype) -> np.ndarray:
+        path = self.directory / name
+        if path.stat().st_size == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    @staticmethod
+    def build(passages: Iterable[Dict], directory: str, k1: float = 1.2, b: float = 0.75) -> "LocalIndex":
+        """Write a fresh index for the given passages and swap it into place"""
+        directory = Path(directory)
+        tmp = directory.with_name(directory.name + ".building")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        offsets = []
+        with open(tmp / "passages.jsonl", "wb") as f:
+            for doc_id, passage in enumerate(passages):
+                offsets.append(f.tell())
+                f.write(json.dumps(passage, ensure_ascii=False).encode("utf-8") + b"\n")
+                text = " ".join([passage.get("title", ""), passage.get("section", "")] + passage.get("paragraphs", []))
+                tokens = tokenize(text)
+                lengths.append(len(tokens))
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    term_postings.setdefault(token, []).append((doc_id, min(tf, 65535)))
+
+        lexicon = {}
+        docs, tfs = [], []
+        for term in sorted(term_postings):
+            postings = term_postings[term]
+            lexicon[term] = [len(docs), len(postings)]
+            docs.extend(doc for doc, _ in postings)
+            tfs.extend(tf for _, tf in postings)
+
+        np.asarray(docs, dtype=np.uint32).tofile(tmp / "postings_doc.u32")
+        np.asarray(tfs, dtype=np.uint16).tofile(tmp / "postings_tf.u16")
+        np.asarray(lengths, dtype=np.uint32).tofile(tmp / "doc_len.u32")
+        np.asarray(offsets, dtype=np.uint64).tofile(tmp / "passages.offsets.u64")
+        with open(tmp / "lexicon.json", "w", encoding="utf-8") as f:
+            json.dump(lexicon, f)
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "passages": len(lengths), "terms": len(lexicon),
+                "avg_len": (sum(lengths) / len(lengths)) if lengths else 0.0,
+                "k1": k1, "b": b, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }, f)
+
+        # Swap directories so readers never see a half-written index
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, old)
+        os.replace(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return LocalIndex(str(directory))
+
+    def passage(self, doc_id: int) -> Dict:
+        with self._read_lock:
+            self._passages.seek(int(self.offsets[doc_id]))
+            return json.loads(self._passages.readline())
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, float, Dict]]:
+        """
+        Rank passages with BM25
+
+        Returns:
+            Up to k (score, coverage, passage) tuples, best first; coverage is the
+            fraction of distinct query terms the passage contains
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.count:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        matched = np.zeros(self.count, dtype=np.uint16)
+        for term in terms:
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            docs = self.postings_doc[offset:offset + df]
+            tf = self.postings_tf[offset:offset + df].astype(np.float32)
+            idf = math.log(1.0 + (self.count - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / self.avg_len)
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+            matched[docs] += 1
+
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[doc]), float(matched[doc]) / len(terms), self.passage(int(doc)))
+            for doc in top if scores[doc] > 0
+        ]
+
+    def search_results(self, query: str, k: int = 5) -> Dict:
+        """Search results shaped like a Serper /search response; hits carry their paragraphs"""
+        hits = self.search(query, k)
+        return {
+            "searchParameters": {"q": query, "engine": "local"},
+            "organic": [
+                {
+                    "title": f"{passage['title']} - {passage['section']}" if passage.get("section") else passage["title"],
+                    "link": passage["url"],
+                    "snippet": (passage.get("paragraphs") or [""])[0][:300],
+                    "position": position,
+                    "paragraphs": passage.get("paragraphs", []),
+                    "headings": [passage["section"]] if passage.get("section") else [],
+                    "score": round(score, 3),
+                    "coverage": round(coverage, 3)
+                }
+                for position, (score, coverage, passage) in enumerate(hits, 1)
+            ]
+        }
+
+    def close(self) -> None:
+        self._passages.close()
+
+
+_default_index: Optional[LocalIndex] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """Process-wide index at LOCAL_INDEX_PATH, or None if it has not been built"""
+    global _default_index, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            directory = Path(os.getenv("LOCAL_INDEX_PATH", ".cache/local_index/index"))
+            if (directory / "meta.json").exists():
+                _default_index = LocalIndex(str(directory))
+            _default_loaded = True
+        return _default_index
@@ -1,15 +1,48 @@
 import re
-import requests
+import os
+import json
 from requests.exceptions import RequestException
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional
+from tools.cacheStore import SQLiteCache
+from tools.httpTransport import HttpTransport, get_transport
+from tools.htmlExtractor import get_extractor
+from utils import tracing
+from utils import singleflight
 
 
 class Scraper:
-    def __init__(self):
+    # Seconds an extracted page is served without contacting the site
+    CACHE_TTL = 6 * 60 * 60
+    # Extra seconds an expired entry is kept for conditional revalidation
+    REVALIDATE_TTL = 7 * 24 * 60 * 60
+    # Bytes read per network chunk in streaming mode
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self, cache: Optional[SQLiteCache] = None, use_cache: bool = True,
+                 transport: Optional[HttpTransport] = None,
+                 extractor: Optional[str] = None):
+        """
+        Args:
+            cache: Content cache; defaults to the shared cache at SCRAPER_CACHE_PATH
+            use_cache: Set False to always download and parse pages
+            transport: HTTP transport; defaults to the process-wide pooled transport
+            extractor: HTML extractor backend ('stdlib', 'lxml' or 'bs4');
+                defaults to SCRAPER_EXTRACTOR or 'stdlib'
+        """
         self._html_tags = re.compile(r'<[^>]+>')
         self._whitespace = re.compile(r'\s+')
+        self._special = re.compile(r'[^a-zA-Z0-9\s.,!?\-&\'"]+')
         self._non_printable = re.compile(r'[^\x20-\x7E]')
+        self.extractor = get_extractor(extractor or os.getenv("SCRAPER_EXTRACTOR", "stdlib"))
+        if use_cache and cache is None:
+            cache = SQLiteCache.shared(
+                os.getenv("SCRAPER_CACHE_PATH", ".cache/pages.sqlite3"),
+                max_entries=int(os.getenv("SCRAPER_CACHE_MAX_ENTRIES", "20000")),
+                max_bytes=int(os.getenv("SCRAPER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+            )
+        self.cache = cache if use_cache else None
+        self.transport = transport or get_transport()
+        self._inflight = singleflight.group("scrape")
 
     def _process_text(self, text: str, 
                      lowercase: bool = False,
@@ -23,106 +56,218 @@ class Scraper:
         Returns:
             Processed text string
         """
-        # Basic cleaning
-        text = self._html_tags.sub(' ', text)  # Remove HTML tags
-        text = text.replace('\n', ' ').replace('\t', ' ')
+        # Basic cleaning; \s+ already covers newlines and tabs
+        if '<' in text:
+            text = self._html_tags.sub(' ', text)  # Remove HTML tags
         text = self._whitespace.sub(' ', text).strip()
         
         # Advanced cleaning
         if remove_special:
-            text = re.sub(r'[^a-zA-Z0-9\s.,!?\-&\'"]', '', text)
+            text = self._special.sub('', text)
         if lowercase:
             text = text.lower()
             
-        # Remove non-printable characters
-        text = self._non_printable.sub(' ', text)
+        # Remove non-printable characters; after special-character removal
+        # only single spaces remain, so this pass is only needed without it
+        if not remove_special:
+            text = self._non_printable.sub(' ', text)
         return text
 
+    def _build_content(self, extracted: Dict, fields: FrozenSet[str]) -> Dict:
+        """Process the raw extractor output into the requested fields"""
+        content = {}
+        if "paragraphs" in fields:
+            content["paragraphs"] = [self._process_text(p) for p in extracted["paragraphs"]]
+        if "headings" in fields:
+            content["headings"] = [self._process_text(h) for h in extracted["headings"]]
+        if "cleaned_text" in fields:
+            content["cleaned_text"] = self._process_text(extracted["text"])
+        if "domain_info" in fields:
+            content["domain_info"] = {
+                "title": self._process_text(extracted["title"]),
+                "meta_description": self._process_text(extracted["meta_description"])
+            }
+        return content
+
     def content_extractor(self, response: bytes, 
                          max_paragraphs: int = 20,
-                         max_headings: int = 10) -> Dict[str, List[str]]:
+                         max_headings: int = 10,
+                         fields: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
         """
         Extract and process content from HTML response
         Args:
             response: HTML bytes content
             max_paragraphs: Maximum paragraphs to return
             max_headings: Maximum headings to return
+            fields: Subset of paragraphs/headings/cleaned_text/domain_info to
+                produce; None produces all of them
         Returns:
             Dictionary containing processed content
         """
-        soup = BeautifulSoup(response, 'html.parser')
-        if not soup:
-            return {}
-
-        # Extract and process paragraphs
-        paragraphs = [
-            self._process_text(p.text) 
-            for p in soup.find_all('p')[:max_paragraphs]
-        ]
-
-        # Extract and process headings
-        headings = [
-            self._process_text(h.text)
-            for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])[:max_headings]
-        ]
-
-        return {
-            "paragraphs": paragraphs,
-            "headings": headings,
-            "cleaned_text": self._process_text(soup.get_text()),
-            "domain_info": {
-                "title": self._process_text(soup.title.string) if soup.title else "",
-                "meta_description": self._process_text(
-                    soup.find("meta", {"name": "description"})["content"]
-                ) if soup.find("meta", {"name": "description"}) else ""
-            }
+        session = self.extractor.session(max_paragraphs, max_headings, fields)
+        session.feed(response)
+        session.close()
+        return self._build_content(session.result(), session.fields)
+
+    def stream_extractor(self, response,
+                         max_paragraphs: int = 20,
+                         max_headings: int = 10,
+                         max_bytes: int = 1024 * 1024,
+                         fields: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Extract content while the response is still downloading
+        Args:
+            response: Streaming requests response
+            max_paragraphs: Maximum paragraphs to return
+            max_headings: Maximum headings to return
+            max_bytes: Byte budget; reading stops once it is spent
+            fields: Subset of fields to produce, as in content_extractor
+        Returns:
+            Dictionary with the same fields as content_extractor; cleaned_text
+            covers only the part of the page that was read
+        """
+        # Without a header charset the extractor sniffs a BOM or <meta charset>, else uses UTF-8
+        encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+        session = self.extractor.session(max_paragraphs, max_headings, fields, encoding)
+
+        received = 0
+        try:
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                if not chunk:
+                    continue
+                chunk = chunk[:max_bytes - received]
+                received += len(chunk)
+                session.feed(chunk)
+                if session.is_satisfied() or received >= max_bytes:
+                    break
+            session.close()
+        finally:
+            response.close()
+            tracing.annotate(bytes=received)
+
+        return self._build_content(session.result(), session.fields)
+
+    def _store(self, cache_key: str, content: Dict, response_headers) -> None:
+        """Cache the extracted content together with its validators"""
+        entry = {
+            "content": content,
+            "etag": response_headers.get('ETag'),
+            "last_modified": response_headers.get('Last-Modified')
         }
+        self.cache.set(
+            cache_key,
+            json.dumps(entry, ensure_ascii=False),
+            self.CACHE_TTL,
+            self.REVALIDATE_TTL
+        )
 
     def get_website_content(self, link: str, 
                            timeout: int = 10, 
                            headers: Optional[Dict] = None,
                            max_paragraphs: int = 20,
-                           max_headings: int = 10) -> Dict:
+                           max_headings: int = 10,
+                           stream_parse: bool = True,
+                           max_bytes: int = 1024 * 1024,
+                           fields: Optional[Iterable[str]] = None) -> Dict:
         """
         Fetch and process website content
+
+        Extracted content is cached per URL; fresh entries skip both the
+        download and the parse, expired ones are revalidated with
+        If-None-Match / If-Modified-Since.
         Args:
             link: URL to scrape
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds (connect timeout comes from the transport)
             headers: Custom headers dictionary
             max_paragraphs: Limit number of paragraphs returned
             max_headings: Limit number of headings returned
+            stream_parse: Parse while downloading and stop once enough content
+                is collected; False downloads the full page first
+            max_bytes: Byte budget for the streaming fetch
+            fields: Subset of paragraphs/headings/cleaned_text/domain_info to
+                produce; None produces all of them
         Returns:
             Dictionary with processed content
         Raises:
             RequestException: For network-related errors
         """
+        field_key = ",".join(sorted(fields)) if fields is not None else "all"
+        cache_key = f"{link}|{max_paragraphs}|{max_headings}|{field_key}"
+        with tracing.span("scrape", url=link):
+            # Concurrent requests for the same page share one download and parse
+            content, shared = self._inflight.do(
+                cache_key, self._load_content, link, cache_key, timeout, headers,
+                max_paragraphs, max_headings, stream_parse, max_bytes, fields
+            )
+            tracing.annotate(coalesced=shared)
+            return content
+
+    def _load_content(self, link: str, cache_key: str, timeout: int, headers: Optional[Dict],
+                      max_paragraphs: int, max_headings: int, stream_parse: bool,
+                      max_bytes: int, fields: Optional[Iterable[str]]) -> Dict:
+        """Cache lookup, conditional fetch and extraction behind get_website_content"""
         default_headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
                           'AppleWebKit/537.36 (KHTML, like Gecko) '
                           'Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.5'
         }
+        request_headers = dict(headers or default_headers)
+
+        # Serve fresh pages straight from the cache; revalidate expired ones
+        cached = None
+        if self.cache is not None:
+            value, fresh = self.cache.get(cache_key)
+            if value is not None:
+                cached = json.loads(value)
+                if fresh:
+                    tracing.annotate(cache="hit")
+                    return cached["content"]
+                if cached.get("etag"):
+                    request_headers['If-None-Match'] = cached["etag"]
+                if cached.get("last_modified"):
+                    request_headers['If-Modified-Since'] = cached["last_modified"]
 
         try:
-            response = requests.get(
-                url=link,
-                headers=headers or default_headers,
+            response = self.transport.get(
+                link,
+                headers=request_headers,
                 timeout=timeout,
                 allow_redirects=True,
                 stream=True
             )
+            if response.status_code == 304 and cached is not None:
+                response.close()
+                self.cache.touch(cache_key, self.CACHE_TTL, self.REVALIDATE_TTL)
+                tracing.annotate(cache="revalidated", status=304)
+                return cached["content"]
             response.raise_for_status()
+            tracing.annotate(cache="miss" if self.cache is not None else "disabled", status=response.status_code)
 
             # Check content type before processing
             content_type = response.headers.get('Content-Type', '')
             if 'text/html' not in content_type:
                 raise ValueError(f"Unsupported content type: {content_type}")
 
-            return self.content_extractor(
-                response.content,
-                max_paragraphs=max_paragraphs,
-                max_headings=max_headings
-            )
+            if stream_parse:
+                content = self.stream_extractor(
+                    response,
+                    max_paragraphs=max_paragraphs,
+                    max_headings=max_headings,
+                    max_bytes=max_bytes,
+                    fields=fields
+                )
+            else:
+                tracing.annotate(bytes=len(response.content))
+                content = self.content_extractor(
+                    response.content,
+                    max_paragraphs=max_paragraphs,
+                    max_headings=max_headings,
+                    fields=fields
+                )
+            if self.cache is not None:
+                self._store(cache_key, content, response.headers)
+            return content
 
         except RequestException as e:
             raise RequestException(f"Network error fetching {link}: {str(e)}") from e
@@ -1,23 +1,137 @@
-import requests
 import json
 import os
+import threading
+from typing import Optional
 from dotenv import load_dotenv
+from tools.cacheStore import SQLiteCache
+from tools.httpTransport import HttpTransport, get_transport
+from utils import tracing
+from utils.rateLimiter import AdaptiveLimiter, get_limiter, parse_retry_after
+from utils import singleflight
 
 load_dotenv()
 
 
 class SerperClient:
-    def __init__(self, api_key=str):
+    # Seconds a cached response counts as fresh, per endpoint
+    CACHE_TTLS = {
+        "/search": 6 * 60 * 60,
+        "/images": 24 * 60 * 60,
+    }
+    # Extra seconds a response may be served stale while it is refreshed
+    STALE_TTL = 24 * 60 * 60
+    # 429s are left to the rate limiter, which pauses every caller for the Retry-After
+    RETRY_STATUSES = HttpTransport.RETRY_STATUSES - {429}
+    THROTTLE_RETRIES = 3
+
+    def __init__(self, api_key=str, cache: Optional[SQLiteCache] = None,
+                 use_cache: bool = True, stale_while_revalidate: bool = True,
+                 transport: Optional[HttpTransport] = None,
+                 base_url: Optional[str] = None,
+                 rate_limiter: Optional[AdaptiveLimiter] = None,
+                 queue_timeout: Optional[float] = None):
+        """
+        Args:
+            api_key: Serper API key (falls back to SERPER_API_KEY)
+            cache: Cache to use; defaults to the shared cache at SERPER_CACHE_PATH
+            use_cache: Set False to always go to the network
+            stale_while_revalidate: Serve expired entries while refreshing them in the background
+            transport: HTTP transport; defaults to the process-wide pooled transport
+            base_url: API root; defaults to SERPER_BASE_URL or the public Serper endpoint
+            rate_limiter: Limiter every network request (not cache hits) goes through;
+                defaults to the process-wide "serper" limiter
+            queue_timeout: Seconds a request may wait for a slot (default SERPER_QUEUE_TIMEOUT or 60)
+        """
         self.api_key = api_key or os.getenv("SERPER_API_KEY")
-        self.base_url = "https://google.serper.dev"
+        self.base_url = (base_url or os.getenv("SERPER_BASE_URL", "https://google.serper.dev")).rstrip("/")
         self.headers = {
             'X-API-KEY': self.api_key,
             'Content-Type': 'application/json'
         }
+        if use_cache and cache is None:
+            cache = SQLiteCache.shared(
+                os.getenv("SERPER_CACHE_PATH", ".cache/serper.sqlite3"),
+                max_entries=int(os.getenv("SERPER_CACHE_MAX_ENTRIES", "5000"))
+            )
+        self.cache = cache if use_cache else None
+        self.stale_while_revalidate = stale_while_revalidate
+        self.transport = transport or get_transport()
+        self.rate_limiter = rate_limiter or get_limiter("serper")
+        self.queue_timeout = queue_timeout or float(os.getenv("SERPER_QUEUE_TIMEOUT", "60"))
+        self._inflight = singleflight.group("serper")
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    def _cache_key(self, endpoint, payload):
+        """Key on the API root and endpoint plus the normalized query and location"""
+        params = json.loads(payload)
+        query = " ".join(str(params.get("q", "")).lower().split())
+        # Clients pointed at a stub or replay server must not share entries with real Serper
+        return f"{self.base_url}{endpoint}|{query}|{params.get('gl', '')}"
+
+    def _fetch(self, endpoint, payload):
+        """POST through the limiter; a 429 pauses the provider and the request queues again"""
+        for attempt in range(self.THROTTLE_RETRIES + 1):
+            with self.rate_limiter.slot(self.queue_timeout) as permit:
+                tracing.annotate(queued=round(permit.waited, 4))
+                response = self.transport.post(self.base_url + endpoint, headers=self.headers,
+                                               data=payload, retry_statuses=self.RETRY_STATUSES)
+                if response.status_code == 429:
+                    permit.throttle(parse_retry_after(response.headers.get("Retry-After")))
+            if response.status_code != 429:
+                break
+        return response.text, response.ok
+
+    def _store(self, key, endpoint, text):
+        ttl = self.CACHE_TTLS.get(endpoint, min(self.CACHE_TTLS.values()))
+        stale_ttl = self.STALE_TTL if self.stale_while_revalidate else 0
+        self.cache.set(key, text, ttl, stale_ttl)
+
+    def _refresh(self, key, endpoint, payload):
+        """Re-fetch a stale entry; runs on a background thread"""
+        try:
+            text, ok = self._fetch(endpoint, payload)
+            if ok:
+                self._store(key, endpoint, text)
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key, endpoint, payload):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, endpoint, payload), daemon=True).start()
+
+    def _fetch_and_store(self, key, endpoint, payload):
+        text, ok = self._fetch(endpoint, payload)
+        if ok and self.cache is not None:
+            self._store(key, endpoint, text)
+        return text, ok
 
     def _make_request(self, endpoint, payload):
-        response = requests.request("POST", self.base_url + endpoint, headers=self.headers, data=payload)
-        return response.text
+        with tracing.span("serper", endpoint=endpoint) as span:
+            key = self._cache_key(endpoint, payload)
+            if self.cache is not None:
+                cached, fresh = self.cache.get(key)
+                if cached is not None:
+                    if not fresh:
+                        self._schedule_refresh(key, endpoint, payload)
+                    span.set(cache="hit" if fresh else "stale", bytes=len(cached))
+                    return cached
+
+            # Concurrent lookups of the same keyword share one request
+            (text, ok), shared = self._inflight.do(key, self._fetch_and_store, key, endpoint, payload)
+            span.set(cache="miss" if self.cache is not None else "disabled",
+                     bytes=len(text), ok=ok, coalesced=shared)
+            return text
+
+    def cache_stats(self):
+        """Hit/miss counters of the underlying cache"""
+        return self.cache.summary() if self.cache is not None else {}
 
     def search_query(self, query):
         payload = json.dumps({
@@ -37,4 +151,4 @@ class SerperClient:
 # Example usage:
 # serper_client = SerperClient()
 # print(serper_client.search_query("example query"))
-# print(serper_client.image_query("example keywords"))
\ No newline at end of file
+# print(serper_client.image_query("example keywords"))
@@ -0,0 +1,48 @@
+import re
+
+# Devanagari (Hindi, Bhojpuri, Marathi, ...) and its extended block
+_DEVANAGARI = re.compile('[\u0900-\u097F\uA8E0-\uA8FF]')
+# Any letter outside basic Latin, e.g. other Indic scripts or Arabic
+_NON_LATIN_LETTER = re.compile('[^\\W\\d_a-zA-Z\u00C0-\u024F]')
+_WORD = re.compile(r"[a-zA-Z']+")
+
+# Frequent romanized Hindi/Bhojpuri function words and verbs that are not English
+# words; place names (Varanasi, Banaras, ghat, ...) are deliberately left out
+ROMANIZED_HINDI_WORDS = frozenset({
+    "aap", "aapko", "aapka", "aur", "accha", "acha", "achha", "achhi", "acchi", "ab", "abhi",
+    "baa", "bata", "batao", "bataiye", "batana", "bhai", "bhaiya", "bhi", "bahut", "badhiya",
+    "chahiye", "chal", "chalo", "dekhna", "dekhne", "dikhao", "dikhaiye",
+    "ghumna", "ghumne", "gaya", "gaye", "hai", "hain", "hau", "hamar", "hamke", "hum", "humko",
+    "jagah", "jagahein", "jaana", "jana", "jaane", "jaise", "kaha", "kahan", "kaun", "kaunsa",
+    "kaunsi", "kaisan", "kaise", "kaisa", "kab", "kahe", "karna", "karein", "khana", "khane",
+    "kitna", "kitne", "ki", "ke", "ka", "ko", "kuch", "kya", "kyun", "kyon", "lagta", "liye",
+    "mein", "mujhe", "mera", "meri", "nahi", "nahin", "pe", "raha", "rahe", "rahi",
+    "rauwa", "sabse", "se", "sakte", "sakta", "tha", "thi", "tum", "tumhara", "wala", "wale",
+    "wali", "yahan", "yaha", "woh", "wo", "yeh", "ye",
+})
+
+
+def detect_language(text: str) -> str:
+    """
+    Cheap local script/language detection
+    Args:
+        text: User query
+    Returns:
+        'devanagari', 'other_script', 'romanized_hindi' or 'english'
+    """
+    if _DEVANAGARI.search(text):
+        return "devanagari"
+    if _NON_LATIN_LETTER.search(text):
+        return "other_script"
+
+    words = _WORD.findall(text.lower())
+    if not words:
+        return "english"
+    hits = sum(1 for word in words if word in ROMANIZED_HINDI_WORDS)
+    if hits >= 2 or (hits and hits / len(words) >= 0.2):
+        return "romanized_hindi"
+    return "english"
+
+
+def is_english(text: str) -> bool:
+    return detect_language(text) == "english"
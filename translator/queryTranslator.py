@@ -1,36 +1,66 @@
 from pathlib import Path
 import os
+import threading
+from typing import Optional
 from models.factory import ModelFactory
+from models.base import BaseModel
+from translator.languageDetector import detect_language
+from utils import tracing
 from dotenv import load_dotenv
 load_dotenv()
 
 class Translator:
-    def __init__(self, api_key: str, model_type: str, model_name: str, prompt_template_path: str = None):
+    def __init__(self, api_key: str, model_type: str, model_name: str, prompt_template_path: str = None,
+                 model: Optional[BaseModel] = None,
+                 skip_english: bool = True):
         self.api_key = api_key
         self.model_name = model_name
         self.model_type = model_type
+        # Pass English queries straight through instead of calling the model
+        self.skip_english = skip_english
+        self.stats = {"skipped": 0, "translated": 0}
+        self._stats_lock = threading.Lock()
         if prompt_template_path:
             self.prompt_template_path = Path(prompt_template_path)
         else:
             self.prompt_template_path = Path("prompts/translator/translator_prompt.txt")
             
-        self.model = ModelFactory.get_model(model_type, api_key, model_name)
+        self._prompt_template: Optional[str] = None
+        # Reuse a shared client when one is injected (see main.pipeline.PipelineEngine)
+        self.model = model or ModelFactory.get_model(model_type, api_key, model_name)
         
     def load_prompt_template(self) -> str:
+        if self._prompt_template is not None:
+            return self._prompt_template
         try:
             with open(self.prompt_template_path,"r", encoding="utf-8") as f:
-                return f.read()
+                self._prompt_template = f.read()
+                return self._prompt_template
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt template not found at {self.prompt_template_path}")
         except Exception as e:
             raise Exception(f"Error loading prompt template: {str(e)}")
     
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
     def translate_query(self, query: str) -> str:
+        with tracing.span("translate") as span:
+            if self.skip_english and detect_language(query) == "english":
+                self._count("skipped")
+                span.set(skipped=True)
+                return query
+            span.set(skipped=False)
+            return self._translate(query)
+
+    def _translate(self, query: str) -> str:
         try:
             template = self.load_prompt_template()
             
             formatted_prompt = template.format(user_query=query)
             
+            self._count("translated")
             return self.model.generate_content(formatted_prompt)
         
         except Exception as e:
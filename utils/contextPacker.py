@@ -0,0 +1,162 @@
+from typing import Dict, List, Tuple
+import json
+import logging
+import re
+from utils.records import FormattedResults
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "the", "and", "for", "are", "what", "which", "with", "about", "from", "tell", "me",
+    "in", "of", "to", "a", "an", "is", "on", "best", "show", "some", "visit",
+})
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (~4 characters per token for English and Hinglish text)"""
+    return (len(text) + 3) // 4
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class ContextPacker:
+    """
+    Pack formatted search results into a token-budgeted prompt context.
+
+    Organic-result paragraphs, related questions and images are scored by
+    overlap with the query, source quality and rank, then added greedily while
+    the estimated size of the compact JSON context stays within the budget.
+    """
+
+    def __init__(self, token_budget: int = 3000, max_paragraph_chars: int = 500):
+        """
+        Args:
+            token_budget: Maximum estimated tokens for the serialized context
+            max_paragraph_chars: Paragraphs are cut to this length before packing
+        """
+        self.token_budget = token_budget
+        self.max_paragraph_chars = max_paragraph_chars
+
+    @staticmethod
+    def _terms(text: str) -> set:
+        return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 2}
+
+    @staticmethod
+    def _relevance(query_terms: set, text: str) -> float:
+        if not query_terms:
+            return 0.0
+        return len(query_terms & ContextPacker._terms(text)) / len(query_terms)
+
+    @staticmethod
+    def _cost(item) -> int:
+        # +1 for the separating comma in the enclosing list
+        return estimate_tokens(compact_json(item)) + 1
+
+    def _candidates(self, formatted_results: FormattedResults, query_terms: set) -> List[Tuple[float, str, int, Dict]]:
+        """(score, kind, source index, item) for every packable unit"""
+        candidates = []
+        for index, result in enumerate(formatted_results.organic_results):
+            quality = 1.0 if result.source_quality == "high" else 0.5
+            rank = 1.0 / max(result.position, 1)
+            header_text = " ".join([result.title, result.snippet, *result.key_points])
+            candidates.append((
+                0.6 * self._relevance(query_terms, header_text) + 0.25 * quality + 0.15 * rank + 0.05,
+                "source", index, {}
+            ))
+            for paragraph_index, paragraph in enumerate(result.main_content):
+                paragraph = paragraph[:self.max_paragraph_chars]
+                score = (0.6 * self._relevance(query_terms, paragraph) + 0.25 * quality + 0.15 * rank)
+                candidates.append((
+                    score / (1 + 0.2 * paragraph_index), "paragraph", index,
+                    {"text": paragraph, "order": paragraph_index}
+                ))
+
+        for question in formatted_results.related_questions:
+            item = {"question": question.question, "summary": question.summary}
+            score = 0.6 * self._relevance(query_terms, item["question"] + " " + item["summary"]) + 0.1
+            candidates.append((score, "question", -1, item))
+
+        for image in formatted_results.image_results:
+            if not image.url:
+                continue
+            item = {"title": image.title, "url": image.url}
+            score = 0.6 * self._relevance(query_terms, image.title + " " + image.context) + 0.1
+            candidates.append((score, "image", -1, item))
+
+        # Stable sort keeps the original order among equal scores
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return candidates
+
+    def pack(self, formatted_results: FormattedResults, user_query: str) -> Tuple[str, Dict]:
+        """
+        Build the serialized context for the final prompt
+        Args:
+            formatted_results: Output of ResponseFormatter.format
+            user_query: The user's query, used for relevance scoring
+        Returns:
+            (compact JSON context, packing statistics)
+        """
+        organic = formatted_results.organic_results
+        context = {
+            "query": user_query,
+            "sources": [],
+            "related_questions": [],
+            "images": [],
+            "freshness": formatted_results.processing_date
+        }
+        used = estimate_tokens(compact_json(context))
+        sources: Dict[int, Dict] = {}
+
+        for _, kind, index, item in self._candidates(formatted_results, self._terms(user_query)):
+            if kind in ("source", "paragraph"):
+                cost = 0
+                if index not in sources:
+                    result = organic[index]
+                    # The snippet is all a source has when its scrape missed the deadline
+                    header = {
+                        "domain": result.domain,
+                        "title": result.title,
+                        "snippet": result.snippet[:self.max_paragraph_chars],
+                        "key_points": result.key_points,
+                        "main_content": []
+                    }
+                    cost += self._cost(header)
+                if kind == "paragraph":
+                    cost += self._cost(item["text"])
+                if used + cost > self.token_budget:
+                    continue
+                if index not in sources:
+                    sources[index] = header
+                if kind == "paragraph":
+                    sources[index]["main_content"].append((item["order"], item["text"]))
+            else:
+                cost = self._cost(item)
+                if used + cost > self.token_budget:
+                    continue
+                context["related_questions" if kind == "question" else "images"].append(item)
+            used += cost
+
+        # Present sources and paragraphs in page order regardless of packing order
+        for source in sources.values():
+            source["main_content"] = [text for _, text in sorted(source["main_content"])]
+        context["sources"] = [sources[index] for index in sorted(sources)]
+        serialized = compact_json(context)
+
+        stats = {
+            "token_budget": self.token_budget,
+            "estimated_tokens": estimate_tokens(serialized),
+            "characters": len(serialized),
+            "sources": len(context["sources"]),
+            "paragraphs": sum(len(source["main_content"]) for source in context["sources"]),
+            "related_questions": len(context["related_questions"]),
+            "images": len(context["images"])
+        }
+        logger.info(
+            f"Packed context: ~{stats['estimated_tokens']}/{self.token_budget} tokens, "
+            f"{stats['characters']} chars, {stats['sources']} sources, {stats['paragraphs']} paragraphs, "
+            f"{stats['related_questions']} questions, {stats['images']} images"
+        )
+        return serialized, stats
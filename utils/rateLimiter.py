@@ -0,0 +1,349 @@
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``; callers
+    block in :meth:`acquire` until enough tokens are available. A rate of 0
+    or less disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity; defaults to one second's worth (at least 1)
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def per_minute(cls, count: float, burst: Optional[float] = None) -> "TokenBucket":
+        return cls(count / 60.0, burst)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Take tokens, waiting for the bucket to refill if needed.
+
+        Returns:
+            False if the tokens could not be taken before the timeout
+        """
+        if self.rate <= 0:
+            return True
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.stats["acquired"] += 1
+                    if waited:
+                        self.stats["waited"] += 1
+                        self.stats["wait_seconds"] += now - started
+                    return True
+                delay = (tokens - self._tokens) / self.rate
+            if timeout is not None and now + delay - started > timeout:
+                return False
+            waited = True
+            time.sleep(delay)
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a caller could not get a slot before its queue timeout"""
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Permit:
+    """A granted slot; the caller reports throttling and first-response time through it"""
+
+    __slots__ = ("started", "waited", "first_response", "throttled", "retry_after")
+
+    def __init__(self, waited: float):
+        self.started = time.monotonic()
+        self.waited = waited
+        self.first_response = None
+        self.throttled = False
+        self.retry_after = None
+
+    def mark_first_response(self) -> None:
+        """Measure latency up to now instead of until the slot is released (streams)"""
+        if self.first_response is None:
+            self.first_response = time.monotonic()
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """Report that the provider answered 429 / rate limit exceeded"""
+        self.throttled = True
+        self.retry_after = retry_after
+
+    def latency(self) -> float:
+        return (self.first_response or time.monotonic()) - self.started
+
+
+class AdaptiveLimiter:
+    """
+    Per-provider request limiter: a token bucket for the request rate plus an
+    AIMD (additive increase, multiplicative decrease) concurrency limit.
+
+    Callers queue in arrival order for a concurrency slot and a token. Every
+    successful call raises the limit by 1/limit, i.e. about one slot per
+    window of calls; a throttled call, or one slower than ``latency_target``,
+    multiplies it by ``decrease`` (at most once per ``cooldown``). A throttled
+    call also pauses the whole provider for its Retry-After, or ``cooldown``
+    seconds when the provider gave none.
+    """
+
+    def __init__(self, name: str, rate: float = 0.0, burst: Optional[float] = None,
+                 max_concurrency: int = 16, min_concurrency: int = 1,
+                 initial_concurrency: Optional[int] = None,
+                 latency_target: Optional[float] = None,
+                 decrease: float = 0.5, cooldown: float = 1.0):
+        """
+        Args:
+            name: Provider name used in stats and metrics
+            rate: Requests per second (0 = no rate limit, concurrency only)
+            burst: Token bucket capacity
+            max_concurrency: Upper bound for the adaptive concurrency limit
+            min_concurrency: Lower bound for the adaptive concurrency limit
+            initial_concurrency: Starting limit (defaults to max_concurrency)
+            latency_target: Seconds above which a call counts as a congestion signal
+            decrease: Factor the limit is multiplied by on a congestion signal
+            cooldown: Minimum seconds between decreases, and the default pause after a 429
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(initial_concurrency or self.max_concurrency)
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._queue: deque = deque()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {
+            "admitted": 0, "timeouts": 0, "throttled": 0, "slow": 0, "decreases": 0,
+            "wait_seconds": 0.0, "max_wait_seconds": 0.0, "max_queue_depth": 0
+        }
+
+    def configure(self, rate: Optional[float] = None, burst: Optional[float] = None,
+                  max_concurrency: Optional[int] = None,
+                  latency_target: Optional[float] = None) -> "AdaptiveLimiter":
+        """Change limits in place, so clients already holding this limiter see them"""
+        with self._cond:
+            if rate is not None:
+                self.bucket = TokenBucket(rate, burst)
+            if max_concurrency is not None:
+                self.max_concurrency = max(1, max_concurrency)
+                self.min_concurrency = min(self.min_concurrency, self.max_concurrency)
+                self.limit = min(self.limit, self.max_concurrency)
+            if latency_target is not None:
+                self.latency_target = latency_target or None
+            self._cond.notify_all()
+        return self
+
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    def _wait_turn(self, ticket: object, deadline: Optional[float]) -> bool:
+        while True:
+            now = time.monotonic()
+            if (self._queue[0] is ticket and self.in_flight < self.concurrency_limit()
+                    and now >= self.paused_until):
+                return True
+            waits = []
+            if now < self.paused_until:
+                waits.append(self.paused_until - now)
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                waits.append(deadline - now)
+            self._cond.wait(min(waits) if waits else None)
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[Permit]:
+        """
+        Wait in line for a concurrency slot and a token.
+
+        Returns:
+            A Permit to pass to release(), or None if the timeout expired first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._queue))
+            try:
+                if not self._wait_turn(ticket, deadline):
+                    self.stats["timeouts"] += 1
+                    return None
+                # Keep the head of the line while waiting for a token, so order is preserved
+                self._cond.release()
+                try:
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    got_token = self.bucket.acquire(timeout=remaining)
+                finally:
+                    self._cond.acquire()
+                if not got_token:
+                    self.stats["timeouts"] += 1
+                    return None
+                self.in_flight += 1
+                waited = time.monotonic() - started
+                self.stats["admitted"] += 1
+                self.stats["wait_seconds"] += waited
+                self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+                return Permit(waited)
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self, permit: Permit, success: bool = True) -> None:
+        """Return a slot and adapt the limit to the call's outcome"""
+        latency = permit.latency()
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if permit.throttled:
+                self.stats["throttled"] += 1
+                pause = permit.retry_after if permit.retry_after is not None else self.cooldown
+                self.paused_until = max(self.paused_until, now + pause)
+                self._decrease(now)
+            elif self.latency_target is not None and latency > self.latency_target:
+                self.stats["slow"] += 1
+                self._decrease(now)
+            elif success:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def _decrease(self, now: float) -> None:
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease)
+        self.stats["decreases"] += 1
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[Permit]:
+        """
+        Hold a slot for the duration of the block
+
+        Raises:
+            RateLimitTimeout: When no slot was granted within the timeout
+        """
+        permit = self.acquire(timeout)
+        if permit is None:
+            raise RateLimitTimeout(f"{self.name}: no request slot within {timeout}s")
+        success = False
+        try:
+            yield permit
+            success = True
+        finally:
+            self.release(permit, success=success)
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {
+                **self.stats,
+                "queue_depth": len(self._queue),
+                "in_flight": self.in_flight,
+                "concurrency_limit": self.concurrency_limit(),
+                "paused_seconds": round(max(0.0, self.paused_until - time.monotonic()), 3),
+                "rate": self.bucket.rate
+            }
+
+
+# Defaults per provider; each can be overridden with <NAME>_RPS or <NAME>_RPM,
+# <NAME>_MAX_CONCURRENCY and <NAME>_LATENCY_TARGET
+PROVIDER_DEFAULTS = {
+    "serper": {"max_concurrency": 8, "latency_target": 5.0},
+    "gemini": {"max_concurrency": 8},
+    "openai": {"max_concurrency": 8},
+}
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_options(name: str) -> Dict:
+    prefix = name.upper()
+    options = dict(PROVIDER_DEFAULTS.get(name, {}))
+    if os.getenv(f"{prefix}_RPS"):
+        options["rate"] = float(os.getenv(f"{prefix}_RPS"))
+    elif os.getenv(f"{prefix}_RPM"):
+        options["rate"] = float(os.getenv(f"{prefix}_RPM")) / 60.0
+    if os.getenv(f"{prefix}_MAX_CONCURRENCY"):
+        options["max_concurrency"] = int(os.getenv(f"{prefix}_MAX_CONCURRENCY"))
+    if os.getenv(f"{prefix}_LATENCY_TARGET"):
+        options["latency_target"] = float(os.getenv(f"{prefix}_LATENCY_TARGET")) or None
+    return options
+
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """Process-wide limiter for one provider, shared by every client of that provider"""
+    name = name.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = AdaptiveLimiter(name, **_env_options(name))
+            _limiters[name] = limiter
+        return limiter
+
+
+def stats() -> Dict[str, Dict]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+def prometheus_text(prefix: str = "ratelimit") -> str:
+    metrics = (
+        ("queue_depth", "gauge", "Callers waiting for a request slot"),
+        ("in_flight", "gauge", "Requests holding a slot"),
+        ("concurrency_limit", "gauge", "Current AIMD concurrency limit"),
+        ("admitted", "counter", "Requests granted a slot"),
+        ("throttled", "counter", "Requests the provider answered with a rate limit error"),
+        ("timeouts", "counter", "Callers that gave up waiting for a slot"),
+        ("wait_seconds", "counter", "Total seconds callers spent queued"),
+        ("max_wait_seconds", "gauge", "Longest time a caller spent queued"),
+    )
+    snapshots = stats()
+    lines = []
+    for metric, kind, description in metrics:
+        name = f"{prefix}_{metric}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for provider, snapshot in snapshots.items():
+            lines.append(f'{name}{{provider="{provider}"}} {snapshot[metric]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass(slots=True)
+class SerpHit:
+    """One organic result as returned by Serper; local index hits also carry their text"""
+    title: str
+    link: str
+    snippet: str
+    position: int = 999
+    paragraphs: Optional[List[str]] = None
+    headings: Optional[List[str]] = None
+
+    @classmethod
+    def from_serper(cls, result: Dict) -> "SerpHit":
+        return cls(
+            title=result.get('title', ''),
+            link=result.get('link', ''),
+            snippet=result.get('snippet', ''),
+            position=result.get('position', 999),
+            paragraphs=result.get('paragraphs'),
+            headings=result.get('headings')
+        )
+
+
+@dataclass(slots=True)
+class EnrichedSource:
+    """An organic result enriched with scraped page content"""
+    title: str
+    domain: str
+    link: str
+    snippet: str
+    key_points: List[str]
+    main_content: List[str]
+    meta_description: str
+    last_updated: str
+    position: int
+    source_quality: str
+
+    def to_dict(self) -> Dict:
+        return {
+            'title': self.title,
+            'domain': self.domain,
+            'link': self.link,
+            'snippet': self.snippet,
+            'content': {
+                'key_points': self.key_points,
+                'main_content': self.main_content,
+                'meta_description': self.meta_description,
+                'last_updated': self.last_updated
+            },
+            'position': self.position,
+            'source_quality': self.source_quality
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "EnrichedSource":
+        content = data.get('content', {})
+        return cls(
+            title=data.get('title', ''),
+            domain=data.get('domain', ''),
+            link=data.get('link', ''),
+            snippet=data.get('snippet', ''),
+            key_points=content.get('key_points', []),
+            main_content=content.get('main_content', []),
+            meta_description=content.get('meta_description', ''),
+            last_updated=content.get('last_updated', ''),
+            position=data.get('position', 999),
+            source_quality=data.get('source_quality', 'medium')
+        )
+
+
+@dataclass(slots=True)
+class ImageResult:
+    title: str
+    url: str
+    context: str
+
+    def to_dict(self) -> Dict:
+        return {'title': self.title, 'url': self.url, 'context': self.context}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ImageResult":
+        return cls(title=data.get('title', ''), url=data.get('url', ''), context=data.get('context', ''))
+
+
+@dataclass(slots=True)
+class RelatedQuestion:
+    question: str
+    summary: str
+    sources: List[Dict]
+
+    def to_dict(self) -> Dict:
+        return {'question': self.question, 'summary': self.summary, 'sources': self.sources}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RelatedQuestion":
+        return cls(
+            question=data.get('question', ''),
+            summary=data.get('summary', ''),
+            sources=data.get('sources', [])
+        )
+
+
+@dataclass(slots=True)
+class FormattedResults:
+    """Output of the formatting stage, consumed directly by the final-response stage"""
+    processing_date: str
+    organic_results: List[EnrichedSource] = field(default_factory=list)
+    image_results: List[ImageResult] = field(default_factory=list)
+    related_questions: List[RelatedQuestion] = field(default_factory=list)
+    knowledge_graph: List[Dict] = field(default_factory=list)
+    total_content_length: int = 0
+
+    @property
+    def sources_used(self) -> int:
+        return len(self.organic_results)
+
+    def to_dict(self) -> Dict:
+        """The dict layout historically returned by ResponseFormatter.format_for_llm"""
+        return {
+            'metadata': {
+                'processing_date': self.processing_date,
+                'sources_used': self.sources_used,
+                'total_content_length': self.total_content_length
+            },
+            'organic_results': [source.to_dict() for source in self.organic_results],
+            'image_results': [image.to_dict() for image in self.image_results],
+            'knowledge_graph': self.knowledge_graph,
+            'related_questions': [question.to_dict() for question in self.related_questions]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FormattedResults":
+        return cls(
+            processing_date=data.get('metadata', {}).get('processing_date', ''),
+            organic_results=[EnrichedSource.from_dict(r) for r in data.get('organic_results', [])],
+            image_results=[ImageResult.from_dict(i) for i in data.get('image_results', [])],
+            related_questions=[RelatedQuestion.from_dict(q) for q in data.get('related_questions', [])],
+            knowledge_graph=data.get('knowledge_graph', []),
+            total_content_length=data.get('metadata', {}).get('total_content_length', 0)
+        )
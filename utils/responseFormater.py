@@ -1,15 +1,42 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
 from tools.scraperTool import Scraper
+from utils import tracing
+from utils.records import SerpHit, EnrichedSource, ImageResult, RelatedQuestion, FormattedResults
 import re
+import time
 import logging
+import threading
 from datetime import datetime
 
 class ResponseFormatter:
-    def __init__(self, json_data: Dict, max_content_length: int = 2000):
+    # Only the scraped fields used to build the formatted results
+    SCRAPE_FIELDS = ("paragraphs", "headings", "domain_info")
+
+    def __init__(self, json_data: Dict, max_content_length: int = 2000,
+                 max_workers: int = 8,
+                 per_domain_limit: int = 2,
+                 scrape_deadline: float = 12.0,
+                 scraper: Optional[Scraper] = None):
+        """
+        Args:
+            json_data: Raw routed results ({category: [{keyword: serper_response}]})
+            max_content_length: Soft limit on the formatted payload size
+            max_workers: Size of the scraping worker pool
+            per_domain_limit: Maximum concurrent scrapes against one domain
+            scrape_deadline: Overall seconds allowed for the enrichment stage;
+                results still pending fall back to their SERP snippet
+            scraper: Shared Scraper to reuse; a new one is created if omitted
+        """
         self.json_data = json_data
-        self.scraper = Scraper()
+        self.scraper = scraper or Scraper()
         self.max_content_length = max_content_length
+        self.max_workers = max(1, max_workers)
+        self.per_domain_limit = max(1, per_domain_limit)
+        self.scrape_deadline = scrape_deadline
         self.logger = logging.getLogger(__name__)
+        self._domain_slots: Dict[str, threading.Semaphore] = {}
+        self._domain_lock = threading.Lock()
         
     def _truncate_text(self, text: str, max_length: int) -> str:
         """Smart truncation that preserves sentence boundaries"""
@@ -26,41 +53,109 @@ class ResponseFormatter:
         
         return truncated[:last_sentence_end+1] if last_sentence_end != -1 else truncated + "..."
 
-    def _process_organic_result(self, result: Dict) -> Optional[Dict]:
+    def _scrape(self, link: str) -> Dict:
+        """Scrape a single link, returning an empty dict on failure"""
+        try:
+            return self.scraper.get_website_content(
+                link,
+                max_paragraphs=5,
+                max_headings=3,
+                fields=self.SCRAPE_FIELDS
+            )
+        except Exception as e:
+            self.logger.warning(f"Scraping failed for {link}: {str(e)}")
+            return {}
+
+    def _domain_slot(self, link: str) -> threading.Semaphore:
+        """Per-domain semaphore bounding concurrent scrapes of one host"""
+        domain = link.split('/')[2].lower()
+        with self._domain_lock:
+            slot = self._domain_slots.get(domain)
+            if slot is None:
+                slot = threading.Semaphore(self.per_domain_limit)
+                self._domain_slots[domain] = slot
+            return slot
+
+    def _scrape_before(self, link: str, deadline: float) -> Dict:
+        """Scrape under the domain limit, giving up if no slot frees before the deadline"""
+        slot = self._domain_slot(link)
+        if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return {}
+        try:
+            return self._scrape(link)
+        finally:
+            slot.release()
+
+    def _enrich_organic_results(self, results: List[SerpHit]) -> List[EnrichedSource]:
+        """
+        Scrape all organic results in parallel within one overall deadline
+        Args:
+            results: Organic SERP hits, in the order they were returned
+        Returns:
+            Processed results in input order; hits whose scrape did not finish
+            in time keep only their SERP snippet
+        """
+        jobs: List[Tuple[SerpHit, Optional[object]]] = []
+        deadline = time.monotonic() + self.scrape_deadline
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scrape")
+        try:
+            for result in results:
+                link = result.link
+                future = None
+                # Local index hits already carry their text, so there is nothing to scrape
+                if result.paragraphs is None and link.startswith(('http://', 'https://')):
+                    future = executor.submit(tracing.propagate(self._scrape_before), link, deadline)
+                jobs.append((result, future))
+
+            pending = [future for _, future in jobs if future is not None]
+            _, not_done = wait(pending, timeout=max(0.0, deadline - time.monotonic()))
+            if not_done:
+                self.logger.warning(
+                    f"{len(not_done)} of {len(pending)} scrapes missed the "
+                    f"{self.scrape_deadline}s deadline, using SERP snippets"
+                )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        processed_results = []
+        for result, future in jobs:
+            scraped_content = {}
+            if result.paragraphs is not None:
+                scraped_content = {'paragraphs': result.paragraphs, 'headings': result.headings or []}
+            elif future is not None and future.done() and not future.cancelled():
+                scraped_content = future.result()
+            processed = self._process_organic_result(result, scraped_content)
+            if processed:
+                processed_results.append(processed)
+        return processed_results
+
+    def _process_organic_result(self, result: SerpHit,
+                                scraped_content: Optional[Dict] = None) -> Optional[EnrichedSource]:
         """Process and enrich a single organic search result"""
         try:
-            link = result.get('link', '')
+            link = result.link
             if not link.startswith(('http://', 'https://')):
                 return None
 
-            scraped_content = {}
-            try:
-                scraped_content = self.scraper.get_website_content(
-                    link,
-                    max_paragraphs=5,
-                    max_headings=3
-                )
-            except Exception as e:
-                self.logger.warning(f"Scraping failed for {link}: {str(e)}")
+            if scraped_content is None:
+                scraped_content = self._scrape(link)
 
             # Create structured content
-            return {
-                'title': self._truncate_text(result.get('title', ''), 120),
-                'domain': re.sub(r'^www\.', '', re.search(r'https?://([^/]+)', link).group(1)),
-                'link': link,
-                'snippet': self._truncate_text(result.get('snippet', ''), 300),
-                'content': {
-                    'key_points': scraped_content.get('headings', [])[:3],
-                    'main_content': [
-                        self._truncate_text(p, 500) 
-                        for p in scraped_content.get('paragraphs', [])[:5]
-                    ],
-                    'meta_description': scraped_content.get('domain_info', {}).get('meta_description', ''),
-                    'last_updated': datetime.now().strftime('%Y-%m-%d')
-                },
-                'position': result.get('position', 999),
-                'source_quality': self._assess_source_quality(link)
-            }
+            return EnrichedSource(
+                title=self._truncate_text(result.title, 120),
+                domain=re.sub(r'^www\.', '', re.search(r'https?://([^/]+)', link).group(1)),
+                link=link,
+                snippet=self._truncate_text(result.snippet, 300),
+                key_points=scraped_content.get('headings', [])[:3],
+                main_content=[
+                    self._truncate_text(p, 500) 
+                    for p in scraped_content.get('paragraphs', [])[:5]
+                ],
+                meta_description=scraped_content.get('domain_info', {}).get('meta_description', ''),
+                last_updated=datetime.now().strftime('%Y-%m-%d'),
+                position=result.position,
+                source_quality=self._assess_source_quality(link)
+            )
         except Exception as e:
             self.logger.error(f"Error processing result: {str(e)}")
             return None
@@ -74,65 +169,74 @@ class ResponseFormatter:
             return 'high'
         return 'medium'
 
-    def format_for_llm(self) -> Dict:
-        """Main formatting method that structures data for LLM consumption"""
-        formatted_data = {
-            'metadata': {
-                'processing_date': datetime.now().isoformat(),
-                'sources_used': 0,
-                'total_content_length': 0
-            },
-            'organic_results': [],
-            'image_results': [],
-            'knowledge_graph': [],
-            'related_questions': []
-        }
+    @staticmethod
+    def _content_length(formatted: FormattedResults) -> int:
+        """Length of the str() of the historical dict layout, as total_content_length has always reported"""
+        return len(str(formatted.to_dict()))
 
-        try:
+    def format(self) -> FormattedResults:
+        """
+        Structure raw routed results into typed records
+        Returns:
+            FormattedResults ready for the final-response stage
+        Raises:
+            Exception: If the raw results cannot be processed
+        """
+        with tracing.span("format") as span:
+            formatted = FormattedResults(processing_date=datetime.now().isoformat())
+
+            organic_hits = []
+            # An image keyword served from a search response repeats that response's images
+            image_urls = set()
             for api_type, responses in self.json_data.items():
                 for response in responses:
                     query = next(iter(response))
                     results = response[query]
 
                     if 'organic' in results:
-                        for result in results['organic']:
-                            processed = self._process_organic_result(result)
-                            if processed:
-                                formatted_data['organic_results'].append(processed)
-                                formatted_data['metadata']['sources_used'] += 1
+                        organic_hits.extend(SerpHit.from_serper(result) for result in results['organic'])
 
                     if 'images' in results:
-                        formatted_data['image_results'].extend([
-                            {
-                                'title': img.get('title', ''),
-                                'url': img.get('imageUrl', ''),
-                                'context': self._truncate_text(img.get('snippet', ''), 200)
-                            } for img in results['images']
-                        ])
+                        for img in results['images']:
+                            url = img.get('imageUrl', '')
+                            if url in image_urls:
+                                continue
+                            image_urls.add(url)
+                            formatted.image_results.append(ImageResult(
+                                title=img.get('title', ''),
+                                url=url,
+                                context=self._truncate_text(img.get('snippet', ''), 200)
+                            ))
 
                     if 'peopleAlsoAsk' in results:
-                        formatted_data['related_questions'].extend([
-                            {
-                                'question': q.get('question', ''),
-                                'summary': self._truncate_text(q.get('snippet', ''), 300),
-                                'sources': [{'title': q.get('title', ''), 'url': q.get('link', '')}]
-                            } for q in results.get('peopleAlsoAsk', [])
-                        ])
+                        formatted.related_questions.extend(
+                            RelatedQuestion(
+                                question=q.get('question', ''),
+                                summary=self._truncate_text(q.get('snippet', ''), 300),
+                                sources=[{'title': q.get('title', ''), 'url': q.get('link', '')}]
+                            ) for q in results.get('peopleAlsoAsk', [])
+                        )
+
+            # Enrich every organic hit in parallel, bounded by one deadline
+            formatted.organic_results = self._enrich_organic_results(organic_hits)
 
             # Sort results by position and quality
-            formatted_data['organic_results'].sort(
-                key=lambda x: (x['position'], 0 if x['source_quality'] == 'high' else 1)
+            formatted.organic_results.sort(
+                key=lambda x: (x.position, 0 if x.source_quality == 'high' else 1)
             )
 
-            # Calculate total content length
-            content_str = str(formatted_data)
-            formatted_data['metadata']['total_content_length'] = len(content_str)
-            
-            if len(content_str) > self.max_content_length:
+            formatted.total_content_length = self._content_length(formatted)
+            if formatted.total_content_length > self.max_content_length:
                 self.logger.warning(f"Formatted content exceeds {self.max_content_length} characters")
 
+            span.set(sources=formatted.sources_used, images=len(formatted.image_results),
+                     content_length=formatted.total_content_length)
+            return formatted
+
+    def format_for_llm(self) -> Dict:
+        """Main formatting method that structures data for LLM consumption"""
+        try:
+            return self.format().to_dict()
         except Exception as e:
             self.logger.error(f"Formatting failed: {str(e)}")
             return {'error': 'Failed to process search results'}
-
-        return formatted_data
\ No newline at end of file
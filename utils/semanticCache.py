@@ -0,0 +1,194 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Other names of the city, folded onto one token
+PLACE_ALIASES = {
+    "banaras": "varanasi", "benaras": "varanasi", "benares": "varanasi",
+    "banares": "varanasi", "kashi": "varanasi", "varansi": "varanasi",
+}
+# Phrasings of the same travel intent
+INTENT_SYNONYMS = {
+    "place": "sightseeing", "spot": "sightseeing", "sight": "sightseeing",
+    "attraction": "sightseeing", "see": "sightseeing", "visit": "sightseeing",
+    "tourist": "sightseeing", "landmark": "sightseeing",
+    "picture": "photo", "image": "photo", "pic": "photo",
+    "food": "eat", "dish": "eat", "cuisine": "eat",
+}
+STOPWORDS = frozenset(
+    "a an and are as at be best can do for from how i in is it me most of on or "
+    "please show should some tell that the their there these this to top was what "
+    "when where which who why with you your famous good great must".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(text: str) -> str:
+    """Folded, de-duplicated content words in sorted order, with aliases and synonyms mapped"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    words = set()
+    for word in _WORD.findall(text):
+        if word in STOPWORDS:
+            continue
+        if word in PLACE_ALIASES:
+            word = PLACE_ALIASES[word]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(INTENT_SYNONYMS.get(word, word))
+    return " ".join(sorted(words))
+
+
+class HashingVectorizer:
+    """
+    Network-free query embedding: hashed word unigrams plus character n-grams
+    of each word, L2-normalized. crc32 keeps the hashing stable across processes.
+    """
+
+    def __init__(self, dims: int = 4096, ngram_range: Tuple[int, int] = (3, 4), char_weight: float = 0.3):
+        self.dims = dims
+        self.ngram_range = ngram_range
+        self.char_weight = char_weight
+
+    def _features(self, normalized: str) -> List[Tuple[str, float]]:
+        features = []
+        low, high = self.ngram_range
+        for word in normalized.split():
+            features.append((f"w:{word}", 1.0))
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    features.append((f"c:{padded[i:i + n]}", self.char_weight))
+        return features
+
+    def transform(self, normalized: str) -> np.ndarray:
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for feature, weight in self._features(normalized):
+            vector[zlib.crc32(feature.encode("utf-8")) % self.dims] += weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query meaning rather than exact text.
+
+    Queries are normalized and embedded with a HashingVectorizer; a lookup is
+    one matrix-vector product against every stored embedding, and the best
+    entry counts as a hit when its cosine similarity reaches ``threshold``.
+    Entries expire after ``ttl`` seconds; once ``max_entries`` are stored,
+    expired entries are replaced first, then the least recently used.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 6 * 60 * 60,
+                 max_entries: int = 1000, vectorizer: Optional[HashingVectorizer] = None):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an answer stays valid
+            max_entries: Capacity of the embedding matrix
+            vectorizer: Query embedding; defaults to a 4096-dimension HashingVectorizer
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._matrix = np.zeros((self.max_entries, self.vectorizer.dims), dtype=np.float32)
+        self._expires = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._keys: List[Optional[str]] = [None] * self.max_entries
+        self._values: List[Any] = [None] * self.max_entries
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def lookup(self, query: str) -> Optional[Tuple[Any, float, str]]:
+        """
+        Find a cached answer for a similar query
+
+        Returns:
+            (value, similarity, normalized query it was stored under), or None on a miss
+        """
+        vector = self.vectorizer.transform(normalize_query(query))
+        now = time.time()
+        with self._lock:
+            if self._size and vector.any():
+                similarities = self._matrix[:self._size] @ vector
+                similarities[self._expires[:self._size] <= now] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._last_used[best] = now
+                    self.stats["hits"] += 1
+                    return self._values[best], float(similarities[best]), self._keys[best]
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, query: str, value: Any) -> None:
+        """Cache an answer; an entry with the same normalized query is replaced"""
+        key = normalize_query(query)
+        vector = self.vectorizer.transform(key)
+        if not vector.any():
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                slot = self._keys.index(key, 0, self._size)
+            except ValueError:
+                slot = self._free_slot(now)
+            self._matrix[slot] = vector
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._keys[slot] = key
+            self._values[slot] = value
+            self.stats["stores"] += 1
+
+    def _free_slot(self, now: float) -> int:
+        if self._size < self.max_entries:
+            self._size += 1
+            return self._size - 1
+        expired = np.flatnonzero(self._expires <= now)
+        if expired.size:
+            return int(expired[0])
+        self.stats["evictions"] += 1
+        return int(np.argmin(self._last_used))
+
+    def summary(self) -> Dict:
+        with self._lock:
+            live = int((self._expires[:self._size] > time.time()).sum())
+            return {**self.stats, "entries": live, "capacity": self.max_entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._keys = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+
+
+_default_cache: Optional[SemanticCache] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticCache]:
+    """
+    Process-wide answer cache, or None when SEMANTIC_CACHE is off.
+
+    Configured from SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL (seconds)
+    and SEMANTIC_CACHE_MAX_ENTRIES.
+    """
+    global _default_cache, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            if os.getenv("SEMANTIC_CACHE", "1").lower() in ("1", "true", "yes"):
+                _default_cache = SemanticCache(
+                    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+                    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", str(6 * 60 * 60))),
+                    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+                )
+            _default_loaded = True
+        return _default_cache
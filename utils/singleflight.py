@@ -0,0 +1,103 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for it and receive the same result, or
+    the same exception. Nothing is cached once the call finishes. Shared
+    results must be treated as read-only by every caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "coalesced": 0, "errors": 0}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn(*args, **kwargs) unless a call with this key is already in flight
+
+        Returns:
+            (result, shared) where shared is True if another caller's result was reused
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str) -> SingleFlight:
+    """Process-wide group for one kind of work, so every client instance coalesces together"""
+    with _groups_lock:
+        flight = _groups.get(name)
+        if flight is None:
+            flight = SingleFlight(name)
+            _groups[name] = flight
+        return flight
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Executed/coalesced/error counts per group; coalesced calls are the work saved"""
+    with _groups_lock:
+        flights = list(_groups.values())
+    return {flight.name: dict(flight.stats) for flight in flights}
+
+
+def prometheus_text(prefix: str = "singleflight") -> str:
+    lines = [
+        f"# HELP {prefix}_calls_total Calls per coalescing group; coalesced calls reused an in-flight result",
+        f"# TYPE {prefix}_calls_total counter"
+    ]
+    for name, counts in stats().items():
+        for outcome, count in counts.items():
+            lines.append(f'{prefix}_calls_total{{group="{name}",outcome="{outcome}"}} {count}')
+    return "\n".join(lines) + "\n"
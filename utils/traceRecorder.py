@@ -0,0 +1,205 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_PATH = ".cache/traces/router.jsonl"
+
+
+class TraceRecorder:
+    """Sink for per-request results and traces; the base recorder discards everything"""
+
+    def record(self, kind: str, payload: Dict[str, Any]) -> None:
+        """Submit one record. Must not block or touch the disk on the caller's thread."""
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until previously submitted records are written"""
+
+    def close(self) -> None:
+        """Flush and release the sink"""
+
+
+class NullRecorder(TraceRecorder):
+    pass
+
+
+class JsonlRecorder(TraceRecorder):
+    """
+    Append records as JSON lines from a background writer thread.
+
+    ``record`` only enqueues the payload; serialization, compression and file
+    rotation happen on the writer thread, so callers must not mutate a payload
+    after submitting it. When the queue is full new records are dropped (and
+    counted) rather than blocking the request.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRACE_PATH, compress: bool = False,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                 sample_rate: float = 1.0, queue_size: int = 1000):
+        """
+        Args:
+            path: Target file; ``.gz`` is appended when compressing
+            compress: Write gzip members instead of plain text
+            max_bytes: Rotate once the current file reaches this size (0 disables
+                rotation); compressed files count the uncompressed bytes written
+            backup_count: Number of rotated files kept (path.1 ... path.N)
+            sample_rate: Fraction of records kept, between 0 and 1
+            queue_size: Maximum records waiting for the writer
+        """
+        self.path = Path(f"{path}.gz" if compress and not str(path).endswith(".gz") else path)
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.backup_count = max(0, backup_count)
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.stats = {"recorded": 0, "sampled_out": 0, "dropped": 0, "written": 0, "rotations": 0, "errors": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self._file = None
+        self._file_bytes = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def record(self, kind: str, payload: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return
+        try:
+            self._queue.put_nowait({"ts": time.time(), "kind": kind, **payload})
+            self._count("recorded")
+        except queue.Full:
+            self._count("dropped")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        # Poll so a writer that dies mid-flush does not block the caller forever
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.is_set() and self._writer.is_alive():
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return
+            done.wait(wait)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+    def _existing_bytes(self) -> int:
+        """Uncompressed size of the current file, so rotation agrees with what _write counts"""
+        if not self.path.exists():
+            return 0
+        if not self.compress:
+            return self.path.stat().st_size
+        total = 0
+        try:
+            with gzip.open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    total += len(block)
+        except (OSError, EOFError):
+            # A member cut short by a crash: count what could be read
+            pass
+        return total
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file_bytes = self._existing_bytes()
+        if self.compress:
+            return gzip.open(self.path, "at", encoding="utf-8")
+        return open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{index}")
+                if source.exists():
+                    source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._count("rotations")
+
+    def _write(self, item: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = self._open()
+        line = json.dumps(item, ensure_ascii=False, default=str) + "\n"
+        self._file.write(line)
+        self._file_bytes += len(line.encode("utf-8"))
+        self._count("written")
+        if self.max_bytes and self._file_bytes >= self.max_bytes:
+            self._rotate()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    if self._file is not None:
+                        self._file.flush()
+                    item.set()
+                    continue
+                self._write(item)
+                # Flush once the backlog is drained instead of after every line
+                if self._queue.empty() and self._file is not None:
+                    self._file.flush()
+            except Exception as e:
+                self._count("errors")
+                logger.error(f"Trace write failed: {str(e)}")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_recorder: Optional[TraceRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> TraceRecorder:
+    """
+    Process-wide recorder configured from the environment.
+
+    TRACE_SINK: "jsonl" (default) or "none"; TRACE_PATH, TRACE_COMPRESS,
+    TRACE_MAX_BYTES, TRACE_BACKUPS and TRACE_SAMPLE_RATE tune the JSONL sink.
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            if os.getenv("TRACE_SINK", "jsonl").lower() == "none":
+                _recorder = NullRecorder()
+            else:
+                _recorder = JsonlRecorder(
+                    path=os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH),
+                    compress=os.getenv("TRACE_COMPRESS", "0").lower() in ("1", "true", "yes"),
+                    max_bytes=int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024))),
+                    backup_count=int(os.getenv("TRACE_BACKUPS", "5")),
+                    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+                )
+            atexit.register(_recorder.close)
+        return _recorder
@@ -0,0 +1,263 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Iterator, List, Optional
+import functools
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from utils.traceRecorder import TraceRecorder, get_recorder
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("TRACING", "0").lower() in ("1", "true", "yes")
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+def enable(flag: bool = True) -> None:
+    """Turn tracing on or off for the whole process (default comes from TRACING)"""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Span:
+    """One timed stage or external call; use through :func:`span`"""
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "trace",
+                 "start", "duration", "error", "_token")
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_span_ids)
+        self.parent_id = None
+        self.trace = None
+        self.start = 0.0
+        self.duration = 0.0
+        self.error = None
+        self._token = None
+
+    def set(self, **attributes) -> None:
+        """Attach attributes such as bytes=..., cache="hit" to the span"""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace = _current_trace.get()
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        if self.trace is not None:
+            self.trace.spans.append(self)
+        metrics.observe(self)
+        return False
+
+    def to_dict(self, origin: float) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled so instrumented code costs one flag check"""
+    __slots__ = ()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Context manager timing one stage; a shared no-op when tracing is disabled"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def annotate(**attributes) -> None:
+    """Add attributes to the innermost active span, if any"""
+    if _enabled:
+        current = _current_span.get()
+        if current is not None:
+            current.attributes.update(attributes)
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Bind fn to a copy of the caller's context so spans opened on a worker
+    thread join the caller's trace. Call once per submitted task.
+    """
+    if not _enabled:
+        return fn
+    return functools.partial(copy_context().run, fn)
+
+
+class Trace:
+    """The spans of one request"""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        # list.append is atomic, so worker threads can add spans without a lock
+        self.spans: List[Span] = []
+
+    def stage_durations(self) -> Dict[str, float]:
+        """Total seconds per span name"""
+        totals: Dict[str, float] = {}
+        for item in self.spans:
+            totals[item.name] = totals.get(item.name, 0.0) + item.duration
+        return totals
+
+    def to_dict(self) -> Dict:
+        spans = sorted(self.spans, key=lambda item: item.start)
+        root = next((item for item in spans if item.parent_id is None), None)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(root.duration * 1000, 3) if root is not None else None,
+            "attributes": self.attributes,
+            "spans": [item.to_dict(self.origin) for item in spans]
+        }
+
+
+@contextmanager
+def trace(name: str, recorder: Optional[TraceRecorder] = None, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Collect the spans of one request under a root span.
+
+    On exit the JSON trace goes to ``recorder`` (default: the process-wide
+    trace sink) and a per-stage summary is logged. Yields None when tracing
+    is disabled.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    current = Trace(name, attributes)
+    token = _current_trace.set(current)
+    try:
+        with Span(name, dict(attributes)):
+            yield current
+    finally:
+        _current_trace.reset(token)
+        (recorder or get_recorder()).record("trace", current.to_dict())
+        summary = ", ".join(
+            f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in current.stage_durations().items()
+            if stage != name
+        )
+        logger.info(f"Trace {current.trace_id} ({name}): {summary}")
+
+
+class MetricsRegistry:
+    """Per-span-name latency histograms and counters, exportable as Prometheus text"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict] = {}
+
+    def observe(self, item: Span) -> None:
+        with self._lock:
+            series = self._series.get(item.name)
+            if series is None:
+                series = {
+                    "count": 0, "sum": 0.0, "errors": 0, "bytes": 0,
+                    "buckets": [0] * len(self.buckets), "cache": {}
+                }
+                self._series[item.name] = series
+            series["count"] += 1
+            series["sum"] += item.duration
+            for index, bound in enumerate(self.buckets):
+                if item.duration <= bound:
+                    series["buckets"][index] += 1
+            if item.error is not None:
+                series["errors"] += 1
+            size = item.attributes.get("bytes")
+            if isinstance(size, int):
+                series["bytes"] += size
+            cache = item.attributes.get("cache")
+            if cache is not None:
+                series["cache"][cache] = series["cache"].get(cache, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {**series, "buckets": list(series["buckets"]), "cache": dict(series["cache"])}
+                for name, series in self._series.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def prometheus_text(self, prefix: str = "pipeline") -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of pipeline stages and external calls",
+            f"# TYPE {prefix}_span_duration_seconds histogram"
+        ]
+        for name, series in snapshot.items():
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {series["count"]}')
+            lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {series["sum"]:.6f}')
+            lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {series["count"]}')
+
+        lines += [f"# HELP {prefix}_span_errors_total Spans that ended with an exception",
+                  f"# TYPE {prefix}_span_errors_total counter"]
+        lines += [f'{prefix}_span_errors_total{{span="{name}"}} {s["errors"]}' for name, s in snapshot.items()]
+
+        lines += [f"# HELP {prefix}_span_bytes_total Bytes transferred by spans that report a size",
+                  f"# TYPE {prefix}_span_bytes_total counter"]
+        lines += [f'{prefix}_span_bytes_total{{span="{name}"}} {s["bytes"]}' for name, s in snapshot.items()]
+
+        lines += [f"# HELP {prefix}_cache_lookups_total Cache lookups by span and result",
+                  f"# TYPE {prefix}_cache_lookups_total counter"]
+        for name, series in snapshot.items():
+            for result, count in series["cache"].items():
+                lines.append(f'{prefix}_cache_lookups_total{{span="{name}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def prometheus_text() -> str:
+    """Prometheus exposition of the process-wide metrics"""
+    return metrics.prometheus_text()